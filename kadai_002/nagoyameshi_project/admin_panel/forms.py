@@ -77,6 +77,16 @@ class AdminRestaurantCreateForm(forms.ModelForm):
         })
     )
     
+    name_kana = forms.CharField(
+        label='店舗名（ふりがな）',
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'ひらがなまたはカタカナで入力してください（検索に使用します）'
+        })
+    )
+    
     description = forms.CharField(
         label='店舗説明',
         required=False,
@@ -165,6 +175,17 @@ class AdminRestaurantCreateForm(forms.ModelForm):
         })
     )
     
+    seat_capacity = forms.IntegerField(
+        label='座席数',
+        min_value=1,
+        initial=20,
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'placeholder': '20'
+        }),
+        help_text='1つの予約時間帯（30分）に受け付ける人数の上限'
+    )
+    
     is_active = forms.BooleanField(
         label='承認状態',
         required=False,
@@ -186,9 +207,9 @@ class AdminRestaurantCreateForm(forms.ModelForm):
     class Meta:
         model = Restaurant
         fields = [
-            'name', 'description', 'category', 'image', 'postal_code', 'address', 
+            'name', 'name_kana', 'description', 'category', 'image', 'postal_code', 'address', 
             'phone_number', 'opening_hours', 'closed_days', 
-            'budget_min', 'budget_max', 'is_active'
+            'budget_min', 'budget_max', 'seat_capacity', 'is_active'
         ]
 
     def clean(self):
@@ -30,6 +30,7 @@ urlpatterns = [
     # レビュー管理
     path('reviews/', views.review_list, name='review_list'),
     path('reviews/create/', views.review_create, name='review_create'),
+    path('reviews/bulk/', views.review_bulk_action, name='review_bulk_action'),
     path('reviews/<int:review_id>/edit/', views.review_edit, name='review_edit'),
     path('reviews/<int:review_id>/hide/', views.review_hide, name='review_hide'),
     path('reviews/<int:review_id>/show/', views.review_show, name='review_show'),
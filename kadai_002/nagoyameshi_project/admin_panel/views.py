@@ -10,15 +10,22 @@ from django.db import models
 import csv
 import io
 from django.http import HttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from urllib.parse import urlencode
 from django.utils import timezone
 from accounts.forms import CustomUserCreationForm
+from restaurants.cache import get_search_cache_stats
+from restaurants.content_similarity import rebuild_content_similarity, suspend_content_refresh
 from restaurants.models import Restaurant
 from reviews.models import Review
 from reservations.models import Reservation
+from reservations.slots import SlotUnavailable
 from categories.models import Category
 from .models import CompanyInfo
 from .forms import CompanyInfoForm, AdminRestaurantCreateForm, CSVUploadForm, CategoryCSVUploadForm
 from reviews.forms import AdminReviewCreateForm
+from reviews.moderation import BULK_ACTIONS, CHUNK_SIZE, apply_bulk_action
 
 User = get_user_model()
 
@@ -45,6 +52,7 @@ def dashboard(request):
         'total_reservations': total_reservations,
         'recent_users': recent_users,
         'recent_reviews': recent_reviews,
+        'search_cache_stats': get_search_cache_stats(),
     }
     
     return render(request, 'admin_panel/dashboard.html', context)
@@ -139,6 +147,7 @@ def restaurant_edit(request, restaurant_id):
     if request.method == 'POST':
         # 基本情報の更新
         restaurant.name = request.POST.get('name', '').strip()
+        restaurant.name_kana = request.POST.get('name_kana', '').strip()
         restaurant.description = request.POST.get('description', '').strip()
         restaurant.address = request.POST.get('address', '').strip()
         restaurant.phone_number = request.POST.get('phone_number', '').strip()
@@ -163,6 +172,15 @@ def restaurant_edit(request, restaurant_id):
         except ValueError:
             messages.error(request, '予算は数値で入力してください。')
         
+        # 座席数の更新
+        try:
+            seat_capacity = int(request.POST.get('seat_capacity') or restaurant.seat_capacity)
+            if seat_capacity < 1:
+                raise ValueError
+            restaurant.seat_capacity = seat_capacity
+        except ValueError:
+            messages.error(request, '座席数は1以上の数値で入力してください。')
+        
         # 画像の更新
         if 'image' in request.FILES:
             restaurant.image = request.FILES['image']
@@ -359,16 +377,14 @@ def user_delete(request, user_id):
         'is_superuser': target_user.is_superuser
     })
 
-@staff_member_required
-def review_list(request):
-    """レビュー管理 - レビュー一覧"""
-    # 検索・フィルタリング機能
-    search_query = request.GET.get('search', '')
-    status_filter = request.GET.get('status', 'all')
-    rating_filter = request.GET.get('rating', 'all')
+def _filtered_reviews(params):
+    """レビュー管理の検索条件で絞り込んだレビュー"""
+    search_query = params.get('search', '')
+    status_filter = params.get('status', 'all')
+    rating_filter = params.get('rating', 'all')
+    duplicate_filter = params.get('duplicate', 'all')
     
-    # ベースクエリ
-    reviews = Review.objects.select_related('user', 'restaurant', 'restaurant__category').order_by('-created_at')
+    reviews = Review.objects.all()
     
     # 検索機能（メールアドレス検索も追加）
     if search_query:
@@ -386,9 +402,36 @@ def review_list(request):
         reviews = reviews.filter(is_public=False)
     
     # 評価フィルター
-    if rating_filter != 'all':
+    if rating_filter in ('1', '2', '3', '4', '5'):
         reviews = reviews.filter(rating=int(rating_filter))
     
+    # 重複の疑いフィルター
+    if duplicate_filter == 'suspected':
+        reviews = reviews.filter(duplicate_of__isnull=False)
+    
+    return reviews
+
+
+def _review_filter_query(params):
+    """レビュー管理の検索条件のクエリ文字列（一括操作後のリダイレクト用）"""
+    return urlencode({
+        key: params[key]
+        for key in ('search', 'status', 'rating', 'duplicate')
+        if params.get(key) and params.get(key) != 'all'
+    })
+
+
+@staff_member_required
+def review_list(request):
+    """レビュー管理 - レビュー一覧"""
+    # 検索・フィルタリング機能
+    search_query = request.GET.get('search', '')
+    status_filter = request.GET.get('status', 'all')
+    rating_filter = request.GET.get('rating', 'all')
+    duplicate_filter = request.GET.get('duplicate', 'all')
+    
+    reviews = _filtered_reviews(request.GET).select_related('user', 'restaurant', 'restaurant__category').order_by('-created_at')
+    
     # ページネーション
     from django.core.paginator import Paginator
     paginator = Paginator(reviews, 20)  # 1ページに20件表示
@@ -399,20 +442,56 @@ def review_list(request):
     total_reviews = Review.objects.count()
     public_reviews = Review.objects.filter(is_public=True).count()
     hidden_reviews = Review.objects.filter(is_public=False).count()
+    duplicate_reviews = Review.objects.filter(duplicate_of__isnull=False).count()
     
     context = {
         'page_obj': page_obj,
         'search_query': search_query,
         'status_filter': status_filter,
         'rating_filter': rating_filter,
+        'duplicate_filter': duplicate_filter,
         'total_reviews': total_reviews,
         'public_reviews': public_reviews,
         'hidden_reviews': hidden_reviews,
+        'duplicate_reviews': duplicate_reviews,
+        'bulk_actions': BULK_ACTIONS,
     }
     
     return render(request, 'admin_panel/review_list.html', context)
 
 
+@staff_member_required
+@require_POST
+def review_bulk_action(request):
+    """レビューの一括公開・非公開・削除"""
+    action = request.POST.get('action')
+    redirect_url = reverse('admin_panel:review_list')
+    filter_query = _review_filter_query(request.POST)
+    if filter_query:
+        redirect_url += f'?{filter_query}'
+    
+    if action not in BULK_ACTIONS:
+        messages.error(request, '操作を選択してください。')
+        return redirect(redirect_url)
+    
+    if request.POST.get('scope') == 'all':
+        # 検索条件に一致するすべてのレビュー（サーバー側でチャンクに分けて処理）
+        reviews = _filtered_reviews(request.POST)
+        chunk_size = CHUNK_SIZE
+    else:
+        review_ids = [int(value) for value in request.POST.getlist('review_ids') if value.isdigit()]
+        if not review_ids:
+            messages.error(request, 'レビューを選択してください。')
+            return redirect(redirect_url)
+        reviews = Review.objects.filter(id__in=review_ids)
+        # 選択したレビューは1つのトランザクションで処理する
+        chunk_size = None
+    
+    count = apply_bulk_action(action, reviews, chunk_size=chunk_size)
+    messages.success(request, f'{count}件のレビューを{BULK_ACTIONS[action]}しました。')
+    return redirect(redirect_url)
+
+
 @staff_member_required
 def review_hide(request, review_id):
     """レビュー非公開"""
@@ -582,9 +661,13 @@ def reservation_status_change(request, reservation_id):
         if new_status in ['pending', 'confirmed', 'cancelled', 'completed']:
             old_status = reservation.get_status_display()
             reservation.status = new_status
-            reservation.save()
-            new_status_display = reservation.get_status_display()
-            messages.success(request, f'「{reservation.restaurant.name}」の予約ステータスを「{old_status}」→「{new_status_display}」に変更しました。')
+            try:
+                reservation.save()
+            except SlotUnavailable:
+                messages.error(request, '予約時間帯の空席が足りないため、ステータスを変更できません。')
+            else:
+                new_status_display = reservation.get_status_display()
+                messages.success(request, f'「{reservation.restaurant.name}」の予約ステータスを「{old_status}」→「{new_status_display}」に変更しました。')
         else:
             messages.error(request, '無効なステータスです。')
         
@@ -1311,60 +1394,67 @@ def csv_import(request):
             error_count = 0
             errors = []
             
-            for row_number, row in enumerate(reader, start=2):  # ヘッダー行を1とする
-                try:
-                    # BOMを除去した新しい辞書を作成
-                    cleaned_row = {}
-                    for key, value in row.items():
-                        # キーからBOMを除去
-                        cleaned_key = key.strip().replace('\ufeff', '').replace('﻿', '') if key else ''
-                        # 値からもBOMを除去
-                        cleaned_value = value.strip().replace('\ufeff', '').replace('﻿', '') if value else ''
-                        cleaned_row[cleaned_key] = cleaned_value
+            # 1行ごとに内容による似ている店舗を更新すると件数の2乗に比例して遅くなるため、
+            # 登録中は止めて最後に全件を作り直す
+            with suspend_content_refresh():
+                for row_number, row in enumerate(reader, start=2):  # ヘッダー行を1とする
+                    try:
+                        # BOMを除去した新しい辞書を作成
+                        cleaned_row = {}
+                        for key, value in row.items():
+                            # キーからBOMを除去
+                            cleaned_key = key.strip().replace('\ufeff', '').replace('﻿', '') if key else ''
+                            # 値からもBOMを除去
+                            cleaned_value = value.strip().replace('\ufeff', '').replace('﻿', '') if value else ''
+                            cleaned_row[cleaned_key] = cleaned_value
                     
-                    # カテゴリを取得または作成
-                    category_name = cleaned_row.get('カテゴリ', '').strip()
-                    if category_name:
-                        category, _ = Category.objects.get_or_create(
-                            name=category_name
-                        )
-                    else:
-                        category = None
+                        # カテゴリを取得または作成
+                        category_name = cleaned_row.get('カテゴリ', '').strip()
+                        if category_name:
+                            category, _ = Category.objects.get_or_create(
+                                name=category_name
+                            )
+                        else:
+                            category = None
                     
-                    # 予算の処理
-                    budget_min = cleaned_row.get('予算下限', '0').strip()
-                    budget_max = cleaned_row.get('予算上限', '5000').strip()
+                        # 予算の処理
+                        budget_min = cleaned_row.get('予算下限', '0').strip()
+                        budget_max = cleaned_row.get('予算上限', '5000').strip()
                     
-                    try:
-                        budget_min = int(budget_min) if budget_min else 0
-                    except ValueError:
-                        budget_min = 0
+                        try:
+                            budget_min = int(budget_min) if budget_min else 0
+                        except ValueError:
+                            budget_min = 0
                     
-                    try:
-                        budget_max = int(budget_max) if budget_max else 5000
-                    except ValueError:
-                        budget_max = 5000
+                        try:
+                            budget_max = int(budget_max) if budget_max else 5000
+                        except ValueError:
+                            budget_max = 5000
                     
-                    # 店舗を作成
-                    restaurant = Restaurant(
-                        name=cleaned_row.get('店舗名', '').strip(),
-                        description=cleaned_row.get('説明', '').strip(),
-                        category=category,
-                        postal_code=cleaned_row.get('郵便番号', '').strip(),
-                        address=cleaned_row.get('住所', '').strip(),
-                        phone_number=cleaned_row.get('電話番号', '').strip(),
-                        opening_hours=cleaned_row.get('営業時間', '').strip(),
-                        closed_days=cleaned_row.get('定休日', '').strip(),
-                        budget_min=budget_min,
-                        budget_max=budget_max,
-                        is_active=cleaned_row.get('承認状態', 'TRUE').upper() == 'TRUE'
-                    )
-                    restaurant.save()
-                    success_count += 1
+                        # 店舗を作成
+                        restaurant = Restaurant(
+                            name=cleaned_row.get('店舗名', '').strip(),
+                            name_kana=cleaned_row.get('ふりがな', '').strip(),
+                            description=cleaned_row.get('説明', '').strip(),
+                            category=category,
+                            postal_code=cleaned_row.get('郵便番号', '').strip(),
+                            address=cleaned_row.get('住所', '').strip(),
+                            phone_number=cleaned_row.get('電話番号', '').strip(),
+                            opening_hours=cleaned_row.get('営業時間', '').strip(),
+                            closed_days=cleaned_row.get('定休日', '').strip(),
+                            budget_min=budget_min,
+                            budget_max=budget_max,
+                            is_active=cleaned_row.get('承認状態', 'TRUE').upper() == 'TRUE'
+                        )
+                        restaurant.save()
+                        success_count += 1
                     
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f'行 {row_number}: {str(e)}')
+                    except Exception as e:
+                        error_count += 1
+                        errors.append(f'行 {row_number}: {str(e)}')
+            
+            if success_count > 0:
+                rebuild_content_similarity()
             
             # 結果メッセージ
             if success_count > 0:
@@ -1384,7 +1474,7 @@ def csv_import(request):
     
     # サンプルCSVの列定義
     sample_columns = [
-        '店舗名', 'カテゴリ', '説明', '郵便番号', '住所', 
+        '店舗名', 'ふりがな', 'カテゴリ', '説明', '郵便番号', '住所', 
         '電話番号', '営業時間', '定休日', '予算下限', '予算上限', '承認状態'
     ]
     
@@ -1409,18 +1499,18 @@ def csv_download_sample(request):
     
     # ヘッダー行
     writer.writerow([
-        '店舗名', 'カテゴリ', '説明', '郵便番号', '住所', 
+        '店舗名', 'ふりがな', 'カテゴリ', '説明', '郵便番号', '住所', 
         '電話番号', '営業時間', '定休日', '予算下限', '予算上限', '承認状態'
     ])
     
     # サンプルデータ
     writer.writerow([
-        '和食処 さくら', '和食', '新鮮な魚介と季節の野菜を使った本格和食', 
+        '和食処 さくら', 'わしょくどころ さくら', '和食', '新鮮な魚介と季節の野菜を使った本格和食', 
         '4500001', '愛知県名古屋市中村区那古野1-1-1', '052-123-4567', 
         '11:00-14:00, 17:00-22:00', '月曜日', '1000', '3000', 'TRUE'
     ])
     writer.writerow([
-        'イタリアン トラットリア', 'イタリアン', '本場イタリアの味をカジュアルに', 
+        'イタリアン トラットリア', 'いたりあん とらっとりあ', 'イタリアン', '本場イタリアの味をカジュアルに', 
         '4500002', '愛知県名古屋市中村区名駅2-2-2', '052-234-5678', 
         '11:30-15:00, 18:00-23:00', '火曜日', '2000', '5000', 'TRUE'
     ])
@@ -1441,7 +1531,7 @@ def restaurant_csv_export(request):
     
     # ヘッダー行
     writer.writerow([
-        'ID', '店舗名', 'カテゴリ', '説明', '郵便番号', '住所', 
+        'ID', '店舗名', 'ふりがな', 'カテゴリ', '説明', '郵便番号', '住所', 
         '電話番号', '営業時間', '定休日', '予算下限', '予算上限', 
         '承認状態', '作成日', '更新日'
     ])
@@ -1481,6 +1571,7 @@ def restaurant_csv_export(request):
         writer.writerow([
             restaurant.id,
             restaurant.name,
+            restaurant.name_kana,
             restaurant.category.name if restaurant.category else '',
             restaurant.description,
             restaurant.postal_code,
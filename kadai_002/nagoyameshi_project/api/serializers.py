@@ -0,0 +1,102 @@
+"""
+API の出力項目の定義
+
+項目ごとに「取得が必要な列」と「値の取り出し方」を持ち、fields= で指定された項目の
+列だけを .only() で取得する（説明文など大きな列を読まずに済む）。
+"""
+from django.urls import reverse
+
+
+class Field:
+    """出力項目（columns: 取得する列, getter: モデルから値を取り出す関数）"""
+
+    def __init__(self, columns, getter, related=None):
+        self.columns = columns
+        self.getter = getter
+        self.related = related
+
+
+def _attr(name):
+    return Field([name], lambda obj: getattr(obj, name))
+
+
+def _datetime(name):
+    return Field([name], lambda obj: getattr(obj, name).isoformat() if getattr(obj, name) else None)
+
+
+RESTAURANT_FIELDS = {
+    'id': _attr('id'),
+    'name': _attr('name'),
+    'name_kana': _attr('name_kana'),
+    'description': _attr('description'),
+    'category': Field(
+        ['category__id', 'category__name'],
+        lambda obj: {'id': obj.category.id, 'name': obj.category.name},
+        related='category',
+    ),
+    'postal_code': _attr('postal_code'),
+    'address': _attr('address'),
+    'phone_number': _attr('phone_number'),
+    'latitude': _attr('latitude'),
+    'longitude': _attr('longitude'),
+    'opening_hours': _attr('opening_hours'),
+    'closed_days': _attr('closed_days'),
+    'budget_min': _attr('budget_min'),
+    'budget_max': _attr('budget_max'),
+    'image': Field(['image'], lambda obj: obj.image.url if obj.image else None),
+    'average_rating': Field(['avg_rating'], lambda obj: round(obj.avg_rating, 1)),
+    'review_count': Field(['rating_count'], lambda obj: obj.rating_count),
+    'rating_score': Field(['rating_score'], lambda obj: round(obj.rating_score, 2)),
+    'rating_histogram': Field(
+        [f'rating_{stars}_count' for stars in range(1, 6)],
+        lambda obj: {str(stars): getattr(obj, f'rating_{stars}_count') for stars in range(1, 6)},
+    ),
+    'popularity_score': _attr('popularity_score'),
+    'url': Field(['id'], lambda obj: reverse('restaurants:detail', kwargs={'restaurant_id': obj.id})),
+    'created_at': _datetime('created_at'),
+    'updated_at': _datetime('updated_at'),
+}
+
+CATEGORY_FIELDS = {
+    'id': _attr('id'),
+    'name': _attr('name'),
+    'description': _attr('description'),
+}
+
+REVIEW_FIELDS = {
+    'id': _attr('id'),
+    'restaurant_id': _attr('restaurant_id'),
+    'username': Field(['user__username'], lambda obj: obj.user.username, related='user'),
+    'rating': _attr('rating'),
+    'comment': _attr('comment'),
+    'created_at': _datetime('created_at'),
+}
+
+
+def parse_fields(value, available):
+    """fields= の値を検証して項目名の一覧を返す（省略時は全項目）"""
+    if not value:
+        return list(available)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f'不明な項目です: {", ".join(unknown)}')
+    return names
+
+
+def select_fields(queryset, names, available, extra_columns=()):
+    """指定された項目に必要な列だけを取得するクエリセットにする"""
+    columns = {'id', *extra_columns}
+    related = set()
+    for name in names:
+        columns.update(available[name].columns)
+        if available[name].related:
+            related.add(available[name].related)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+
+def serialize(obj, names, available):
+    """モデルを辞書に変換する"""
+    return {name: available[name].getter(obj) for name in names}
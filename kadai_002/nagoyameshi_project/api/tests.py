@@ -0,0 +1,62 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from categories.models import Category
+from restaurants.models import Restaurant
+
+
+class RestaurantListTests(TestCase):
+    """店舗一覧 API（カーソル方式のページと NDJSON の出力）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='和食')
+        other = Category.objects.create(name='洋食')
+        for index in range(12):
+            Restaurant.objects.create(
+                name=f'店舗{index:02d}', category=cls.category if index % 4 else other, address='名古屋市',
+            )
+        Restaurant.objects.create(name='非公開の店舗', category=cls.category, address='名古屋市', is_active=False)
+        cls.active_ids = list(Restaurant.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+
+    def test_cursor_pages_cover_every_restaurant_once(self):
+        """next_cursor をたどると公開中の店舗を id 順に重複なく返す"""
+        url = reverse('api:restaurant_list')
+        params = {'limit': 5, 'fields': 'id,name'}
+        ids = []
+        while True:
+            data = self.client.get(url, params).json()
+            self.assertTrue(all(set(row) == {'id', 'name'} for row in data['results']))
+            ids.extend(row['id'] for row in data['results'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(ids, self.active_ids)
+
+    def stream(self, **params):
+        response = self.client.get(reverse('api:restaurant_list'), {'format': 'ndjson', **params})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    @override_settings(API_STREAM_CHUNK_SIZE=5)
+    def test_ndjson_streams_every_restaurant_across_batches(self):
+        """NDJSON はキーセットのバッチをまたいでも全件を1回ずつ id 順に出力する"""
+        rows = self.stream(fields='id,category')
+        self.assertEqual([row['id'] for row in rows], self.active_ids)
+        self.assertTrue(all(set(row) == {'id', 'category'} for row in rows))
+
+    @override_settings(API_STREAM_CHUNK_SIZE=2)
+    def test_ndjson_applies_filters(self):
+        """絞り込みの条件はすべてのバッチに適用する"""
+        rows = self.stream(fields='id', category=self.category.id)
+        expected = list(
+            Restaurant.objects.filter(is_active=True, category=self.category).order_by('id').values_list('id', flat=True)
+        )
+        self.assertEqual([row['id'] for row in rows], expected)
+
+    def test_unknown_field_is_rejected(self):
+        """定義されていない項目を指定すると 400"""
+        response = self.client.get(reverse('api:restaurant_list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
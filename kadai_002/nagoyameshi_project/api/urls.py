@@ -0,0 +1,15 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    # 店舗
+    path('v1/restaurants/', views.restaurant_list, name='restaurant_list'),
+    path('v1/restaurants/<int:restaurant_id>/', views.restaurant_detail, name='restaurant_detail'),
+    path('v1/restaurants/<int:restaurant_id>/reviews/', views.review_list, name='review_list'),
+    path('v1/restaurants/<int:restaurant_id>/availability/', views.restaurant_availability, name='restaurant_availability'),
+    
+    # カテゴリ
+    path('v1/categories/', views.category_list, name='category_list'),
+]
@@ -0,0 +1,139 @@
+import json
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+
+from categories.models import Category
+from reservations.availability import availability
+from restaurants.models import Restaurant
+from restaurants.pagination import paginate_by_cursor
+from reviews.feed import REVIEW_FEED_ORDERINGS
+from reviews.models import Review
+from .serializers import (
+    CATEGORY_FIELDS, RESTAURANT_FIELDS, REVIEW_FIELDS, parse_fields, select_fields, serialize,
+)
+
+# 1ページの件数（既定値・上限）
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def _error(message, status=400):
+    return JsonResponse({'error': message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def _json(data):
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def _page_response(page, names, available):
+    return _json({
+        'results': [serialize(obj, names, available) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+def _ndjson_response(queryset, names, available):
+    """
+    1行1件の JSON を順に送る（全件を一度にメモリへ載せない）
+
+    MySQL（PyMySQL）はサーバー側カーソルを使わず結果全体をクライアントに読み込むため、
+    .iterator() ではなく ID のキーセットで API_STREAM_CHUNK_SIZE 件ずつ取得する。
+    """
+    def lines():
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:settings.API_STREAM_CHUNK_SIZE])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            for obj in chunk:
+                yield json.dumps(serialize(obj, names, available), ensure_ascii=False) + '\n'
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson; charset=utf-8')
+
+
+@require_GET
+def restaurant_list(request):
+    """店舗一覧（format=ndjson の場合は全件をストリーミングで出力）"""
+    try:
+        names = parse_fields(request.GET.get('fields'), RESTAURANT_FIELDS)
+    except ValueError as e:
+        return _error(str(e))
+    
+    restaurants = Restaurant.objects.filter(is_active=True)
+    category = request.GET.get('category')
+    if category:
+        if not category.isdigit():
+            return _error('category は数値で指定してください。')
+        restaurants = restaurants.filter(category_id=category)
+    restaurants = select_fields(restaurants, names, RESTAURANT_FIELDS)
+    
+    if request.GET.get('format') == 'ndjson':
+        return _ndjson_response(restaurants, names, RESTAURANT_FIELDS)
+    
+    page = paginate_by_cursor(restaurants, ['id'], _limit(request), request.GET.get('cursor'))
+    return _page_response(page, names, RESTAURANT_FIELDS)
+
+
+@require_GET
+def restaurant_detail(request, restaurant_id):
+    """店舗詳細"""
+    try:
+        names = parse_fields(request.GET.get('fields'), RESTAURANT_FIELDS)
+    except ValueError as e:
+        return _error(str(e))
+    
+    restaurants = select_fields(Restaurant.objects.filter(is_active=True), names, RESTAURANT_FIELDS)
+    restaurant = get_object_or_404(restaurants, id=restaurant_id)
+    return _json(serialize(restaurant, names, RESTAURANT_FIELDS))
+
+
+@require_GET
+def restaurant_availability(request, restaurant_id):
+    """店舗の予約時間帯ごとの空席（予約を受け付ける期間の全日分）"""
+    restaurant = get_object_or_404(Restaurant.objects.only('id', 'seat_capacity'), id=restaurant_id, is_active=True)
+    return _json({'restaurant_id': restaurant.id, **availability(restaurant)})
+
+
+@require_GET
+def category_list(request):
+    """カテゴリ一覧"""
+    try:
+        names = parse_fields(request.GET.get('fields'), CATEGORY_FIELDS)
+    except ValueError as e:
+        return _error(str(e))
+    
+    categories = select_fields(Category.objects.order_by('name'), names, CATEGORY_FIELDS)
+    return _json({'results': [serialize(category, names, CATEGORY_FIELDS) for category in categories]})
+
+
+@require_GET
+def review_list(request, restaurant_id):
+    """店舗の公開レビュー一覧（サイトと同じくプレミアム会員限定）"""
+    if not (request.user.is_authenticated and getattr(request.user, 'is_premium', False)):
+        return _error('レビューの閲覧はプレミアム会員限定です。', status=403)
+    try:
+        names = parse_fields(request.GET.get('fields'), REVIEW_FIELDS)
+    except ValueError as e:
+        return _error(str(e))
+    
+    restaurant = get_object_or_404(Restaurant.objects.only('id'), id=restaurant_id, is_active=True)
+    ordering = REVIEW_FEED_ORDERINGS.get(request.GET.get('sort'), REVIEW_FEED_ORDERINGS['newest'])
+    reviews = Review.objects.filter(restaurant=restaurant, is_public=True)
+    # カーソルの作成に並び順の列が必要
+    reviews = select_fields(reviews, names, REVIEW_FIELDS, extra_columns=[field.lstrip('-') for field in ordering])
+    
+    page = paginate_by_cursor(reviews, ordering, _limit(request), request.GET.get('cursor'))
+    return _page_response(page, names, REVIEW_FIELDS)
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import pymysql
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import os
 
@@ -56,6 +57,7 @@ INSTALLED_APPS = [
     'payments',
     'categories',
     'admin_panel',
+    'api',
 ]
 
 MIDDLEWARE = [
@@ -100,6 +102,10 @@ if DEBUG:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # トランザクションの開始時に書き込みロックを取る（同時の予約で「database is locked」にしない）
+                'transaction_mode': 'IMMEDIATE',
+            },
         }
     }
 else:
@@ -119,6 +125,62 @@ else:
     }
 
 
+# キャッシュ
+# 開発環境ではプロセス内メモリ、本番環境では環境変数で共有キャッシュ
+# （例: django.core.cache.backends.redis.RedisCache）を指定する
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'nagoyameshi'),
+    }
+}
+# カタログの版番号や入力補完の変更履歴などの無効化はキャッシュ経由で全プロセスに伝えるため、
+# 本番環境ではプロセスごとのキャッシュを使わない（管理コマンドでの更新もWebのプロセスに届かなくなる）
+if not DEBUG and CACHES['default']['BACKEND'] in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+):
+    raise ImproperlyConfigured(
+        '本番環境では CACHE_BACKEND に共有キャッシュ（RedisCache、DatabaseCache など）を指定してください。'
+    )
+
+# 未ログインユーザーの検索結果をキャッシュする秒数（0の場合はキャッシュしない）
+SEARCH_CACHE_TIMEOUT = int(os.environ.get('SEARCH_CACHE_TIMEOUT', '300'))
+
+# 店舗検索バックエンド（未設定の場合はデータベースの種類に応じて自動選択）
+RESTAURANT_SEARCH_BACKEND = os.environ.get('RESTAURANT_SEARCH_BACKEND', '')
+
+# 検索結果の件数をキャッシュする秒数（0の場合は毎回数える）
+SEARCH_COUNT_CACHE_TIMEOUT = int(os.environ.get('SEARCH_COUNT_CACHE_TIMEOUT', '60'))
+
+# トップページのランダム表示に使う公開中店舗IDの一覧を作り直す間隔（秒）
+RESTAURANT_ID_POOL_TIMEOUT = int(os.environ.get('RESTAURANT_ID_POOL_TIMEOUT', '300'))
+
+# 人気スコアの半減期と集計対象の期間（日）
+POPULARITY_HALF_LIFE_DAYS = float(os.environ.get('POPULARITY_HALF_LIFE_DAYS', '30'))
+POPULARITY_WINDOW_DAYS = int(os.environ.get('POPULARITY_WINDOW_DAYS', '180'))
+
+# プレミアム会員向けのトップページのおすすめ店舗をユーザーごとにキャッシュする秒数（0の場合はキャッシュしない）
+PERSONALIZED_TOP_CACHE_TIMEOUT = int(os.environ.get('PERSONALIZED_TOP_CACHE_TIMEOUT', '300'))
+
+# 評価スコア（ベイズ平均）の事前分布。レビューが RATING_PRIOR_WEIGHT 件ある店舗は平均が事前の平均と実際の平均の中間になる
+# （変更した場合は rebuild_rating_aggregates コマンドで再計算する）
+RATING_PRIOR_MEAN = float(os.environ.get('RATING_PRIOR_MEAN', '3.5'))
+RATING_PRIOR_WEIGHT = float(os.environ.get('RATING_PRIOR_WEIGHT', '10'))
+
+# 未ログインユーザー向けの店舗詳細ページ（HTML）をキャッシュする秒数（0の場合はキャッシュしない）
+DETAIL_PAGE_CACHE_TIMEOUT = int(os.environ.get('DETAIL_PAGE_CACHE_TIMEOUT', '600'))
+
+# 予約の空席（時間帯ごとの確保済みの人数）を店舗ごとにキャッシュする秒数（予約・キャンセル時は即時に消す）
+AVAILABILITY_CACHE_TIMEOUT = int(os.environ.get('AVAILABILITY_CACHE_TIMEOUT', '600'))
+
+# API の NDJSON 出力で1回にデータベースから読み込む件数（ID のキーセットで区切って取得する）
+API_STREAM_CHUNK_SIZE = int(os.environ.get('API_STREAM_CHUNK_SIZE', '2000'))
+
+# 入力補完の索引が他のプロセスでの変更を確認する間隔（秒）
+AUTOCOMPLETE_SYNC_INTERVAL = float(os.environ.get('AUTOCOMPLETE_SYNC_INTERVAL', '5'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -28,6 +28,7 @@ urlpatterns = [
     path('payments/', include('payments.urls')),
     path('categories/', include('categories.urls')),
     path('admin-panel/', include('admin_panel.urls')),
+    path('api/', include('api.urls')),
 ]
 
 # 開発環境でのメディアファイル配信
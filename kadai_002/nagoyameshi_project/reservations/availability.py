@@ -0,0 +1,76 @@
+"""
+予約時間帯ごとの空席（予約可能な人数）
+
+予約を受け付ける期間（今日から BOOKING_WINDOW_DAYS 日先まで）の予約時間帯の在庫
+（ReservationSlot。キャンセル以外の予約の人数を日付・時間帯ごとに合計したもの）を
+1回のクエリで読み込み、店舗の座席数から確保済みの人数を引いて求める。
+
+確保済みの人数は店舗ごとにキャッシュし、予約・キャンセルで在庫が変わるとキャッシュを消す。
+座席数と「1時間後以降」の制限は応答のたびに適用するため、キャッシュには含めない。
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ReservationSlot
+from .slots import BOOKING_WINDOW_DAYS, MIN_LEAD_TIME, SLOT_MINUTES, slot_times
+
+
+def _cache_key(restaurant_id, today):
+    # 受け付ける期間が日付とともに進むため、日付ごとに別のキーにする
+    return f'reservations:availability:{restaurant_id}:{today.isoformat()}'
+
+
+def reserved_seats(restaurant_id, today):
+    """受け付ける期間の時間帯ごとの確保済みの人数（{(予約日, 時間帯): 人数}）"""
+    def build():
+        rows = ReservationSlot.objects.filter(
+            restaurant_id=restaurant_id,
+            reservation_date__range=(today, today + datetime.timedelta(days=BOOKING_WINDOW_DAYS)),
+            reserved_seats__gt=0,
+        ).values_list('reservation_date', 'slot_time', 'reserved_seats')
+        return {(reservation_date, slot_time): seats for reservation_date, slot_time, seats in rows}
+
+    return cache.get_or_set(_cache_key(restaurant_id, today), build, settings.AVAILABILITY_CACHE_TIMEOUT)
+
+
+def invalidate_availability(*restaurant_ids):
+    """店舗の空席のキャッシュを消す（予約・キャンセルの確定後に呼ぶ）"""
+    today = timezone.localdate()
+    cache.delete_many([_cache_key(restaurant_id, today) for restaurant_id in restaurant_ids])
+
+
+def availability(restaurant, now=None):
+    """
+    店舗の日付・時間帯ごとの空席
+
+    Returns:
+        {'seat_capacity', 'slot_minutes', 'times': 時間帯の一覧,
+         'days': [{'date': 予約日, 'available': 時間帯ごとの空席の人数}, ...]}
+        受付の締め切りを過ぎた時間帯の空席は0
+    """
+    now = timezone.localtime(now)
+    today = now.date()
+    reserved = reserved_seats(restaurant.pk, today)
+    times = slot_times()
+    deadline = now + MIN_LEAD_TIME
+
+    days = []
+    for offset in range(BOOKING_WINDOW_DAYS + 1):
+        day = today + datetime.timedelta(days=offset)
+        days.append({
+            'date': day.isoformat(),
+            'available': [
+                max(restaurant.seat_capacity - reserved.get((day, time), 0), 0)
+                if timezone.make_aware(datetime.datetime.combine(day, time)) > deadline else 0
+                for time in times
+            ],
+        })
+    return {
+        'seat_capacity': restaurant.seat_capacity,
+        'slot_minutes': SLOT_MINUTES,
+        'times': [f'{time:%H:%M}' for time in times],
+        'days': days,
+    }
@@ -2,6 +2,7 @@ from django import forms
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from .models import Reservation
+from .slots import BOOKING_WINDOW_DAYS, FIRST_SLOT, LAST_SLOT, MIN_LEAD_TIME, SLOT_MINUTES
 import datetime
 
 
@@ -23,8 +24,9 @@ class ReservationCreateForm(forms.ModelForm):
         widget=forms.TimeInput(attrs={
             'type': 'time',
             'class': 'form-control',
+            'step': SLOT_MINUTES * 60,
         }),
-        help_text='予約したい時間を選択してください（例：18:30）'
+        help_text=f'予約したい時間を{SLOT_MINUTES}分単位で選択してください（例：18:30）'
     )
     
     party_size = forms.IntegerField(
@@ -74,7 +76,7 @@ class ReservationCreateForm(forms.ModelForm):
                 raise ValidationError('過去の日付は選択できません。')
             
             # 3ヶ月先まで予約可能
-            max_date = timezone.now().date() + datetime.timedelta(days=90)
+            max_date = timezone.now().date() + datetime.timedelta(days=BOOKING_WINDOW_DAYS)
             if reservation_date > max_date:
                 raise ValidationError('3ヶ月先までの日付を選択してください。')
                 
@@ -85,11 +87,12 @@ class ReservationCreateForm(forms.ModelForm):
         reservation_time = self.cleaned_data.get('reservation_time')
         if reservation_time:
             # 営業時間内かチェック（例：11:00-22:00）
-            open_time = datetime.time(11, 0)
-            close_time = datetime.time(22, 0)
+            if reservation_time < FIRST_SLOT or reservation_time > LAST_SLOT:
+                raise ValidationError(f'営業時間内（{FIRST_SLOT:%H:%M}-{LAST_SLOT:%H:%M}）の時間を選択してください。')
             
-            if reservation_time < open_time or reservation_time > close_time:
-                raise ValidationError('営業時間内（11:00-22:00）の時間を選択してください。')
+            # 予約時間帯（30分単位）の開始時刻のみ受け付ける
+            if reservation_time.minute % SLOT_MINUTES or reservation_time.second:
+                raise ValidationError(f'予約時間は{SLOT_MINUTES}分単位で選択してください。')
                 
         return reservation_time
 
@@ -107,7 +110,7 @@ class ReservationCreateForm(forms.ModelForm):
             # タイムゾーンを考慮した比較
             reservation_datetime = timezone.make_aware(reservation_datetime)
             
-            if reservation_datetime <= now + datetime.timedelta(hours=1):
+            if reservation_datetime <= now + MIN_LEAD_TIME:
                 raise ValidationError('予約は1時間後以降の時間を選択してください。')
         
         return cleaned_data
\ No newline at end of file
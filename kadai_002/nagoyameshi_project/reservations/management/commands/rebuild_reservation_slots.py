@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from reservations.availability import invalidate_availability
+from reservations.slots import rebuild_reservation_slots
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'キャンセル以外の予約から、予約時間帯ごとの確保済みの人数（座席の在庫）を作り直します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant', type=int, action='append', dest='restaurant_ids',
+            help='対象の店舗ID（複数指定可。省略時は全店舗）',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='一括作成の件数')
+
+    def handle(self, *args, **options):
+        restaurant_ids = options['restaurant_ids']
+        count = rebuild_reservation_slots(restaurant_ids, batch_size=options['batch_size'])
+        invalidate_availability(*(restaurant_ids or Restaurant.objects.values_list('id', flat=True)))
+        self.stdout.write(self.style.SUCCESS(f'{count}件の予約時間帯の在庫を作成しました。'))
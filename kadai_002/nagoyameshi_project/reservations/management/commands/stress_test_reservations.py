@@ -0,0 +1,111 @@
+import datetime
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from categories.models import Category
+from reservations.models import Reservation, ReservationSlot
+from reservations.slots import SlotUnavailable
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        '複数のスレッドから同じ予約時間帯に同時に予約し、座席数を超えて受け付けないことを確認します'
+        '（検証用の店舗・ユーザーを作成し、終了時に削除します。DEBUG=true の開発環境でのみ実行できます）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=20, help='同時に予約するスレッド数')
+        parser.add_argument('--capacity', type=int, default=10, help='検証用の店舗の座席数')
+        parser.add_argument('--party-size', type=int, default=2, help='1件の予約の人数')
+        parser.add_argument('--rounds', type=int, default=3, help='繰り返す回数（毎回別の時間帯を使う）')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            # 本番環境のデータベースに検証用の店舗・ユーザー・予約を作らない
+            raise CommandError('このコマンドは DEBUG=true の開発環境でのみ実行できます。')
+        threads, capacity, party_size = options['threads'], options['capacity'], options['party_size']
+        category = Category.objects.first()
+        if category is None:
+            raise CommandError('カテゴリが1件もありません。')
+
+        key = uuid.uuid4().hex[:8]
+        User = get_user_model()
+        restaurant = Restaurant.objects.create(
+            name=f'予約の同時実行の検証用 {key}', category=category, address='検証用', seat_capacity=capacity,
+            is_active=False,
+        )
+        users = [
+            User.objects.create_user(username=f'stress-{key}-{index}', email=f'stress-{key}-{index}@example.com')
+            for index in range(threads)
+        ]
+        failed = False
+        try:
+            reservation_date = timezone.localdate() + datetime.timedelta(days=30)
+            for round_index in range(options['rounds']):
+                reservation_time = datetime.time(18 + round_index // 2, 30 * (round_index % 2))
+                results = self._run_round(restaurant, users, reservation_date, reservation_time, party_size)
+                booked = (
+                    Reservation.objects.filter(restaurant=restaurant, reservation_date=reservation_date,
+                                               reservation_time=reservation_time)
+                    .aggregate(seats=Sum('party_size'))['seats'] or 0
+                )
+                slot_seats = (
+                    ReservationSlot.objects.filter(restaurant=restaurant, reservation_date=reservation_date,
+                                                   slot_time=reservation_time)
+                    .values_list('reserved_seats', flat=True).first() or 0
+                )
+                ok = booked <= capacity and booked == slot_seats and booked == results['booked'] * party_size
+                failed |= not ok
+                self.stdout.write(
+                    f'{reservation_date} {reservation_time:%H:%M}: 受付 {results["booked"]}件・満席 {results["full"]}件・'
+                    f'エラー {results["error"]}件 / 予約の人数 {booked}名・在庫 {slot_seats}名・座席数 {capacity}名',
+                    style_func=self.style.SUCCESS if ok else self.style.ERROR,
+                )
+        finally:
+            restaurant.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        if failed:
+            raise CommandError('座席数を超えた予約、または在庫と予約の不一致があります。')
+        self.stdout.write(self.style.SUCCESS('座席数を超えた予約はありませんでした。'))
+
+    def _run_round(self, restaurant, users, reservation_date, reservation_time, party_size):
+        """全スレッドで同時に1件ずつ予約し、結果の件数を返す"""
+        results = {'booked': 0, 'full': 0, 'error': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(len(users))
+
+        def book(user):
+            try:
+                barrier.wait()
+                Reservation(
+                    user=user, restaurant=restaurant, reservation_date=reservation_date,
+                    reservation_time=reservation_time, party_size=party_size,
+                ).save()
+                outcome = 'booked'
+            except SlotUnavailable:
+                outcome = 'full'
+            except Exception as e:
+                # ロック待ちのタイムアウトなど、座席の不足以外の失敗はすべてエラーとして数える
+                self.stderr.write(f'{user.username}: {e!r}')
+                outcome = 'error'
+            finally:
+                # スレッドごとの接続を閉じる
+                connections.close_all()
+            with lock:
+                results[outcome] += 1
+
+        workers = [threading.Thread(target=book, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+        ('restaurants', '0011_content_similarity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user', 'reservation_date', 'reservation_time'], name='reservation_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:14
+
+import datetime
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+def populate_reservation_slots(apps, schema_editor):
+    """既存のキャンセル以外の予約から時間帯（30分単位）ごとの確保済みの人数を作成する"""
+    Reservation = apps.get_model('reservations', 'Reservation')
+    ReservationSlot = apps.get_model('reservations', 'ReservationSlot')
+    totals = defaultdict(int)
+    rows = (
+        Reservation.objects.exclude(status='cancelled').order_by()
+        .values_list('restaurant_id', 'reservation_date', 'reservation_time')
+        .annotate(seats=models.Sum('party_size'))
+    )
+    for restaurant_id, reservation_date, reservation_time, seats in rows:
+        slot_time = datetime.time(reservation_time.hour, reservation_time.minute - reservation_time.minute % 30)
+        totals[restaurant_id, reservation_date, slot_time] += seats
+    ReservationSlot.objects.bulk_create(
+        [
+            ReservationSlot(restaurant_id=restaurant_id, reservation_date=reservation_date, slot_time=slot_time,
+                            reserved_seats=seats)
+            for (restaurant_id, reservation_date, slot_time), seats in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_reservation_user_date_index'),
+        ('restaurants', '0013_restaurant_seat_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reservation_date', models.DateField(verbose_name='予約日')),
+                ('slot_time', models.TimeField(verbose_name='時間帯')),
+                ('reserved_seats', models.PositiveIntegerField(default=0, verbose_name='確保済みの人数')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservation_slots', to='restaurants.restaurant', verbose_name='店舗')),
+            ],
+            options={
+                'verbose_name': '予約時間帯',
+                'verbose_name_plural': '予約時間帯',
+                'ordering': ['restaurant', 'reservation_date', 'slot_time'],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'reservation_date', 'slot_time'), name='reservation_slot_unique')],
+            },
+        ),
+        migrations.RunPython(populate_reservation_slots, migrations.RunPython.noop),
+    ]
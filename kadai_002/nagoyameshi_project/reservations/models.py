@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from restaurants.models import Restaurant
@@ -56,10 +56,32 @@ class Reservation(models.Model):
         verbose_name = '予約'
         verbose_name_plural = '予約'
         ordering = ['-reservation_date', '-reservation_time']
+        indexes = [
+            # マイ予約一覧（予約日時の新しい順）
+            models.Index(fields=['user', 'reservation_date', 'reservation_time'], name='reservation_user_date_idx'),
+        ]
     
     def __str__(self):
         return f'{self.restaurant.name} - {self.user.username} ({self.reservation_date} {self.reservation_time})'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 座席の在庫の差分計算用に読み込み時の状態を保持
+        instance._loaded_booking_state = instance.booking_state if not instance.get_deferred_fields() else None
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # 座席の確保（pre_save）と同じトランザクションで保存する
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_booking_state = self.booking_state
+    
+    @property
+    def booking_state(self):
+        """座席の在庫に影響する項目（店舗ID, 予約日, 予約時間, 人数, ステータス）"""
+        return (self.restaurant_id, self.reservation_date, self.reservation_time, self.party_size, self.status)
+    
     @property
     def is_past(self):
         """予約日時が過去かどうか"""
@@ -83,3 +105,33 @@ class Reservation(models.Model):
             
         cancel_deadline = self.reservation_date - datetime.timedelta(days=1)
         return timezone.now().date() <= cancel_deadline
+
+
+class ReservationSlot(models.Model):
+    """
+    予約時間帯モデル（店舗・日付・30分単位の時間帯ごとの確保済みの人数）
+
+    確保済みの人数はキャンセル以外の予約の人数の合計。予約の保存・削除時に更新する。
+    """
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='店舗',
+        on_delete=models.CASCADE,
+        related_name='reservation_slots'
+    )
+    reservation_date = models.DateField('予約日')
+    slot_time = models.TimeField('時間帯')
+    reserved_seats = models.PositiveIntegerField('確保済みの人数', default=0)
+
+    class Meta:
+        verbose_name = '予約時間帯'
+        verbose_name_plural = '予約時間帯'
+        ordering = ['restaurant', 'reservation_date', 'slot_time']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurant', 'reservation_date', 'slot_time'], name='reservation_slot_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant_id}: {self.reservation_date} {self.slot_time:%H:%M} ({self.reserved_seats}名)'
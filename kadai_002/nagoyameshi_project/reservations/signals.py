@@ -0,0 +1,37 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .availability import invalidate_availability
+from .models import Reservation
+from .slots import held_seats, release_seats, update_seats
+
+
+@receiver(pre_save, sender=Reservation)
+def update_seats_on_save(sender, instance, **kwargs):
+    """予約の作成・変更・キャンセルを予約時間帯の座席の在庫に反映（空席が無ければ SlotUnavailable）"""
+    if instance._state.adding:
+        old_state = None
+    else:
+        old_state = getattr(instance, '_loaded_booking_state', None)
+        if old_state is None:
+            # 変更前の状態が分からない場合はデータベースから読み込む
+            old_state = (
+                Reservation.objects.filter(pk=instance.pk)
+                .values_list('restaurant_id', 'reservation_date', 'reservation_time', 'party_size', 'status')
+                .first()
+            )
+    changed = update_seats(instance, old_state)
+    if changed:
+        transaction.on_commit(partial(invalidate_availability, *changed))
+
+
+@receiver(post_delete, sender=Reservation)
+def release_seats_on_delete(sender, instance, **kwargs):
+    """予約の削除で確保していた座席を解放"""
+    seats = held_seats(getattr(instance, '_loaded_booking_state', None) or instance.booking_state)
+    if seats:
+        release_seats(*seats)
+        transaction.on_commit(partial(invalidate_availability, seats[0]))
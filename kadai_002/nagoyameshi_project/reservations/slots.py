@@ -0,0 +1,145 @@
+"""
+予約時間帯ごとの座席の在庫
+
+予約は開始時刻を含む30分単位の時間帯の座席を人数分確保する。店舗・日付・時間帯ごとの
+確保済みの人数を ReservationSlot に持ち、確保は「確保済みの人数 + 人数 <= 座席数」を条件にした
+1回の UPDATE で行う。条件の判定と加算がデータベースの1文の中で行われるため、
+同時に最後の席を予約しても座席数を超えて受け付けることはない。
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Reservation, ReservationSlot
+
+# 予約時間帯の長さ（分）
+SLOT_MINUTES = 30
+# 予約を受け付ける時間帯（最初と最後の時間帯の開始時刻）
+FIRST_SLOT = datetime.time(11, 0)
+LAST_SLOT = datetime.time(22, 0)
+# 何日先まで予約を受け付けるか
+BOOKING_WINDOW_DAYS = 90
+# 現在時刻からこれより後の時間帯のみ受け付ける
+MIN_LEAD_TIME = datetime.timedelta(hours=1)
+
+
+class SlotUnavailable(Exception):
+    """予約時間帯の座席が足りない"""
+
+
+def slot_start(time):
+    """時刻を含む予約時間帯の開始時刻"""
+    return datetime.time(time.hour, time.minute - time.minute % SLOT_MINUTES)
+
+
+def slot_times():
+    """予約を受け付ける時間帯の開始時刻の一覧"""
+    minutes = range(
+        FIRST_SLOT.hour * 60 + FIRST_SLOT.minute, LAST_SLOT.hour * 60 + LAST_SLOT.minute + 1, SLOT_MINUTES,
+    )
+    return [datetime.time(minute // 60, minute % 60) for minute in minutes]
+
+
+def held_seats(state):
+    """
+    予約が確保する座席
+
+    Args:
+        state: Reservation.booking_state
+    Returns:
+        (店舗ID, 予約日, 時間帯, 人数)。キャンセル済みなど座席を確保しない場合は None
+    """
+    if state is None:
+        return None
+    restaurant_id, reservation_date, reservation_time, party_size, status = state
+    if status == 'cancelled':
+        return None
+    return restaurant_id, reservation_date, slot_start(reservation_time), party_size
+
+
+def _slots(restaurant_id, reservation_date, slot_time):
+    return ReservationSlot.objects.filter(
+        restaurant_id=restaurant_id, reservation_date=reservation_date, slot_time=slot_time,
+    )
+
+
+def reserve_seats(restaurant_id, reservation_date, slot_time, seats, capacity):
+    """
+    時間帯の座席を確保する（トランザクション内で呼ぶ）
+
+    Raises:
+        SlotUnavailable: 空いている座席が人数より少ない
+    """
+    slots = _slots(restaurant_id, reservation_date, slot_time)
+    available = slots.filter(reserved_seats__lte=capacity - seats)
+    if available.update(reserved_seats=F('reserved_seats') + seats):
+        return
+    # 時間帯の行が無ければ作成してからもう一度確保する（同時に作成された場合は作成済みの行を使う）
+    ReservationSlot.objects.bulk_create(
+        [ReservationSlot(restaurant_id=restaurant_id, reservation_date=reservation_date, slot_time=slot_time)],
+        ignore_conflicts=True,
+    )
+    if not available.update(reserved_seats=F('reserved_seats') + seats):
+        raise SlotUnavailable(f'{reservation_date} {slot_time:%H:%M} の空席が{seats}名分ありません。')
+
+
+def release_seats(restaurant_id, reservation_date, slot_time, seats):
+    """時間帯の座席を解放する"""
+    slots = _slots(restaurant_id, reservation_date, slot_time)
+    if not slots.filter(reserved_seats__gte=seats).update(reserved_seats=F('reserved_seats') - seats):
+        # 集計がずれている場合（在庫の導入前のデータなど）は0にする
+        slots.update(reserved_seats=0)
+
+
+def update_seats(reservation, old_state):
+    """
+    予約の変更前後の状態の差分を座席の在庫に反映する
+
+    Returns:
+        在庫が変わった店舗IDの集合
+    """
+    old, new = held_seats(old_state), held_seats(reservation.booking_state)
+    if old == new:
+        return set()
+    if old:
+        release_seats(*old)
+    if new:
+        reserve_seats(*new, capacity=reservation.restaurant.seat_capacity)
+    return {seats[0] for seats in (old, new) if seats}
+
+
+def rebuild_reservation_slots(restaurant_ids=None, batch_size=1000):
+    """
+    キャンセル以外の予約から時間帯ごとの確保済みの人数を作り直す
+
+    Returns:
+        作成した予約時間帯の数
+    """
+    reservations = Reservation.objects.exclude(status='cancelled')
+    slots = ReservationSlot.objects.all()
+    if restaurant_ids is not None:
+        reservations = reservations.filter(restaurant_id__in=restaurant_ids)
+        slots = slots.filter(restaurant_id__in=restaurant_ids)
+
+    totals = defaultdict(int)
+    rows = (
+        reservations.order_by()
+        .values_list('restaurant_id', 'reservation_date', 'reservation_time')
+        .annotate(seats=Sum('party_size'))
+    )
+    for restaurant_id, reservation_date, reservation_time, seats in rows:
+        totals[restaurant_id, reservation_date, slot_start(reservation_time)] += seats
+
+    with transaction.atomic():
+        slots.delete()
+        ReservationSlot.objects.bulk_create(
+            [
+                ReservationSlot(restaurant_id=restaurant_id, reservation_date=reservation_date, slot_time=slot_time,
+                                reserved_seats=seats)
+                for (restaurant_id, reservation_date, slot_time), seats in totals.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(totals)
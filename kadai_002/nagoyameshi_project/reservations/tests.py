@@ -1,3 +1,164 @@
-from django.test import TestCase
+import datetime
+import threading
+import time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from categories.models import Category
+from restaurants.models import Restaurant
+from .models import Reservation, ReservationSlot
+from .slots import SlotUnavailable, rebuild_reservation_slots
+
+User = get_user_model()
+
+
+def create_restaurant(seat_capacity):
+    category = Category.objects.create(name=f'和食{Category.objects.count()}')
+    return Restaurant.objects.create(name='テスト店舗', category=category, address='名古屋市', seat_capacity=seat_capacity)
+
+
+def slot_seats(restaurant, reservation_date, slot_time):
+    """予約時間帯の確保済みの人数（行が無い場合は0）"""
+    return (
+        ReservationSlot.objects.filter(restaurant=restaurant, reservation_date=reservation_date, slot_time=slot_time)
+        .values_list('reserved_seats', flat=True).first() or 0
+    )
+
+
+class SlotBookingTests(TestCase):
+    """予約時間帯ごとの座席の在庫"""
+
+    def setUp(self):
+        self.restaurant = create_restaurant(seat_capacity=4)
+        self.user = User.objects.create_user(username='guest', email='guest@example.com')
+        self.date = timezone.localdate() + datetime.timedelta(days=7)
+
+    def reserve(self, reservation_time, party_size=2):
+        return Reservation.objects.create(
+            user=self.user, restaurant=self.restaurant, reservation_date=self.date,
+            reservation_time=reservation_time, party_size=party_size,
+        )
+
+    def test_rejects_booking_over_capacity(self):
+        """座席数を超える予約は受け付けず、在庫も変わらない"""
+        self.reserve(datetime.time(18, 0))
+        self.reserve(datetime.time(18, 0))
+        with self.assertRaises(SlotUnavailable):
+            self.reserve(datetime.time(18, 0))
+        self.assertEqual(Reservation.objects.count(), 2)
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(18, 0)), 4)
+
+    def test_times_within_a_slot_share_seats(self):
+        """同じ30分の時間帯の予約は同じ座席を使う"""
+        self.reserve(datetime.time(18, 10), party_size=3)
+        with self.assertRaises(SlotUnavailable):
+            self.reserve(datetime.time(18, 20))
+        self.reserve(datetime.time(18, 30))
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(18, 0)), 3)
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(18, 30)), 2)
+
+    def test_cancel_and_delete_release_seats(self):
+        """キャンセル・削除で座席を解放する"""
+        first = self.reserve(datetime.time(19, 0))
+        second = self.reserve(datetime.time(19, 0))
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(19, 0)), 2)
+        second.delete()
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(19, 0)), 0)
+        self.reserve(datetime.time(19, 0), party_size=4)
+
+    def test_change_moves_seats(self):
+        """人数・時間帯の変更は差分だけ在庫に反映する"""
+        reservation = self.reserve(datetime.time(12, 0))
+        reservation.party_size = 4
+        reservation.save()
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(12, 0)), 4)
+        reservation.reservation_time = datetime.time(12, 30)
+        reservation.save()
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(12, 0)), 0)
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(12, 30)), 4)
+
+    def test_failed_change_keeps_seats(self):
+        """空席の無い時間帯への変更は失敗し、元の時間帯の座席はそのまま"""
+        self.reserve(datetime.time(13, 0), party_size=4)
+        reservation = self.reserve(datetime.time(13, 30))
+        reservation.reservation_time = datetime.time(13, 0)
+        with self.assertRaises(SlotUnavailable):
+            reservation.save()
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(13, 0)), 4)
+        self.assertEqual(slot_seats(self.restaurant, self.date, datetime.time(13, 30)), 2)
+
+    def test_rebuild_matches_incremental_updates(self):
+        """作り直した在庫は予約ごとに更新した在庫と一致する"""
+        self.reserve(datetime.time(18, 0))
+        self.reserve(datetime.time(18, 15))
+        self.reserve(datetime.time(20, 0), party_size=1).delete()
+        cancelled = self.reserve(datetime.time(21, 0), party_size=3)
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        incremental = {
+            (slot.slot_time, slot.reserved_seats)
+            for slot in ReservationSlot.objects.filter(restaurant=self.restaurant) if slot.reserved_seats
+        }
+        rebuild_reservation_slots([self.restaurant.pk])
+        rebuilt = set(ReservationSlot.objects.filter(restaurant=self.restaurant).values_list('slot_time', 'reserved_seats'))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(rebuilt, {(datetime.time(18, 0), 4)})
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """複数のスレッドから同じ時間帯に同時に予約しても座席数を超えない"""
+
+    threads = 12
+    capacity = 10
+    party_size = 2
+
+    def test_concurrent_bookings_never_exceed_capacity(self):
+        restaurant = create_restaurant(seat_capacity=self.capacity)
+        users = [
+            User.objects.create_user(username=f'stress-{index}', email=f'stress-{index}@example.com')
+            for index in range(self.threads)
+        ]
+        reservation_date = timezone.localdate() + datetime.timedelta(days=30)
+        reservation_time = datetime.time(18, 0)
+        results = {'booked': 0, 'full': 0, 'error': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.threads)
+
+        def book(user):
+            barrier.wait()
+            outcome = 'error'
+            try:
+                # データベースのロック待ちで失敗した場合はやり直す（座席の判定はやり直しても変わらない）
+                for _ in range(50):
+                    try:
+                        Reservation.objects.create(
+                            user=user, restaurant=restaurant, reservation_date=reservation_date,
+                            reservation_time=reservation_time, party_size=self.party_size,
+                        )
+                        outcome = 'booked'
+                        break
+                    except SlotUnavailable:
+                        outcome = 'full'
+                        break
+                    except OperationalError:
+                        time.sleep(0.01)
+            finally:
+                connections.close_all()
+            with lock:
+                results[outcome] += 1
+
+        workers = [threading.Thread(target=book, args=(user,)) for user in users]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        expected = self.capacity // self.party_size
+        self.assertEqual(results, {'booked': expected, 'full': self.threads - expected, 'error': 0})
+        self.assertEqual(Reservation.objects.filter(restaurant=restaurant).count(), expected)
+        self.assertEqual(slot_seats(restaurant, reservation_date, reservation_time), expected * self.party_size)
@@ -2,11 +2,12 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import IntegrityError
-from django.core.paginator import Paginator
 from accounts.decorators import premium_required
 from restaurants.models import Restaurant
+from restaurants.pagination import paginate_by_cursor
 from .models import Reservation
 from .forms import ReservationCreateForm
+from .slots import SlotUnavailable
 
 
 @premium_required()
@@ -25,6 +26,8 @@ def create_reservation(request, restaurant_id):
                 reservation.save()
                 messages.success(request, f'「{restaurant.name}」のご予約を承りました。確認のご連絡をお待ちください。')
                 return redirect('reservations:detail', reservation_id=reservation.id)
+            except SlotUnavailable:
+                messages.error(request, 'ご指定の日時は満席のため予約できません。別の日時をお選びください。')
             except IntegrityError:
                 messages.error(request, '予約の作成中にエラーが発生しました。')
         else:
@@ -48,12 +51,16 @@ def create_reservation(request, restaurant_id):
 @premium_required()
 def reservation_list(request):
     """予約一覧（プレミアムユーザー限定）"""
-    reservations = Reservation.objects.filter(user=request.user).select_related('restaurant').order_by('-reservation_date', '-reservation_time')
+    # 表示する列だけを取得
+    reservations = Reservation.objects.filter(user=request.user).select_related('restaurant__category').only(
+        'id', 'reservation_date', 'reservation_time', 'party_size', 'notes', 'status', 'created_at',
+        'restaurant__id', 'restaurant__name', 'restaurant__category__name',
+    )
     
-    # ページネーション
-    paginator = Paginator(reservations, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ページネーション（(user, reservation_date, reservation_time) の索引を使ったカーソル方式）
+    page_obj = paginate_by_cursor(
+        reservations, ['-reservation_date', '-reservation_time', '-id'], 10, request.GET.get('cursor'),
+    )
     
     context = {
         'page_obj': page_obj,
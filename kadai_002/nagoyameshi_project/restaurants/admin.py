@@ -1,5 +1,17 @@
 from django.contrib import admin
-from .models import Restaurant, Favorite
+from .models import Restaurant, Favorite, OpeningPeriod
+
+
+class OpeningPeriodInline(admin.TabularInline):
+    """営業時間・定休日から解析した営業時間帯（保存時に自動で作り直すため参照のみ）"""
+    model = OpeningPeriod
+    fields = ('weekday', 'open_minute', 'close_minute')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Restaurant)
@@ -9,6 +21,7 @@ class RestaurantAdmin(admin.ModelAdmin):
     search_fields = ('name', 'address')
     ordering = ('-created_at',)
     list_editable = ('is_active',)
+    inlines = [OpeningPeriodInline]
 
 
 @admin.register(Favorite)
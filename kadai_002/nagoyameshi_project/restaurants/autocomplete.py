@@ -0,0 +1,237 @@
+"""
+検索ボックスの入力補完
+
+店舗名・カテゴリ名・エリア名（住所の区・町名）の前方一致用のキーを、
+プロセス内のソート済みリストに保持し、bisect で検索する（入力のたびにデータベースへ問い合わせない）。
+キーは全角・半角、大文字・小文字、ひらがな・カタカナの違いを吸収したもので、
+店舗名は単語の途中（「矢場とん 本店」の「本店」）やふりがなからでも一致する。
+
+店舗・カテゴリの変更はシグナルからキャッシュ上の変更履歴に記録する。各プロセスは一定間隔で
+履歴を確認し、変更された店舗・カテゴリの分だけリストを差し替える（履歴が欠けていれば作り直す）。
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from categories.models import Category
+from .models import Restaurant
+from .text import normalize_text, prefix_key
+
+CHANGE_VERSION_KEY = 'restaurants:autocomplete:version'
+CHANGE_LOG_KEY = 'restaurants:autocomplete:change:{}'
+# 変更履歴を保持する秒数と、差分で追いつく変更件数の上限（超えたら作り直す）
+CHANGE_LOG_TIMEOUT = 60 * 60 * 24
+MAX_INCREMENTAL_CHANGES = 200
+# 1回の検索で確認するキーの上限
+MAX_SCAN = 500
+
+# 候補の種類（表示順）
+KIND_CATEGORY = 0
+KIND_AREA = 1
+KIND_RESTAURANT = 2
+KIND_NAMES = {KIND_CATEGORY: 'category', KIND_AREA: 'area', KIND_RESTAURANT: 'restaurant'}
+
+# 住所から市・区と町名を取り出す（例: 愛知県名古屋市中区栄3-1-1 → 中区, 中区栄）
+AREA_PATTERN = re.compile(
+    r'(?:[^都道府県]{2,3}[都道府県])?(?P<city>[^市]+市)?(?P<ward>[^区]+区)?(?P<town>[^\d\s\-]*)'
+)
+CHOME_PATTERN = re.compile(r'[一二三四五六七八九十]+丁目.*$')
+
+
+def address_areas(address):
+    """住所から補完候補にするエリア名の一覧を返す"""
+    match = AREA_PATTERN.match(unicodedata.normalize('NFKC', address or '').replace(' ', ''))
+    area = match and (match['ward'] or match['city'])
+    if not area:
+        return []
+    town = CHOME_PATTERN.sub('', match['town'])
+    return [area, area + town] if town else [area]
+
+
+def _name_keys(name):
+    """名前と、その各単語から始まる部分のキー"""
+    words = normalize_text(name).split()
+    return {prefix_key(' '.join(words[index:])) for index in range(len(words))} - {''}
+
+
+class PrefixIndex:
+    """(キー, 種類, 表示名, ID) のソート済みリストによる前方一致の索引"""
+
+    def __init__(self):
+        self.entries = []
+        # 店舗・カテゴリごとに登録したエントリ（差し替え用。店舗は住所も保持）
+        self.sources = {}
+        # エリア名ごとの店舗数（0になったら候補から外す）
+        self.area_counts = {}
+        self.version = 0
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def build(self, version):
+        """データベースから作り直す"""
+        entries, sources, area_counts = [], {}, {}
+        for category in Category.objects.only('id', 'name').iterator():
+            sources[('category', category.pk)] = self._category_entries(category)
+        restaurants = Restaurant.objects.filter(is_active=True).only('id', 'name', 'name_kana', 'address')
+        for restaurant in restaurants.iterator(chunk_size=2000):
+            sources[('restaurant', restaurant.pk)] = (self._restaurant_entries(restaurant), restaurant.address)
+            for area in address_areas(restaurant.address):
+                area_counts[area] = area_counts.get(area, 0) + 1
+        for (kind, _), source in sources.items():
+            entries.extend(source[0] if kind == 'restaurant' else source)
+        entries.extend(entry for area in area_counts for entry in self._area_entries(area))
+        entries.sort()
+        with self.lock:
+            self.entries, self.sources, self.area_counts = entries, sources, area_counts
+            self.version = version
+
+    def _category_entries(self, category):
+        return [(key, KIND_CATEGORY, category.name, category.pk) for key in _name_keys(category.name)]
+
+    def _restaurant_entries(self, restaurant):
+        # ふりがなでも一致するようにする
+        keys = _name_keys(restaurant.name) | _name_keys(restaurant.name_kana)
+        return [(key, KIND_RESTAURANT, restaurant.name, restaurant.pk) for key in keys]
+
+    def _area_entries(self, area):
+        return [(prefix_key(area), KIND_AREA, area, None)]
+
+    def _insert(self, entries):
+        for entry in entries:
+            insort(self.entries, entry)
+
+    def _remove(self, entries):
+        for entry in entries:
+            index = bisect_left(self.entries, entry)
+            if index < len(self.entries) and self.entries[index] == entry:
+                del self.entries[index]
+
+    def _change_areas(self, address, delta):
+        for area in address_areas(address):
+            count = self.area_counts.get(area, 0) + delta
+            if count > 0:
+                if area not in self.area_counts:
+                    self._insert(self._area_entries(area))
+                self.area_counts[area] = count
+            elif area in self.area_counts:
+                del self.area_counts[area]
+                self._remove(self._area_entries(area))
+
+    def apply(self, kind, ids, version):
+        """変更された店舗・カテゴリのエントリを差し替える"""
+        if kind == 'category':
+            objects = {category.pk: category for category in Category.objects.filter(pk__in=ids).only('id', 'name')}
+        else:
+            objects = {
+                restaurant.pk: restaurant
+                for restaurant in Restaurant.objects.filter(pk__in=ids, is_active=True).only('id', 'name', 'name_kana', 'address')
+            }
+        with self.lock:
+            for pk in ids:
+                old = self.sources.pop((kind, pk), None)
+                if old:
+                    self._remove(old[0] if kind == 'restaurant' else old)
+                    if kind == 'restaurant':
+                        self._change_areas(old[1], -1)
+                obj = objects.get(pk)
+                if obj is None:
+                    continue
+                if kind == 'category':
+                    new = self._category_entries(obj)
+                    self.sources[(kind, pk)] = new
+                else:
+                    new = self._restaurant_entries(obj)
+                    self.sources[(kind, pk)] = (new, obj.address)
+                    self._change_areas(obj.address, 1)
+                self._insert(new)
+            self.version = max(self.version, version)
+
+    def lookup(self, query, limit=10):
+        """前方一致する候補を種類順に返す"""
+        key = prefix_key(query)
+        if not key:
+            return []
+        entries = self.entries
+        index = bisect_left(entries, (key,))
+        # 同じ名前の店舗（チェーン店など）は1件にまとめる
+        found = {}
+        for entry in entries[index:index + MAX_SCAN]:
+            if not entry[0].startswith(key):
+                break
+            found.setdefault((entry[1], entry[2]), set()).add(entry[3])
+        # 種類順、同じ種類では短い（入力に近い）名前を優先する
+        ranked = sorted(found, key=lambda item: (item[0], len(item[1]), item[1]))
+        return [
+            {'type': KIND_NAMES[kind], 'id': next(iter(ids)) if len(ids) == 1 else None, 'label': label}
+            for kind, label in ranked[:limit]
+            for ids in [found[kind, label]]
+        ]
+
+
+_index = PrefixIndex()
+
+
+def _get_change_version():
+    version = cache.get(CHANGE_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(CHANGE_VERSION_KEY, version, None)
+    return version
+
+
+def record_change(kind, pk):
+    """
+    店舗・カテゴリの変更を記録する（シグナルから呼ぶ）
+
+    他のプロセスが確定前の行を読んで変更を取りこぼしたり、ロールバックされた変更が
+    索引に残ったりしないよう、トランザクションの確定後に記録する。
+    """
+    transaction.on_commit(partial(_record_change, kind, pk))
+
+
+def _record_change(kind, pk):
+    try:
+        version = cache.incr(CHANGE_VERSION_KEY)
+    except ValueError:
+        cache.add(CHANGE_VERSION_KEY, 1, None)
+        version = cache.incr(CHANGE_VERSION_KEY)
+    cache.set(CHANGE_LOG_KEY.format(version), (kind, pk), CHANGE_LOG_TIMEOUT)
+    # このプロセスの索引が最新なら、次の確認を待たずに反映する
+    if _index.version and _index.version == version - 1:
+        _index.apply(kind, [pk], version)
+
+
+def get_index():
+    """最新の状態に追いついた索引を返す"""
+    now = time.monotonic()
+    if _index.version and now - _index.checked_at < settings.AUTOCOMPLETE_SYNC_INTERVAL:
+        return _index
+    _index.checked_at = now
+    version = _get_change_version()
+    if not _index.version or version - _index.version > MAX_INCREMENTAL_CHANGES:
+        _index.build(version)
+    elif version > _index.version:
+        keys = [CHANGE_LOG_KEY.format(number) for number in range(_index.version + 1, version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            # 履歴が欠けている場合は作り直す
+            _index.build(version)
+        else:
+            changed = {}
+            for kind, pk in changes.values():
+                changed.setdefault(kind, set()).add(pk)
+            for kind, ids in changed.items():
+                _index.apply(kind, sorted(ids), version)
+    return _index
+
+
+def suggest(query, limit=10):
+    """入力中の文字列に対する補完候補"""
+    return get_index().lookup(query, limit)
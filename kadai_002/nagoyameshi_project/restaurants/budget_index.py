@@ -0,0 +1,58 @@
+"""
+予算の範囲検索（区間の重なり判定）用の索引
+
+予算の重なり条件 budget_max >= X AND budget_min <= Y は、どちらの列の索引を使っても
+片側しか絞れず、店舗が増えると走査する行数がほぼ全件に近づく。
+
+そこで予算の幅（budget_max - budget_min）を 2 のべき乗ごとの階級（budget_span_class）に分け、
+(is_active, budget_span_class, budget_min) の複合索引を作る。階級 k の店舗は幅が 2^k 未満なので、
+budget_max >= X なら budget_min > X - 2^k が成り立つ。階級ごとに budget_min の範囲検索を
+OR でつなげば、索引の範囲だけを読んで重なる店舗の候補を得られる（最後に元の条件で確定する）。
+"""
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .facets import budget_overlap_q
+
+# 幅が 2^MAX_SPAN_CLASS 円（約13万円）以上の店舗はまとめて最上位の階級に入れる
+MAX_SPAN_CLASS = 17
+OVERFLOW_SPAN_CLASS = MAX_SPAN_CLASS + 1
+
+
+def budget_span_class_expression():
+    """予算の幅の階級を求める式（生成列の定義に使う）"""
+    # 符号なし整数の引き算を避けるため budget_max < budget_min + 2^k の形で判定する
+    return Case(
+        When(budget_max__lte=F('budget_min'), then=Value(0)),
+        *[
+            When(budget_max__lt=F('budget_min') + Value(2 ** span_class), then=Value(span_class))
+            for span_class in range(1, MAX_SPAN_CLASS + 1)
+        ],
+        default=Value(OVERFLOW_SPAN_CLASS),
+        output_field=IntegerField(),
+    )
+
+
+def budget_span_class(budget_min, budget_max):
+    """予算の幅の階級（budget_span_class_expression と同じ計算）"""
+    span = budget_max - budget_min
+    if span <= 0:
+        return 0
+    return min(span.bit_length(), OVERFLOW_SPAN_CLASS)
+
+
+def budget_overlap_filter(budget_min=None, budget_max=None):
+    """予算の範囲 [budget_min, budget_max] と重なる店舗の条件（複合索引を使う形）"""
+    condition = budget_overlap_q(budget_min, budget_max)
+    if budget_min is None and budget_max is None:
+        return condition
+
+    candidates = Q()
+    for span_class in range(OVERFLOW_SPAN_CLASS + 1):
+        bounds = Q(budget_span_class=span_class)
+        if budget_min is not None and span_class < OVERFLOW_SPAN_CLASS:
+            # 階級 k の幅は 2^k - 1 以下（階級0は0以下）
+            bounds &= Q(budget_min__gte=budget_min - (2 ** span_class - 1 if span_class else 0))
+        if budget_max is not None:
+            bounds &= Q(budget_min__lte=budget_max)
+        candidates |= bounds
+    return candidates & condition
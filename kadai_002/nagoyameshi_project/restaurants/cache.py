@@ -0,0 +1,65 @@
+"""
+店舗カタログのキャッシュ
+
+店舗・カテゴリ・評価集計が変わるたびに「カタログの版番号」を更新し、
+キャッシュキーに版番号を含めることで古い検索結果を自動的に使わなくする
+（個別のキーを削除して回る必要がない）。
+"""
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+CATALOGUE_VERSION_KEY = 'restaurants:catalogue:version'
+SEARCH_CACHE_HITS_KEY = 'restaurants:search:hits'
+SEARCH_CACHE_MISSES_KEY = 'restaurants:search:misses'
+
+
+def _incr(key):
+    """キーが無ければ作成してから1加算する"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def get_catalogue_version():
+    """現在のカタログの版番号を返す"""
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(CATALOGUE_VERSION_KEY, version, None)
+    return version
+
+
+def bump_catalogue_version():
+    """カタログの版番号を更新し、版番号付きのキャッシュをすべて無効にする"""
+    return _incr(CATALOGUE_VERSION_KEY)
+
+
+def catalogue_cache_key(prefix, params=None):
+    """カタログの版番号と正規化済みパラメータからキャッシュキーを作成する"""
+    key = f'restaurants:{prefix}:v{get_catalogue_version()}'
+    if params:
+        query = urlencode(sorted((name, value) for name, value in params.items() if value not in ('', None)))
+        key += ':' + md5(query.encode()).hexdigest()
+    return key
+
+
+def record_search_cache_hit(hit):
+    """検索結果キャッシュのヒット・ミスを記録する"""
+    _incr(SEARCH_CACHE_HITS_KEY if hit else SEARCH_CACHE_MISSES_KEY)
+
+
+def get_search_cache_stats():
+    """監視用の検索結果キャッシュの統計"""
+    hits = cache.get(SEARCH_CACHE_HITS_KEY, 0)
+    misses = cache.get(SEARCH_CACHE_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total * 100, 1) if total else 0,
+        'catalogue_version': get_catalogue_version(),
+    }
@@ -0,0 +1,292 @@
+"""
+店舗の内容（店舗名・説明・カテゴリ）による似ている店舗
+
+正規化済みの検索用の列（search_name, search_description）を文字バイグラムに分け、
+カテゴリを1つの語として加えた TF-IDF ベクトル（L2 正規化）のコサイン類似度で近傍を求める。
+お気に入りやレビューがまだ無い店舗でも「似ている店舗」を表示するために使う。
+
+ベクトルは重みの大きい語だけを ContentFeature に保存し、同じ語を持つ店舗だけを候補にする
+（多くの店舗に出現する語は候補探しに使わない）。IDF の元になる語ごとの出現店舗数
+（ContentTerm）は全件の作り直し（rebuild_content_similarity コマンド）で求め、
+店舗の保存時はその店舗のベクトルと近傍、およびその店舗が近傍に入る・外れる店舗の一覧だけを
+更新する（全店舗の再計算はしない）。更新は内容（店舗名・説明・カテゴリ・公開状態）が変わった
+場合だけ、トランザクションの確定後にまとめて行う。CSV の一括登録などでは保存ごとの更新を止め、
+最後に全件を作り直す。
+"""
+import heapq
+import math
+import threading
+from array import array
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import transaction
+
+from .models import ContentFeature, ContentTerm, Restaurant, SimilarRestaurant
+from .similarity import TOP_K, mark_updated
+from .text import bigrams
+
+# 店舗ごとに保存する語の数
+MAX_FEATURES = 64
+# 店舗名・カテゴリの語は説明の語の何倍に数えるか
+NAME_WEIGHT = 2
+# これより多くの割合の店舗に出現する語は候補探しに使わない（「名古」「屋市」など）
+MAX_DOCUMENT_RATIO = 0.2
+
+CONTENT = SimilarRestaurant.SOURCE_CONTENT
+
+# 一括登録中は店舗ごとの更新を止め、最後にまとめて作り直す
+_suspended = ContextVar('content_refresh_suspended', default=False)
+# トランザクションの確定後に更新する店舗ID（スレッドごと）
+_pending = threading.local()
+
+
+@contextmanager
+def suspend_content_refresh():
+    """この中で保存した店舗は内容による似ている店舗を更新しない（呼び出し側で作り直すこと）"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def content_refresh_suspended():
+    return _suspended.get()
+
+
+def document_terms(restaurant):
+    """店舗の語ごとの出現回数"""
+    counts = Counter()
+    for term in bigrams(restaurant.search_name, for_query=True):
+        counts[term] += NAME_WEIGHT
+    for term in bigrams(restaurant.search_description, for_query=True):
+        counts[term] += 1
+    counts[f'category:{restaurant.category_id}'] += NAME_WEIGHT
+    return counts
+
+
+def vectorize(counts, document_counts, total):
+    """語ごとの出現回数を、重みの大きい語に絞った TF-IDF ベクトル（L2 正規化）にする"""
+    weights = {
+        term: (1 + math.log(count)) * (math.log((1 + total) / (1 + max(document_counts.get(term, 0), 1))) + 1)
+        for term, count in counts.items()
+    }
+    top = heapq.nlargest(MAX_FEATURES, weights.items(), key=lambda item: (item[1], item[0]))
+    norm = math.sqrt(sum(weight * weight for _, weight in top))
+    return {term: weight / norm for term, weight in top} if norm else {}
+
+
+def _top_neighbors(scores, top_k):
+    """{店舗ID: 類似度} から類似度の高い順に (類似度, 店舗ID) を top_k 件"""
+    return heapq.nlargest(top_k, ((score, restaurant_id) for restaurant_id, score in scores.items()),
+                          key=lambda item: (item[0], -item[1]))
+
+
+def _similar_ids(neighbors):
+    return [similar_id for _, similar_id in neighbors]
+
+
+def _neighbor_rows(restaurant_id, neighbors):
+    return [
+        SimilarRestaurant(restaurant_id=restaurant_id, similar_id=similar_id, score=score, rank=rank, source=CONTENT)
+        for rank, (score, similar_id) in enumerate(neighbors, start=1)
+    ]
+
+
+def _active_restaurants():
+    return Restaurant.objects.filter(is_active=True).only('id', 'search_name', 'search_description', 'category_id')
+
+
+def rebuild_content_similarity(top_k=TOP_K, batch_size=1000):
+    """
+    全店舗の語彙・特徴量・内容による近傍を作り直す
+
+    Returns:
+        (対象の店舗数, 保存した近傍の行数)
+    """
+    restaurants = _active_restaurants().order_by('pk')
+
+    # 1回目: 語ごとの出現店舗数
+    document_counts = Counter()
+    total = 0
+    for restaurant in restaurants.iterator(chunk_size=batch_size):
+        document_counts.update(document_terms(restaurant).keys())
+        total += 1
+
+    # 2回目: 店舗ごとのベクトル（語は番号にして配列で持つ）
+    term_ids = {term: index for index, term in enumerate(document_counts)}
+    terms = list(document_counts)
+    restaurant_ids = array('q')
+    vectors = []
+    for restaurant in restaurants.iterator(chunk_size=batch_size):
+        vector = vectorize(document_terms(restaurant), document_counts, total)
+        restaurant_ids.append(restaurant.id)
+        vectors.append((array('l', (term_ids[term] for term in vector)), array('d', vector.values())))
+
+    # 転置索引（語 → その語を持つ店舗と重み）。多くの店舗に出現する語は除く
+    max_documents = max(total * MAX_DOCUMENT_RATIO, 1)
+    postings = defaultdict(list)
+    for index, (vector_terms, vector_weights) in enumerate(vectors):
+        for term_id, weight in zip(vector_terms, vector_weights):
+            if document_counts[terms[term_id]] <= max_documents:
+                postings[term_id].append((index, weight))
+
+    count = 0
+    with transaction.atomic():
+        ContentTerm.objects.all().delete()
+        ContentTerm.objects.bulk_create(
+            [ContentTerm(term=term, document_count=document_count) for term, document_count in document_counts.items()],
+            batch_size=batch_size,
+        )
+        ContentFeature.objects.all().delete()
+        SimilarRestaurant.objects.filter(source=CONTENT).delete()
+
+        features = []
+        rows = []
+        for index, (vector_terms, vector_weights) in enumerate(vectors):
+            restaurant_id = restaurant_ids[index]
+            features.extend(
+                ContentFeature(restaurant_id=restaurant_id, term=terms[term_id], weight=weight)
+                for term_id, weight in zip(vector_terms, vector_weights)
+            )
+            scores = defaultdict(float)
+            for term_id, weight in zip(vector_terms, vector_weights):
+                for other, other_weight in postings.get(term_id, ()):
+                    if other != index:
+                        scores[restaurant_ids[other]] += weight * other_weight
+            rows.extend(_neighbor_rows(restaurant_id, _top_neighbors(scores, top_k)))
+            if len(features) >= batch_size:
+                ContentFeature.objects.bulk_create(features)
+                features = []
+            if len(rows) >= batch_size:
+                SimilarRestaurant.objects.bulk_create(rows)
+                count += len(rows)
+                rows = []
+        ContentFeature.objects.bulk_create(features)
+        SimilarRestaurant.objects.bulk_create(rows)
+        count += len(rows)
+        transaction.on_commit(mark_updated)
+    return total, count
+
+
+def _pending_ids():
+    if not hasattr(_pending, 'ids'):
+        _pending.ids = set()
+    return _pending.ids
+
+
+def schedule_refresh(restaurant_id):
+    """
+    店舗の特徴量と内容による近傍の更新を予約する（店舗の保存時に呼ぶ）
+
+    同じトランザクションで保存した店舗は確定後にまとめて更新する。
+    """
+    _pending_ids().add(restaurant_id)
+    transaction.on_commit(_refresh_pending)
+
+
+def _refresh_pending():
+    ids = _pending_ids()
+    if ids:
+        restaurant_ids = list(ids)
+        ids.clear()
+        refresh_restaurants(restaurant_ids)
+
+
+def refresh_restaurants(restaurant_ids, top_k=TOP_K):
+    """複数の店舗の特徴量と内容による近傍を更新する（公開中の店舗数は1回だけ数える）"""
+    restaurants = Restaurant.objects.filter(pk__in=restaurant_ids).only(
+        'id', 'search_name', 'search_description', 'category_id', 'is_active',
+    ).order_by('pk')
+    total = Restaurant.objects.filter(is_active=True).count()
+    for restaurant in restaurants:
+        refresh_restaurant(restaurant, top_k, total=total)
+
+
+def refresh_restaurant(restaurant, top_k=TOP_K, total=None):
+    """
+    1店舗の特徴量と内容による近傍を更新する
+
+    その店舗の近傍に加えて、その店舗と同じ語を持つ店舗・その店舗を近傍に含む店舗の一覧も
+    新しい類似度で並べ直す。語彙（IDF）は全件の作り直し時点の値を使い、
+    この店舗が外れて件数が減った一覧は次回の全件の作り直しで補う。
+    詳細ページの表示の更新日時は、一覧が変わった店舗と、内容（語）が変わった場合は
+    この店舗を一覧に含む店舗にだけ記録する。
+    """
+    with transaction.atomic():
+        old_terms = set(ContentFeature.objects.filter(restaurant=restaurant).values_list('term', flat=True))
+        old_neighbors = list(
+            SimilarRestaurant.objects.filter(restaurant=restaurant, source=CONTENT)
+            .order_by('rank').values_list('score', 'similar_id')
+        )
+        # この店舗を表示している一覧（共起による近傍も含む）
+        listing = set(SimilarRestaurant.objects.filter(similar=restaurant).values_list('restaurant_id', flat=True))
+        ContentFeature.objects.filter(restaurant=restaurant).delete()
+        SimilarRestaurant.objects.filter(restaurant=restaurant, source=CONTENT).delete()
+
+        scores = {}
+        vector = {}
+        own_neighbors = []
+        if restaurant.is_active:
+            counts = document_terms(restaurant)
+            document_counts = dict(ContentTerm.objects.filter(term__in=counts).values_list('term', 'document_count'))
+            if total is None:
+                total = Restaurant.objects.filter(is_active=True).count()
+            vector = vectorize(counts, document_counts, total)
+            ContentFeature.objects.bulk_create([
+                ContentFeature(restaurant=restaurant, term=term, weight=weight) for term, weight in vector.items()
+            ])
+
+            # 同じ語を持つ店舗との類似度
+            max_documents = max(total * MAX_DOCUMENT_RATIO, 1)
+            lookup_terms = [term for term in vector if document_counts.get(term, 1) <= max_documents]
+            postings = (
+                ContentFeature.objects
+                .filter(term__in=lookup_terms, restaurant__is_active=True)
+                .exclude(restaurant=restaurant)
+                .values_list('restaurant_id', 'term', 'weight')
+            )
+            scores = defaultdict(float)
+            for restaurant_id, term, weight in postings:
+                scores[restaurant_id] += vector[term] * weight
+            own_neighbors = _top_neighbors(scores, top_k)
+            SimilarRestaurant.objects.bulk_create(_neighbor_rows(restaurant.pk, own_neighbors))
+
+        # この店舗が近傍に入る・外れる店舗の一覧を並べ直す
+        containing = SimilarRestaurant.objects.filter(similar=restaurant, source=CONTENT).values_list('restaurant_id', flat=True)
+        affected = set(scores) | set(containing)
+        current = defaultdict(list)
+        for restaurant_id, similar_id, score in (
+            SimilarRestaurant.objects.filter(restaurant_id__in=affected, source=CONTENT)
+            .order_by('rank').values_list('restaurant_id', 'similar_id', 'score')
+        ):
+            current[restaurant_id].append((score, similar_id))
+
+        changed = {}
+        for restaurant_id in affected:
+            entries = {similar_id: score for score, similar_id in current[restaurant_id] if similar_id != restaurant.pk}
+            if restaurant_id in scores:
+                entries[restaurant.pk] = scores[restaurant_id]
+            neighbors = _top_neighbors(entries, top_k)
+            if neighbors != current[restaurant_id]:
+                changed[restaurant_id] = neighbors
+        if changed:
+            SimilarRestaurant.objects.filter(restaurant_id__in=changed, source=CONTENT).delete()
+            SimilarRestaurant.objects.bulk_create([
+                row for restaurant_id, neighbors in changed.items() for row in _neighbor_rows(restaurant_id, neighbors)
+            ])
+
+        # 表示に関わるのは並び順だけなので、類似度の誤差程度の違いでは更新日時を記録しない
+        updated = {
+            restaurant_id for restaurant_id, neighbors in changed.items()
+            if _similar_ids(neighbors) != _similar_ids(current[restaurant_id])
+        }
+        if _similar_ids(own_neighbors) != _similar_ids(old_neighbors):
+            updated.add(restaurant.pk)
+        if set(vector) != old_terms:
+            updated |= listing
+        if updated:
+            transaction.on_commit(partial(mark_updated, updated))
@@ -0,0 +1,63 @@
+"""
+検索画面の絞り込み件数（ファセット）
+
+カテゴリ別・予算帯別の件数を、カテゴリで GROUP BY した1回の集計クエリで求める。
+各行に「現在の予算条件に合う件数」と「予算帯ごとの件数」を条件付き COUNT で持たせ、
+カテゴリの件数は予算条件込み、予算帯の件数は選択中のカテゴリ内で合算する。
+"""
+from django.db.models import Count, Q
+
+# 予算帯（表示名, 下限, 上限）。店舗の予算の範囲が重なれば該当とする
+BUDGET_BUCKETS = [
+    ('〜1,000円', None, 1000),
+    ('1,000〜2,000円', 1000, 2000),
+    ('2,000〜3,000円', 2000, 3000),
+    ('3,000〜5,000円', 3000, 5000),
+    ('5,000円〜', 5000, None),
+]
+
+
+def budget_overlap_q(budget_min=None, budget_max=None):
+    """予算の範囲 [budget_min, budget_max] と重なる店舗の条件"""
+    condition = Q()
+    if budget_min is not None:
+        condition &= Q(budget_max__gte=budget_min)
+    if budget_max is not None:
+        condition &= Q(budget_min__lte=budget_max)
+    return condition
+
+
+def compute_facets(queryset, category_id=None, budget_min=None, budget_max=None):
+    """
+    カテゴリ別・予算帯別の件数を返す
+
+    Args:
+        queryset: カテゴリ・予算以外の条件（キーワード等）で絞り込んだクエリセット
+        category_id: 選択中のカテゴリ（予算帯の件数に適用）
+        budget_min, budget_max: 選択中の予算（カテゴリの件数に適用）
+    """
+    bucket_counts = {
+        f'bucket_{index}': Count('id', filter=budget_overlap_q(low, high))
+        for index, (_, low, high) in enumerate(BUDGET_BUCKETS)
+    }
+    rows = (
+        queryset.order_by()
+        .values('category_id')
+        .annotate(matched=Count('id', filter=budget_overlap_q(budget_min, budget_max)), **bucket_counts)
+    )
+
+    categories = {}
+    budgets = [0] * len(BUDGET_BUCKETS)
+    for row in rows:
+        categories[row['category_id']] = row['matched']
+        if category_id is None or row['category_id'] == category_id:
+            for index in range(len(BUDGET_BUCKETS)):
+                budgets[index] += row[f'bucket_{index}']
+
+    return {
+        'categories': categories,
+        'budgets': [
+            {'label': label, 'budget_min': low, 'budget_max': high, 'count': budgets[index]}
+            for index, (label, low, high) in enumerate(BUDGET_BUCKETS)
+        ],
+    }
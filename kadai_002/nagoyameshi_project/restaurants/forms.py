@@ -15,6 +15,16 @@ class RestaurantCreateForm(forms.ModelForm):
         })
     )
     
+    name_kana = forms.CharField(
+        label='店舗名（ふりがな）',
+        max_length=100,
+        required=False,
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'ひらがなまたはカタカナで入力してください（検索に使用します）'
+        })
+    )
+    
     description = forms.CharField(
         label='店舗説明',
         required=False,
@@ -125,7 +135,7 @@ class RestaurantCreateForm(forms.ModelForm):
     class Meta:
         model = Restaurant
         fields = [
-            'name', 'description', 'category', 'image', 'postal_code', 'address', 
+            'name', 'name_kana', 'description', 'category', 'image', 'postal_code', 'address', 
             'phone_number', 'opening_hours', 'closed_days', 
             'budget_min', 'budget_max', 'website_url'
         ]
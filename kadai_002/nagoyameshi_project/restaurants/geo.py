@@ -0,0 +1,112 @@
+"""
+位置情報（緯度経度）による店舗検索
+
+住所の緯度経度は同梱の郵便番号代表点データ（data/postal_code_centroids.csv）から
+オフラインで求める（7桁で見つからなければ上3桁の地域の代表点を使う）。
+
+検索は緯度経度を 0.01 度四方のグリッドに区切ったセル番号（geo_cell）の索引を使い、
+範囲に掛かるセルの店舗だけを候補にしてから距離で絞り込む。
+距離は数km程度なら誤差の小さい正距円筒図法の近似で計算する。
+"""
+import csv
+import math
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+from django.db.models import ExpressionWrapper, F, FloatField, Value
+from django.db.models.functions import Sqrt
+
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+
+# グリッドの1セルの大きさ（度）。名古屋付近で南北約1.1km、東西約0.9km
+CELL_SIZE = 0.01
+LNG_CELLS = int(360 / CELL_SIZE)
+
+# 緯度・経度1度あたりの距離（km）
+KM_PER_LAT_DEGREE = 110.574
+KM_PER_LNG_DEGREE_AT_EQUATOR = 111.320
+
+# 半径検索の上限（km）。候補セルが増えすぎないようにする
+MAX_RADIUS_KM = 10
+# これより多くのセルに掛かる矩形検索はセル索引を使わない
+MAX_BBOX_CELLS = 2500
+
+
+@lru_cache(maxsize=None)
+def _postal_code_centroids():
+    with open(DATA_DIR / 'postal_code_centroids.csv', encoding='utf-8') as f:
+        return {
+            row['postal_code']: (float(row['latitude']), float(row['longitude']))
+            for row in csv.DictReader(f)
+        }
+
+
+@lru_cache(maxsize=None)
+def stations():
+    """駅名と緯度経度の一覧"""
+    with open(DATA_DIR / 'stations.csv', encoding='utf-8') as f:
+        return {row['name']: (float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(f)}
+
+
+def geocode_postal_code(postal_code):
+    """郵便番号から代表点の (緯度, 経度) を返す。分からない場合は None"""
+    digits = ''.join(ch for ch in unicodedata.normalize('NFKC', postal_code or '') if ch.isdigit())
+    centroids = _postal_code_centroids()
+    if len(digits) == 7 and digits in centroids:
+        return centroids[digits]
+    return centroids.get(digits[:3]) if len(digits) >= 3 else None
+
+
+def grid_cell(latitude, longitude):
+    """緯度経度が属するグリッドのセル番号"""
+    lat_index = math.floor((latitude + 90) / CELL_SIZE)
+    lng_index = math.floor((longitude + 180) / CELL_SIZE)
+    return lat_index * LNG_CELLS + lng_index
+
+
+def cells_in_bbox(south, west, north, east):
+    """矩形に掛かるセル番号の一覧"""
+    south_index = math.floor((south + 90) / CELL_SIZE)
+    north_index = math.floor((north + 90) / CELL_SIZE)
+    west_index = math.floor((west + 180) / CELL_SIZE)
+    east_index = math.floor((east + 180) / CELL_SIZE)
+    return [
+        lat_index * LNG_CELLS + lng_index
+        for lat_index in range(south_index, north_index + 1)
+        for lng_index in range(west_index, east_index + 1)
+    ]
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """中心から半径 radius_km の円を囲む矩形 (南, 西, 北, 東)"""
+    lat_delta = radius_km / KM_PER_LAT_DEGREE
+    lng_delta = radius_km / (KM_PER_LNG_DEGREE_AT_EQUATOR * math.cos(math.radians(latitude)))
+    return latitude - lat_delta, longitude - lng_delta, latitude + lat_delta, longitude + lng_delta
+
+
+def within_bbox(queryset, south, west, north, east):
+    """矩形内の店舗に絞り込む（候補セルの索引を使う）"""
+    queryset = queryset.filter(
+        latitude__gte=south, latitude__lte=north,
+        longitude__gte=west, longitude__lte=east,
+    )
+    cells = cells_in_bbox(south, west, north, east)
+    if len(cells) <= MAX_BBOX_CELLS:
+        queryset = queryset.filter(geo_cell__in=cells)
+    return queryset
+
+
+def distance_expression(latitude, longitude):
+    """中心からの距離（km）を求める式（正距円筒図法による近似）"""
+    km_per_lng_degree = KM_PER_LNG_DEGREE_AT_EQUATOR * math.cos(math.radians(latitude))
+    dy = (F('latitude') - Value(latitude)) * Value(KM_PER_LAT_DEGREE)
+    dx = (F('longitude') - Value(longitude)) * Value(km_per_lng_degree)
+    return ExpressionWrapper(Sqrt(dy * dy + dx * dx), output_field=FloatField())
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """中心から半径 radius_km 以内の店舗に絞り込み、距離を distance_km として付与する"""
+    radius_km = min(radius_km, MAX_RADIUS_KM)
+    queryset = within_bbox(queryset, *bbox_around(latitude, longitude, radius_km))
+    return queryset.annotate(distance_km=distance_expression(latitude, longitude)).filter(distance_km__lte=radius_km)
@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from categories.models import Category
+from restaurants.budget_index import budget_overlap_filter
+from restaurants.facets import budget_overlap_q
+from restaurants.models import Restaurant
+
+# ダミー店舗の予算下限の上限（円）。1条件あたりの該当件数が全体の数%になるようにする
+MAX_BUDGET = 200000
+
+
+class Command(BaseCommand):
+    help = (
+        '予算の範囲検索について、従来の条件と予算幅の階級の索引を使う条件の速度と結果を比較します。'
+        'ダミーの店舗はトランザクション内で作成し、終了時にロールバックします。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='比較する店舗数（複数指定可）',
+        )
+        parser.add_argument('--queries', type=int, default=50, help='比較する予算条件の数')
+        parser.add_argument('--batch-size', type=int, default=5000, help='ダミー店舗の一括作成件数')
+        parser.add_argument('--seed', type=int, default=1, help='乱数の種')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        ranges = [self.random_range(rng) for _ in range(options['queries'])]
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.create_dummy_restaurants(rng, size, options['batch_size'])
+                self.benchmark(size, ranges)
+                transaction.set_rollback(True)
+
+    def random_range(self, rng):
+        """検索条件（片側だけの条件は該当件数が多く索引の効果がないため両側を指定する）"""
+        low = rng.randrange(0, MAX_BUDGET, 500)
+        return low, low + rng.randrange(500, 3000, 500)
+
+    def create_dummy_restaurants(self, rng, size, batch_size):
+        category = Category.objects.first() or Category.objects.create(name='ベンチマーク')
+        for start in range(0, size, batch_size):
+            restaurants = []
+            for i in range(start, min(start + batch_size, size)):
+                budget_min = rng.randrange(0, MAX_BUDGET, 100)
+                # 大半は数千円の幅、一部は幅が広い店舗や幅なしの店舗にする
+                span = rng.choice([0, rng.randrange(100, 3000, 100), rng.randrange(100, 3000, 100), rng.randrange(0, 50000, 100)])
+                restaurants.append(Restaurant(
+                    name=f'ベンチマーク店舗{i}',
+                    address='愛知県名古屋市中区栄',
+                    category=category,
+                    budget_min=budget_min,
+                    budget_max=budget_min + span,
+                ))
+            Restaurant.objects.bulk_create(restaurants, batch_size=batch_size)
+        with connection.cursor() as cursor:
+            # 統計情報を更新して実行計画を実運用に近づける
+            cursor.execute('ANALYZE' if connection.vendor == 'sqlite' else f'ANALYZE TABLE {Restaurant._meta.db_table}')
+
+    def run(self, condition_factory, ranges):
+        timings, results = [], []
+        for budget_min, budget_max in ranges:
+            queryset = Restaurant.objects.filter(is_active=True).filter(condition_factory(budget_min, budget_max))
+            started = time.perf_counter()
+            results.append(set(queryset.values_list('id', flat=True)))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), results
+
+    def benchmark(self, size, ranges):
+        plain_ms, plain_results = self.run(budget_overlap_q, ranges)
+        indexed_ms, indexed_results = self.run(budget_overlap_filter, ranges)
+        matched = statistics.median(len(ids) for ids in plain_results)
+
+        self.stdout.write(f'店舗数 {size:,}件（1条件あたりの該当件数の中央値 {matched:,.0f}件）')
+        self.stdout.write(f'  従来の条件       : {plain_ms:9.2f} ms')
+        self.stdout.write(f'  予算幅の階級索引 : {indexed_ms:9.2f} ms')
+        if plain_results == indexed_results:
+            self.stdout.write(self.style.SUCCESS(f'  結果: {len(ranges)}条件すべて一致'))
+        else:
+            mismatches = sum(a != b for a, b in zip(plain_results, indexed_results))
+            self.stdout.write(self.style.ERROR(f'  結果: {mismatches}条件で不一致'))
+
+        budget_min, budget_max = ranges[0]
+        plan = Restaurant.objects.filter(is_active=True).filter(budget_overlap_filter(budget_min, budget_max)).explain()
+        self.stdout.write('  実行計画（予算幅の階級索引）:')
+        for line in plan.splitlines()[:6]:
+            self.stdout.write(f'    {line}')
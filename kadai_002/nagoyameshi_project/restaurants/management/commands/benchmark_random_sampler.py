@@ -0,0 +1,87 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from categories.models import Category
+from restaurants import sampling
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        'トップページのランダム抽出（ORDER BY RAND() とIDプール方式）の速度と一様性を比較します。'
+        'ダミーの店舗はトランザクション内で作成し、終了時にロールバックします。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+            help='比較する店舗数（複数指定可）',
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='1件あたりの計測回数')
+        parser.add_argument('--trials', type=int, default=20000, help='一様性の検定で抽出する回数')
+        parser.add_argument('--batch-size', type=int, default=5000, help='ダミー店舗の一括作成件数')
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.create_dummy_restaurants(size, options['batch_size'])
+                self.benchmark(size, options['repeat'], options['trials'])
+                transaction.set_rollback(True)
+            sampling.invalidate_active_id_pool()
+
+    def create_dummy_restaurants(self, size, batch_size):
+        category = Category.objects.first() or Category.objects.create(name='ベンチマーク')
+        for start in range(0, size, batch_size):
+            Restaurant.objects.bulk_create([
+                Restaurant(
+                    name=f'ベンチマーク店舗{i}',
+                    address='愛知県名古屋市中区栄',
+                    category=category,
+                    # 1割は非公開にして公開中の絞り込みも含めて計測する
+                    is_active=i % 10 != 0,
+                )
+                for i in range(start, min(start + batch_size, size))
+            ], batch_size=batch_size)
+        sampling.invalidate_active_id_pool()
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def benchmark(self, size, repeat, trials):
+        def order_by_random():
+            list(Restaurant.objects.filter(is_active=True).select_related('category').order_by('?')[:5])
+
+        started = time.perf_counter()
+        pool = sampling.get_active_id_pool()
+        build_ms = (time.perf_counter() - started) * 1000
+
+        random_ms = self.measure(order_by_random, repeat)
+        sampler_ms = self.measure(lambda: sampling.sample_active_restaurants(5), repeat)
+
+        self.stdout.write(f'店舗数 {size:,}件（公開中 {len(pool):,}件）')
+        self.stdout.write(f'  ORDER BY RAND()      : {random_ms:9.2f} ms')
+        self.stdout.write(f'  IDプール（抽出）     : {sampler_ms:9.2f} ms')
+        self.stdout.write(f'  IDプール（作成時のみ）: {build_ms:9.2f} ms')
+
+        # 一様性: プール内の位置で100区間に分け、抽出回数のカイ二乗値を求める
+        buckets = 100
+        counts = [0] * buckets
+        positions = {restaurant_id: index for index, restaurant_id in enumerate(pool)}
+        for _ in range(trials):
+            for restaurant_id in random.sample(pool, 5):
+                counts[positions[restaurant_id] * buckets // len(pool)] += 1
+        expected = trials * 5 / buckets
+        chi_square = sum((count - expected) ** 2 / expected for count in counts)
+        # 自由度99のカイ二乗分布の平均は99、標準偏差は約14
+        z_score = (chi_square - (buckets - 1)) / (2 * (buckets - 1)) ** 0.5
+        result = self.style.SUCCESS('一様') if abs(z_score) < 3 else self.style.WARNING('偏りの可能性あり')
+        self.stdout.write(f'  一様性: χ²={chi_square:.1f}（自由度{buckets - 1}, z={z_score:+.2f}） {result}')
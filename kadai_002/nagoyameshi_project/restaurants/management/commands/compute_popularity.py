@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.popularity import rebuild_popularity_scores
+
+
+class Command(BaseCommand):
+    help = 'レビュー・お気に入り・予約から店舗の人気スコアを再計算します（定期実行用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='1回に集計する店舗数')
+        parser.add_argument('--half-life', type=float, help='半減期（日）。省略時は設定値')
+        parser.add_argument('--window', type=int, help='集計対象の期間（日）。省略時は設定値')
+
+    def handle(self, *args, **options):
+        count = rebuild_popularity_scores(
+            batch_size=options['batch_size'],
+            half_life_days=options['half_life'],
+            window_days=options['window'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{count}件の店舗の人気スコアを更新しました。'))
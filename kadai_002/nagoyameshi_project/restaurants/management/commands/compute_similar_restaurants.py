@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from restaurants import similarity
+
+
+class Command(BaseCommand):
+    help = 'お気に入り・高評価レビューの共起から「似ている店舗」の表を作り直します（定期実行用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=similarity.TOP_K, help='店舗ごとに保存する件数')
+        parser.add_argument('--min-rating', type=int, default=similarity.MIN_RATING, help='高評価とみなすレビューの評価')
+        parser.add_argument(
+            '--min-common', type=int, default=similarity.MIN_COMMON_USERS, help='近傍とみなす共通のユーザー数の下限',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='一括作成の件数')
+
+    def handle(self, *args, **options):
+        restaurants, count = similarity.rebuild_similar_restaurants(
+            top_k=options['top_k'],
+            min_rating=options['min_rating'],
+            min_common_users=options['min_common'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{restaurants}件の店舗について、{count}件の似ている店舗を保存しました。'))
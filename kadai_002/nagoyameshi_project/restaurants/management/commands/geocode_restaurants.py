@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.geo import geocode_postal_code, grid_cell
+from restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = '店舗の郵便番号から緯度経度とグリッドセルを一括で設定します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='緯度経度が設定済みの店舗も対象にする')
+        parser.add_argument('--batch-size', type=int, default=500, help='一括更新の件数')
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.only('id', 'postal_code', 'latitude', 'longitude')
+        if not options['all']:
+            restaurants = restaurants.filter(latitude__isnull=True)
+
+        updated, unknown = [], 0
+        for restaurant in restaurants.iterator(chunk_size=options['batch_size']):
+            location = geocode_postal_code(restaurant.postal_code)
+            if location is None:
+                unknown += 1
+                continue
+            restaurant.latitude, restaurant.longitude = location
+            restaurant.geo_cell = grid_cell(*location)
+            updated.append(restaurant)
+
+        Restaurant.objects.bulk_update(updated, ['latitude', 'longitude', 'geo_cell'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{len(updated)}件の店舗の位置情報を設定しました。'))
+        if unknown:
+            self.stdout.write(self.style.WARNING(f'{unknown}件は郵便番号から位置を特定できませんでした。'))
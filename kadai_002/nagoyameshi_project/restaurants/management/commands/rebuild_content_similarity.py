@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.content_similarity import rebuild_content_similarity
+from restaurants.similarity import TOP_K
+
+
+class Command(BaseCommand):
+    help = '店舗名・説明・カテゴリの TF-IDF から語彙と「似ている店舗」（内容による近傍）を全件作り直します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help='店舗ごとに保存する件数')
+        parser.add_argument('--batch-size', type=int, default=1000, help='一括作成の件数')
+
+    def handle(self, *args, **options):
+        restaurants, count = rebuild_content_similarity(top_k=options['top_k'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{restaurants}件の店舗について、{count}件の似ている店舗を保存しました。'))
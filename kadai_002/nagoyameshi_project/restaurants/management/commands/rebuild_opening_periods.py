@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from restaurants.opening_hours import rebuild_opening_periods
+
+
+class Command(BaseCommand):
+    help = '店舗の営業時間・定休日を解析し、「営業中」の絞り込みに使う営業時間帯を作り直します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='一括作成の件数')
+
+    def handle(self, *args, **options):
+        count, unparsed = rebuild_opening_periods(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count}件の営業時間帯を作成しました。'))
+        if unparsed:
+            self.stdout.write(self.style.WARNING(
+                f'{len(unparsed)}件の店舗は営業時間を読み取れませんでした（ID: {", ".join(map(str, unparsed[:20]))}'
+                f'{" ほか" if len(unparsed) > 20 else ""}）。'
+            ))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from restaurants.models import Restaurant
+from restaurants.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = '店舗の検索用の列（正規化済みの店舗名・ふりがな・説明・住所）を再計算し、全文検索の索引を作り直します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='一括更新の件数')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        columns = list(Restaurant.SEARCH_COLUMNS)
+        restaurants = Restaurant.objects.only(*Restaurant.SEARCH_COLUMNS.values(), *columns).order_by('pk')
+
+        count = 0
+        changed = []
+        with transaction.atomic():
+            for restaurant in restaurants.iterator(chunk_size=batch_size):
+                before = [getattr(restaurant, column) for column in columns]
+                restaurant.update_search_columns()
+                if before != [getattr(restaurant, column) for column in columns]:
+                    changed.append(restaurant)
+                if len(changed) >= batch_size:
+                    Restaurant.objects.bulk_update(changed, columns)
+                    count += len(changed)
+                    changed = []
+            if changed:
+                Restaurant.objects.bulk_update(changed, columns)
+                count += len(changed)
+            get_search_backend().rebuild()
+
+        self.stdout.write(self.style.SUCCESS(f'{count}件の店舗の検索用の列を更新し、全文検索の索引を作り直しました。'))
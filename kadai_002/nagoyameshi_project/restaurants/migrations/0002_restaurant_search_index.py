@@ -0,0 +1,75 @@
+import unicodedata
+
+from django.db import migrations
+
+FTS_TABLE = 'restaurants_restaurant_fts'
+FULLTEXT_INDEX = 'restaurant_fulltext_ngram'
+
+
+# マイグレーションの結果が後の変更で変わらないよう、restaurants.text の関数をこの時点の内容で複製する
+def normalize_text(text):
+    """全角・半角、大文字・小文字の違いを吸収した文字列を返す"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    chars = [ch if unicodedata.category(ch)[0] in 'LN' else ' ' for ch in text]
+    return ' '.join(''.join(chars).split())
+
+
+def bigrams(text):
+    """正規化済みの文字列をバイグラムと各単語の末尾1文字に分割する（インデックス用）"""
+    tokens = []
+    for word in text.split():
+        if len(word) == 1:
+            tokens.append(word)
+            continue
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    return tokens
+
+
+def create_search_index(apps, schema_editor):
+    """データベースの種類に応じて全文検索用のインデックスを作成する"""
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE restaurants_restaurant ADD FULLTEXT INDEX {FULLTEXT_INDEX} '
+            '(name, description, address) WITH PARSER ngram'
+        )
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                # FTS5 が使えない場合は部分一致検索にフォールバックする
+                return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description, address, tokenize='unicode61')"
+        )
+        Restaurant = apps.get_model('restaurants', 'Restaurant')
+        for restaurant in Restaurant.objects.only('name', 'description', 'address').iterator():
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, address) VALUES (%s, %s, %s, %s)',
+                [restaurant.pk] + [
+                    ' '.join(bigrams(normalize_text(value)))
+                    for value in (restaurant.name, restaurant.description, restaurant.address)
+                ],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE restaurants_restaurant DROP INDEX {FULLTEXT_INDEX}')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
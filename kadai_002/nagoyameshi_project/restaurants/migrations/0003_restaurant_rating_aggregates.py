@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    """既存の公開レビューから評価集計を作成する"""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review = apps.get_model('reviews', 'Review')
+    totals = (
+        Review.objects.filter(is_public=True)
+        .values('restaurant_id')
+        .annotate(total=models.Sum('rating'), count=models.Count('id'))
+    )
+    for row in totals:
+        Restaurant.objects.filter(pk=row['restaurant_id']).update(
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            avg_rating=row['total'] / row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('restaurants', '0002_restaurant_search_index'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='avg_rating',
+            field=models.FloatField(default=0, editable=False, verbose_name='平均評価'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='評価件数'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='評価合計'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['is_active', '-avg_rating'], name='restaurant_active_rating_idx'),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
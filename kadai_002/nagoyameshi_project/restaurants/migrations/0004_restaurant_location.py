@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:42
+
+from django.db import migrations, models
+
+from restaurants.geo import geocode_postal_code, grid_cell
+
+
+def populate_locations(apps, schema_editor):
+    """既存店舗の郵便番号から緯度経度を設定する"""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    restaurants = []
+    for restaurant in Restaurant.objects.only('id', 'postal_code').iterator():
+        location = geocode_postal_code(restaurant.postal_code)
+        if location:
+            restaurant.latitude, restaurant.longitude = location
+            restaurant.geo_cell = grid_cell(*location)
+            restaurants.append(restaurant)
+    Restaurant.objects.bulk_update(restaurants, ['latitude', 'longitude', 'geo_cell'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0003_restaurant_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='geo_cell',
+            field=models.PositiveIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='グリッドセル'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='緯度'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='経度'),
+        ),
+        migrations.RunPython(populate_locations, migrations.RunPython.noop),
+    ]
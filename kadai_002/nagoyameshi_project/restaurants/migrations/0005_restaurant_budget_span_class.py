@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:45
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('restaurants', '0004_restaurant_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='budget_span_class',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(budget_max__lte=models.F('budget_min'), then=models.Value(0)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(2)), then=models.Value(1)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(4)), then=models.Value(2)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(8)), then=models.Value(3)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(16)), then=models.Value(4)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(32)), then=models.Value(5)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(64)), then=models.Value(6)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(128)), then=models.Value(7)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(256)), then=models.Value(8)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(512)), then=models.Value(9)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(1024)), then=models.Value(10)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(2048)), then=models.Value(11)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(4096)), then=models.Value(12)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(8192)), then=models.Value(13)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(16384)), then=models.Value(14)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(32768)), then=models.Value(15)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(65536)), then=models.Value(16)), models.When(budget_max__lt=django.db.models.expressions.CombinedExpression(models.F('budget_min'), '+', models.Value(131072)), then=models.Value(17)), default=models.Value(18), output_field=models.IntegerField()), output_field=models.PositiveSmallIntegerField(), verbose_name='予算幅の階級'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['is_active', 'budget_span_class', 'budget_min'], name='restaurant_budget_span_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('restaurants', '0005_restaurant_budget_span_class'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='popularity_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='人気スコア'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['is_active', '-popularity_score'], name='restaurant_popularity_idx'),
+        ),
+    ]
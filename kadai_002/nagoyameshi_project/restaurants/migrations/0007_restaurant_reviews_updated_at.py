@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0006_restaurant_popularity_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='reviews_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='レビュー更新日時'),
+        ),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:56
+
+import unicodedata
+
+from django.db import migrations, models
+
+FTS_TABLE = 'restaurants_restaurant_fts'
+FULLTEXT_INDEX = 'restaurant_fulltext_ngram'
+SEARCH_COLUMNS = {
+    'search_name': 'name',
+    'search_kana': 'name_kana',
+    'search_description': 'description',
+    'search_address': 'address',
+}
+
+
+# マイグレーションの結果が後の変更で変わらないよう、restaurants.text の関数をこの時点の内容で複製する
+def normalize_text(text):
+    """全角・半角、大文字・小文字の違いを吸収した文字列を返す"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    chars = [ch if unicodedata.category(ch)[0] in 'LN' else ' ' for ch in text]
+    return ' '.join(''.join(chars).split())
+
+
+def bigrams(text):
+    """正規化済みの文字列をバイグラムと各単語の末尾1文字に分割する（インデックス用）"""
+    tokens = []
+    for word in text.split():
+        if len(word) == 1:
+            tokens.append(word)
+            continue
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        tokens.append(word[-1])
+    return tokens
+
+
+def search_text(text):
+    """検索用に正規化した文字列（カタカナはひらがなに揃える）"""
+    return ''.join(chr(ord(ch) - 0x60) if 'ァ' <= ch <= 'ヶ' else ch for ch in normalize_text(text))
+
+
+def populate_search_columns(apps, schema_editor):
+    """既存店舗の検索用の列を設定する"""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    restaurants = []
+    for restaurant in Restaurant.objects.only(*SEARCH_COLUMNS.values()).iterator():
+        for column, source in SEARCH_COLUMNS.items():
+            setattr(restaurant, column, search_text(getattr(restaurant, source)))
+        restaurants.append(restaurant)
+    Restaurant.objects.bulk_update(restaurants, list(SEARCH_COLUMNS), batch_size=500)
+
+
+def _fts5_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def use_search_columns(apps, schema_editor):
+    """全文検索のインデックスを検索用の列に張り替える"""
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE restaurants_restaurant DROP INDEX {FULLTEXT_INDEX}')
+        schema_editor.execute(
+            f'ALTER TABLE restaurants_restaurant ADD FULLTEXT INDEX {FULLTEXT_INDEX} '
+            '(search_name, search_kana, search_description, search_address) WITH PARSER ngram'
+        )
+    elif connection.vendor == 'sqlite' and _fts5_available(connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, kana, description, address, tokenize='unicode61')"
+        )
+        Restaurant = apps.get_model('restaurants', 'Restaurant')
+        for restaurant in Restaurant.objects.only(*SEARCH_COLUMNS).iterator():
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, kana, description, address) VALUES (%s, %s, %s, %s, %s)',
+                [restaurant.pk] + [' '.join(bigrams(getattr(restaurant, column))) for column in SEARCH_COLUMNS],
+            )
+
+
+def use_original_columns(apps, schema_editor):
+    """全文検索のインデックスを元の列に戻す"""
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE restaurants_restaurant DROP INDEX {FULLTEXT_INDEX}')
+        schema_editor.execute(
+            f'ALTER TABLE restaurants_restaurant ADD FULLTEXT INDEX {FULLTEXT_INDEX} '
+            '(name, description, address) WITH PARSER ngram'
+        )
+    elif connection.vendor == 'sqlite' and _fts5_available(connection):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description, address, tokenize='unicode61')"
+        )
+        Restaurant = apps.get_model('restaurants', 'Restaurant')
+        for restaurant in Restaurant.objects.only('name', 'description', 'address').iterator():
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, address) VALUES (%s, %s, %s, %s)',
+                [restaurant.pk] + [
+                    ' '.join(bigrams(normalize_text(value)))
+                    for value in (restaurant.name, restaurant.description, restaurant.address)
+                ],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0007_restaurant_reviews_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='name_kana',
+            field=models.CharField(blank=True, max_length=100, verbose_name='店舗名（ふりがな）'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_address',
+            field=models.TextField(blank=True, editable=False, verbose_name='住所（検索用）'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_description',
+            field=models.TextField(blank=True, editable=False, verbose_name='店舗説明（検索用）'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_kana',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='ふりがな（検索用）'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='店舗名（検索用）'),
+        ),
+        migrations.RunPython(populate_search_columns, migrations.RunPython.noop),
+        migrations.RunPython(use_search_columns, use_original_columns),
+    ]
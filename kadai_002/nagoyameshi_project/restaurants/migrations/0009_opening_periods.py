@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 03:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from restaurants.opening_hours import parse_opening_hours
+
+def populate_opening_periods(apps, schema_editor):
+    """既存店舗の営業時間・定休日から営業時間帯を作成する"""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    OpeningPeriod = apps.get_model('restaurants', 'OpeningPeriod')
+    periods = []
+    for restaurant in Restaurant.objects.only('id', 'opening_hours', 'closed_days').iterator():
+        periods.extend(
+            OpeningPeriod(restaurant_id=restaurant.id, weekday=weekday, open_minute=start, close_minute=end)
+            for weekday, start, end in parse_opening_hours(restaurant.opening_hours, restaurant.closed_days)
+        )
+    OpeningPeriod.objects.bulk_create(periods, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0008_restaurant_search_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(verbose_name='曜日')),
+                ('open_minute', models.PositiveSmallIntegerField(verbose_name='開始（分）')),
+                ('close_minute', models.PositiveSmallIntegerField(verbose_name='終了（分）')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_periods', to='restaurants.restaurant', verbose_name='店舗')),
+            ],
+            options={
+                'verbose_name': '営業時間帯',
+                'verbose_name_plural': '営業時間帯',
+                'ordering': ['restaurant', 'weekday', 'open_minute'],
+                'indexes': [models.Index(fields=['weekday', 'open_minute', 'close_minute', 'restaurant'], name='opening_period_open_at_idx')],
+            },
+        ),
+        migrations.RunPython(populate_opening_periods, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0009_opening_periods'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarRestaurant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='類似度')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='順位')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_restaurants', to='restaurants.restaurant', verbose_name='店舗')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='restaurants.restaurant', verbose_name='似ている店舗')),
+            ],
+            options={
+                'verbose_name': '似ている店舗',
+                'verbose_name_plural': '似ている店舗',
+                'ordering': ['restaurant', 'rank'],
+                'unique_together': {('restaurant', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0010_similar_restaurants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32, unique=True, verbose_name='語')),
+                ('document_count', models.PositiveIntegerField(verbose_name='出現店舗数')),
+            ],
+            options={
+                'verbose_name': '内容の語彙',
+                'verbose_name_plural': '内容の語彙',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='similarrestaurant',
+            options={'ordering': ['restaurant', 'source', 'rank'], 'verbose_name': '似ている店舗', 'verbose_name_plural': '似ている店舗'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='similarrestaurant',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='similarrestaurant',
+            name='source',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'お気に入り・レビューの共起'), (2, '店舗の内容')], default=1, verbose_name='算出方法'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='similarrestaurant',
+            unique_together={('restaurant', 'source', 'rank')},
+        ),
+        migrations.CreateModel(
+            name='ContentFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32, verbose_name='語')),
+                ('weight', models.FloatField(verbose_name='重み')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='content_features', to='restaurants.restaurant', verbose_name='店舗')),
+            ],
+            options={
+                'verbose_name': '内容の特徴量',
+                'verbose_name_plural': '内容の特徴量',
+                'indexes': [models.Index(fields=['term', 'restaurant', 'weight'], name='content_feature_term_idx')],
+                'unique_together': {('restaurant', 'term')},
+            },
+        ),
+    ]
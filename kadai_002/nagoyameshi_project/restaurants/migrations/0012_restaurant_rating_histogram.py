@@ -0,0 +1,69 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_rating_histogram(apps, schema_editor):
+    """既存の公開レビューから星の数ごとの件数と評価スコアを作成する"""
+    Restaurant = apps.get_model('restaurants', 'Restaurant')
+    Review = apps.get_model('reviews', 'Review')
+    histograms = {}
+    rows = Review.objects.filter(is_public=True).values('restaurant_id', 'rating').annotate(count=models.Count('id'))
+    for row in rows:
+        histograms.setdefault(row['restaurant_id'], {})[row['rating']] = row['count']
+    prior_weight = settings.RATING_PRIOR_WEIGHT
+    for restaurant_id, histogram in histograms.items():
+        rating_sum = sum(stars * count for stars, count in histogram.items())
+        rating_count = sum(histogram.values())
+        Restaurant.objects.filter(pk=restaurant_id).update(
+            rating_score=(prior_weight * settings.RATING_PRIOR_MEAN + rating_sum) / (prior_weight + rating_count),
+            **{f'rating_{stars}_count': histogram.get(stars, 0) for stars in range(1, 6)},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0001_initial'),
+        ('restaurants', '0011_content_similarity'),
+        ('reviews', '0003_review_user_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='★1の件数'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='★2の件数'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='★3の件数'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='★4の件数'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='★5の件数'),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='評価スコア'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurant',
+            index=models.Index(fields=['is_active', '-rating_score', '-rating_count'], name='restaurant_rating_score_idx'),
+        ),
+        migrations.RunPython(populate_rating_histogram, migrations.RunPython.noop),
+    ]
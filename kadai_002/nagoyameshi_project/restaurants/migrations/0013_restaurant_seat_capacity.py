@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:14
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurants', '0012_restaurant_rating_histogram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='seat_capacity',
+            field=models.PositiveIntegerField(default=20, help_text='1つの予約時間帯（30分）に受け付ける人数の上限', validators=[django.core.validators.MinValueValidator(1)], verbose_name='座席数'),
+        ),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.urls import reverse
 from django.core.validators import MinValueValidator, MaxValueValidator
 from categories.models import Category
+from .budget_index import budget_span_class_expression
+from .geo import geocode_postal_code, grid_cell
+from .text import search_text
 
 
 class Restaurant(models.Model):
@@ -9,6 +12,7 @@ class Restaurant(models.Model):
     
     # 基本情報
     name = models.CharField('店舗名', max_length=100)
+    name_kana = models.CharField('店舗名（ふりがな）', max_length=100, blank=True)
     description = models.TextField('説明', blank=True)
     category = models.ForeignKey(Category, verbose_name='カテゴリ', on_delete=models.PROTECT)
     
@@ -17,6 +21,11 @@ class Restaurant(models.Model):
     address = models.TextField('住所')
     phone_number = models.CharField('電話番号', max_length=15, blank=True)
     
+    # 位置情報（郵便番号から自動で設定）
+    latitude = models.FloatField('緯度', null=True, blank=True)
+    longitude = models.FloatField('経度', null=True, blank=True)
+    geo_cell = models.PositiveIntegerField('グリッドセル', null=True, blank=True, db_index=True, editable=False)
+    
     # 営業情報
     opening_hours = models.CharField('営業時間', max_length=100, blank=True)
     closed_days = models.CharField('定休日', max_length=100, blank=True)
@@ -34,6 +43,21 @@ class Restaurant(models.Model):
         default=5000,
         help_text='最高予算（円）'
     )
+    # 予算の幅の階級（予算の範囲検索の索引用。データベースで自動計算）
+    budget_span_class = models.GeneratedField(
+        verbose_name='予算幅の階級',
+        expression=budget_span_class_expression(),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+    
+    # 予約の受付（1つの予約時間帯に受け付ける人数の上限）
+    seat_capacity = models.PositiveIntegerField(
+        '座席数',
+        validators=[MinValueValidator(1)],
+        default=20,
+        help_text='1つの予約時間帯（30分）に受け付ける人数の上限'
+    )
     
     # 画像
     image = models.ImageField('メイン画像', upload_to='restaurants/', blank=True, null=True)
@@ -41,6 +65,30 @@ class Restaurant(models.Model):
     # 公開状態
     is_active = models.BooleanField('公開中', default=True)
     
+    # 評価の集計値（公開レビューのみ。レビューの変更時に更新）
+    rating_sum = models.PositiveIntegerField('評価合計', default=0, editable=False)
+    rating_count = models.PositiveIntegerField('評価件数', default=0, editable=False)
+    avg_rating = models.FloatField('平均評価', default=0, editable=False)
+    # 星の数ごとの件数
+    rating_1_count = models.PositiveIntegerField('★1の件数', default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField('★2の件数', default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField('★3の件数', default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField('★4の件数', default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField('★5の件数', default=0, editable=False)
+    # 件数の少ない店舗を事前分布に寄せたベイズ平均（評価順の並び替えに使用。レビューが無い場合は0）
+    rating_score = models.FloatField('評価スコア', default=0, editable=False)
+    # レビューが最後に投稿・編集・削除された日時（詳細ページの ETag に使用）
+    reviews_updated_at = models.DateTimeField('レビュー更新日時', null=True, blank=True, editable=False)
+    
+    # 人気スコア（レビュー・お気に入り・予約から定期的に計算。compute_popularity コマンド）
+    popularity_score = models.FloatField('人気スコア', default=0, editable=False)
+    
+    # 検索用に正規化した文字列（NFKC・小文字・カタカナをひらがなに揃えたもの。保存時に自動で設定）
+    search_name = models.CharField('店舗名（検索用）', max_length=255, blank=True, editable=False)
+    search_kana = models.CharField('ふりがな（検索用）', max_length=255, blank=True, editable=False)
+    search_description = models.TextField('店舗説明（検索用）', blank=True, editable=False)
+    search_address = models.TextField('住所（検索用）', blank=True, editable=False)
+    
     # 作成・更新日時
     created_at = models.DateTimeField('作成日時', auto_now_add=True)
     updated_at = models.DateTimeField('更新日時', auto_now=True)
@@ -49,25 +97,91 @@ class Restaurant(models.Model):
         verbose_name = '店舗'
         verbose_name_plural = '店舗'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', '-avg_rating'], name='restaurant_active_rating_idx'),
+            models.Index(fields=['is_active', '-rating_score', '-rating_count'], name='restaurant_rating_score_idx'),
+            models.Index(fields=['is_active', 'budget_span_class', 'budget_min'], name='restaurant_budget_span_idx'),
+            models.Index(fields=['is_active', '-popularity_score'], name='restaurant_popularity_idx'),
+        ]
+    
+    # 検索用の列と元の列
+    SEARCH_COLUMNS = {
+        'search_name': 'name',
+        'search_kana': 'name_kana',
+        'search_description': 'description',
+        'search_address': 'address',
+    }
+    
+    # 内容による似ている店舗に影響する列
+    CONTENT_FIELDS = ('search_name', 'search_description', 'category_id', 'is_active')
     
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 内容による似ている店舗の更新の要否の判断用に読み込み時の状態を保持（読み込んでいない列がある場合は None）
+        deferred = instance.get_deferred_fields()
+        instance._loaded_content_state = None if deferred & set(cls.CONTENT_FIELDS) else instance.content_state
+        return instance
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'postal_code' in update_fields:
+            self.update_location()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'latitude', 'longitude', 'geo_cell'}
+        if update_fields is None or set(update_fields) & set(self.SEARCH_COLUMNS.values()):
+            self.update_search_columns()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.SEARCH_COLUMNS)
+        super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('restaurants:detail', kwargs={'restaurant_id': self.pk})
     
+    @property
+    def content_state(self):
+        """内容による似ている店舗に影響する項目（検索用の店舗名・説明, カテゴリID, 公開状態）"""
+        return tuple(getattr(self, field) for field in self.CONTENT_FIELDS)
+    
+    def update_search_columns(self):
+        """検索用の正規化済みの列を設定"""
+        for column, source in self.SEARCH_COLUMNS.items():
+            setattr(self, column, search_text(getattr(self, source)))
+    
+    def update_location(self):
+        """郵便番号から緯度経度とグリッドセルを設定"""
+        location = geocode_postal_code(self.postal_code)
+        if location:
+            self.latitude, self.longitude = location
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = grid_cell(self.latitude, self.longitude)
+        else:
+            self.geo_cell = None
+    
     @property
     def average_rating(self):
-        """平均評価を計算"""
-        reviews = self.review_set.filter(is_public=True)
-        if reviews.exists():
-            return round(reviews.aggregate(models.Avg('rating'))['rating__avg'], 1)
-        return 0
+        """平均評価（集計済みの値を使用）"""
+        return round(self.avg_rating, 1)
     
     @property
     def review_count(self):
-        """レビュー数を取得"""
-        return self.review_set.filter(is_public=True).count()
+        """公開レビュー数（集計済みの値を使用）"""
+        return self.rating_count
+    
+    @property
+    def rating_histogram(self):
+        """星の数ごとの件数と割合（★5から順に）"""
+        return [
+            {
+                'stars': stars,
+                'count': getattr(self, f'rating_{stars}_count'),
+                'percent': round(getattr(self, f'rating_{stars}_count') / self.rating_count * 100) if self.rating_count else 0,
+            }
+            for stars in range(5, 0, -1)
+        ]
 
 
 class Favorite(models.Model):
@@ -97,3 +211,125 @@ class Favorite(models.Model):
     
     def __str__(self):
         return f'{self.user.username} - {self.restaurant.name}'
+
+
+class OpeningPeriod(models.Model):
+    """
+    営業時間帯モデル（営業時間・定休日を解析した曜日ごとの時間帯）
+
+    日付をまたぐ営業は当日分と翌日分の2行に分けて保存する。
+    """
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='店舗',
+        on_delete=models.CASCADE,
+        related_name='opening_periods'
+    )
+    # 月曜日=0 〜 日曜日=6
+    weekday = models.PositiveSmallIntegerField('曜日')
+    # 0時からの分数（終了は含まない）
+    open_minute = models.PositiveSmallIntegerField('開始（分）')
+    close_minute = models.PositiveSmallIntegerField('終了（分）')
+
+    class Meta:
+        verbose_name = '営業時間帯'
+        verbose_name_plural = '営業時間帯'
+        ordering = ['restaurant', 'weekday', 'open_minute']
+        indexes = [
+            # 「指定した曜日・時刻に営業中」の範囲検索用
+            models.Index(
+                fields=['weekday', 'open_minute', 'close_minute', 'restaurant'],
+                name='opening_period_open_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.restaurant_id} {self.weekday} '
+            f'{self.open_minute // 60:02d}:{self.open_minute % 60:02d}-'
+            f'{self.close_minute // 60:02d}:{self.close_minute % 60:02d}'
+        )
+
+
+class SimilarRestaurant(models.Model):
+    """
+    似ている店舗モデル（事前に計算した近傍）
+
+    お気に入り・高評価レビューの共起による近傍は compute_similar_restaurants コマンドで、
+    店舗名・説明・カテゴリの内容による近傍は店舗の保存時に個別に更新する。
+    """
+    SOURCE_COOCCURRENCE = 1
+    SOURCE_CONTENT = 2
+    SOURCE_CHOICES = [
+        (SOURCE_COOCCURRENCE, 'お気に入り・レビューの共起'),
+        (SOURCE_CONTENT, '店舗の内容'),
+    ]
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='店舗',
+        on_delete=models.CASCADE,
+        related_name='similar_restaurants'
+    )
+    similar = models.ForeignKey(
+        Restaurant,
+        verbose_name='似ている店舗',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    source = models.PositiveSmallIntegerField('算出方法', choices=SOURCE_CHOICES, default=SOURCE_COOCCURRENCE)
+    # 類似度（コサイン類似度）と順位（算出方法ごとに1から）
+    score = models.FloatField('類似度')
+    rank = models.PositiveSmallIntegerField('順位')
+
+    class Meta:
+        verbose_name = '似ている店舗'
+        verbose_name_plural = '似ている店舗'
+        ordering = ['restaurant', 'source', 'rank']
+        # 店舗詳細ページでは (店舗, 算出方法, 順位) の索引だけで取得する
+        unique_together = [['restaurant', 'source', 'rank']]
+
+    def __str__(self):
+        return f'{self.restaurant_id} -> {self.similar_id} ({self.score:.3f})'
+
+
+class ContentTerm(models.Model):
+    """
+    内容による類似度の語彙モデル（文字n-gramごとの出現店舗数）
+
+    IDF の計算に使う。全件の作り直し（rebuild_content_similarity コマンド）で更新し、
+    店舗の保存時の個別更新ではこの時点の値を使う。
+    """
+    term = models.CharField('語', max_length=32, unique=True)
+    document_count = models.PositiveIntegerField('出現店舗数')
+
+    class Meta:
+        verbose_name = '内容の語彙'
+        verbose_name_plural = '内容の語彙'
+
+    def __str__(self):
+        return f'{self.term} ({self.document_count})'
+
+
+class ContentFeature(models.Model):
+    """内容による類似度の特徴量モデル（店舗ごとの TF-IDF の重みの大きい語）"""
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='店舗',
+        on_delete=models.CASCADE,
+        related_name='content_features'
+    )
+    term = models.CharField('語', max_length=32)
+    # 店舗ごとに L2 正規化した TF-IDF の重み
+    weight = models.FloatField('重み')
+
+    class Meta:
+        verbose_name = '内容の特徴量'
+        verbose_name_plural = '内容の特徴量'
+        unique_together = [['restaurant', 'term']]
+        indexes = [
+            # 同じ語を持つ店舗（類似度の候補）の検索用
+            models.Index(fields=['term', 'restaurant', 'weight'], name='content_feature_term_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant_id} {self.term} ({self.weight:.3f})'
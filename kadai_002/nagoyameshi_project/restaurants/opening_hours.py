@@ -0,0 +1,177 @@
+"""
+営業時間の解析と「指定した日時に営業中」の絞り込み
+
+自由入力の営業時間（opening_hours）と定休日（closed_days）を曜日ごとの営業時間帯
+（OpeningPeriod: 曜日, 開始分, 終了分）に変換して保存しておき、検索時は
+weekday = W AND open_minute <= M AND close_minute > M の範囲検索で判定する。
+日付をまたぐ営業（17:00-翌2:00 など）は当日の 17:00-24:00 と翌日の 0:00-2:00 に分けて保存する。
+
+解析は表記ゆれに寛容にし、読み取れない部分は無視する（営業時間帯が1つも得られない店舗は
+「営業中」の絞り込みに含まれない）。
+"""
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Q
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAY_NAMES = '月火水木金土日'
+
+# 時刻（例: 11:00, 11時, 11時30分, 11時半）
+TIME = r'(?P<{0}_hour>\d{{1,2}})\s*(?:[:：]\s*(?P<{0}_minute>\d{{2}})|時\s*(?:(?P<{0}_kanji_minute>\d{{1,2}})\s*分|(?P<{0}_half>半))?)'
+# 時間帯（例: 11:00-14:00, 11時〜22時, 17:00-翌2:00, 18:00-26:00）
+TIME_RANGE_PATTERN = re.compile(
+    TIME.format('open') + r'\s*[-~〜－ー―‐−–—]+\s*(?P<next_day>翌\s*)?' + TIME.format('close')
+)
+DASH = r'[-~〜－ー―‐−–—]'
+# 曜日の範囲（例: 月〜金, 月曜-土曜）と個別の曜日（「第3日曜」「祝日」「月曜日」の末尾の日は除く）
+WEEKDAY_RANGE_PATTERN = re.compile(r'([月火水木金土日])\s*(?:曜日?)?\s*' + DASH + r'\s*([月火水木金土日])')
+WEEKDAY_PATTERN = re.compile(r'(第\s*\d\s*)?(?<![祝翌休曜平毎])([月火水木金土日])(?=\s*曜|\s*[・、,/／\s]|\s*$|\s*' + DASH + ')')
+ALL_DAY_PATTERN = re.compile(r'24\s*時間')
+# 曜日ごとに営業時間を書き分けている場合の区切り
+SEGMENT_PATTERN = re.compile(r'[\n;；/／|]')
+
+
+def _minutes(match, prefix):
+    minute = match.group(f'{prefix}_minute') or match.group(f'{prefix}_kanji_minute')
+    if match.group(f'{prefix}_half'):
+        minute = 30
+    return int(match.group(f'{prefix}_hour')) * 60 + int(minute or 0)
+
+
+def _parse_time_ranges(text):
+    """文字列に含まれる時間帯を (開始分, 終了分) の一覧で返す（終了分は24時を超えることがある）"""
+    ranges = []
+    for match in TIME_RANGE_PATTERN.finditer(text):
+        start, end = _minutes(match, 'open'), _minutes(match, 'close')
+        if start >= MINUTES_PER_DAY or end > 2 * MINUTES_PER_DAY:
+            continue
+        if match.group('next_day') or end <= start:
+            end += MINUTES_PER_DAY
+        ranges.append((start, min(end, start + MINUTES_PER_DAY)))
+    return ranges
+
+
+def parse_weekdays(text):
+    """文字列に含まれる曜日（月=0〜日=6）の集合。「第3日曜」のような隔週の指定は含めない"""
+    text = unicodedata.normalize('NFKC', text or '')
+    weekdays = set()
+    if '平日' in text:
+        weekdays.update(range(5))
+    if '土日' in text:
+        weekdays.update((5, 6))
+    for match in WEEKDAY_RANGE_PATTERN.finditer(text):
+        start, end = WEEKDAY_NAMES.index(match.group(1)), WEEKDAY_NAMES.index(match.group(2))
+        weekdays.update(day % 7 for day in range(start, end + (7 if end < start else 0) + 1))
+    for match in WEEKDAY_PATTERN.finditer(text):
+        if not match.group(1):
+            weekdays.add(WEEKDAY_NAMES.index(match.group(2)))
+    return weekdays
+
+
+def parse_opening_hours(opening_hours, closed_days=''):
+    """
+    営業時間と定休日を曜日ごとの営業時間帯の一覧に変換する
+
+    戻り値は (曜日, 開始分, 終了分) の一覧（終了分は 1〜1440）。
+    日付をまたぐ時間帯は翌日の分に分けて返す。
+    """
+    text = unicodedata.normalize('NFKC', opening_hours or '')
+
+    # 曜日の指定がない時間帯は全曜日に、指定がある時間帯はその曜日にだけ適用する
+    default_ranges, weekday_ranges = [], {}
+    for segment in SEGMENT_PATTERN.split(text):
+        ranges = [(0, MINUTES_PER_DAY)] if ALL_DAY_PATTERN.search(segment) else _parse_time_ranges(segment)
+        if not ranges:
+            continue
+        # 最初の時間帯より前に書かれた曜日をその区切りの曜日とする
+        first_time = TIME_RANGE_PATTERN.search(segment)
+        days = parse_weekdays(segment[:first_time.start()] if first_time else segment)
+        if days:
+            for day in days:
+                weekday_ranges.setdefault(day, []).extend(ranges)
+        else:
+            default_ranges.extend(ranges)
+
+    closed = parse_weekdays(closed_days)
+    periods = set()
+    for day in range(7):
+        if day in closed:
+            continue
+        for start, end in weekday_ranges.get(day, default_ranges):
+            periods.add((day, start, min(end, MINUTES_PER_DAY)))
+            if end > MINUTES_PER_DAY:
+                periods.add(((day + 1) % 7, 0, end - MINUTES_PER_DAY))
+    return sorted(period for period in periods if period[1] < period[2])
+
+
+def sync_opening_periods(restaurant):
+    """店舗の営業時間帯を営業時間・定休日の内容に合わせて作り直す"""
+    from .models import OpeningPeriod
+
+    periods = [
+        OpeningPeriod(restaurant_id=restaurant.pk, weekday=weekday, open_minute=start, close_minute=end)
+        for weekday, start, end in parse_opening_hours(restaurant.opening_hours, restaurant.closed_days)
+    ]
+    with transaction.atomic():
+        OpeningPeriod.objects.filter(restaurant_id=restaurant.pk).delete()
+        OpeningPeriod.objects.bulk_create(periods)
+    return len(periods)
+
+
+def rebuild_opening_periods(batch_size=1000):
+    """
+    全店舗の営業時間帯を作り直す
+
+    Returns:
+        (作成した営業時間帯の件数, 営業時間を読み取れなかった店舗のID一覧)
+    """
+    from .models import OpeningPeriod, Restaurant
+
+    restaurants = Restaurant.objects.only('id', 'opening_hours', 'closed_days').order_by('pk')
+    count = 0
+    unparsed = []
+    periods = []
+    with transaction.atomic():
+        OpeningPeriod.objects.all().delete()
+        for restaurant in restaurants.iterator(chunk_size=batch_size):
+            parsed = parse_opening_hours(restaurant.opening_hours, restaurant.closed_days)
+            if not parsed and restaurant.opening_hours:
+                unparsed.append(restaurant.id)
+            periods.extend(
+                OpeningPeriod(restaurant_id=restaurant.id, weekday=weekday, open_minute=start, close_minute=end)
+                for weekday, start, end in parsed
+            )
+            if len(periods) >= batch_size:
+                OpeningPeriod.objects.bulk_create(periods)
+                count += len(periods)
+                periods = []
+        OpeningPeriod.objects.bulk_create(periods)
+        count += len(periods)
+    return count, unparsed
+
+
+def open_at_q(weekday, minute=None):
+    """指定した曜日・時刻（0時からの分）に営業中の店舗の条件（時刻を省略するとその曜日に営業する店舗）"""
+    from .models import OpeningPeriod
+
+    # 相関サブクエリ（EXISTS）では店舗ごとに営業時間帯を探すため、営業時間帯の索引の範囲検索で
+    # 店舗IDを求める IN 検索にする
+    periods = OpeningPeriod.objects.filter(weekday=weekday)
+    if minute is not None:
+        periods = periods.filter(open_minute__lte=minute, close_minute__gt=minute)
+    return Q(id__in=periods.values('restaurant_id'))
+
+
+def parse_time(value):
+    """「HH:MM」形式の時刻を0時からの分に変換する（不正な値は None）"""
+    match = re.fullmatch(r'(\d{1,2}):(\d{2})', unicodedata.normalize('NFKC', value or '').strip())
+    if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def format_time(minute):
+    """0時からの分を「HH:MM」形式にする"""
+    return f'{minute // 60:02d}:{minute % 60:02d}'
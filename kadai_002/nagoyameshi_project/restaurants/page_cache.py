@@ -0,0 +1,56 @@
+"""
+店舗詳細ページの条件付き GET と HTML キャッシュ（未ログインユーザー向け）
+
+未ログインユーザーに表示する内容は店舗・カテゴリ・レビュー・似ている店舗・運営会社情報（フッター）が
+変わらない限り同じなので、それぞれの更新日時から ETag と Last-Modified を作り、変わっていなければ 304 を返す。
+描画した HTML は ETag を含むキーでキャッシュするため、店舗の編集・承認・レビューの変更で
+ETag が変われば古い HTML は使われなくなる。
+店舗ごとの「似ている店舗」の表示の更新日時も含め、一覧が変わった店舗だけ表示を作り直す。
+似ている店舗の名前・カテゴリ・評価・公開状態は、その店舗側の更新日時と表示する値を含める。
+"""
+from hashlib import md5
+
+from admin_panel.models import CompanyInfo
+from .models import SimilarRestaurant
+from .similarity import get_updated_at
+
+# テンプレートを変更した場合に古いキャッシュを使わないよう上げる
+DETAIL_PAGE_VERSION = 1
+
+
+def _similar_state(restaurant):
+    """
+    似ている店舗の表示に使う値の一覧
+
+    公開中でなくなった店舗も一覧から外れたことが分かるよう、公開状態にかかわらず取得する。
+    """
+    return list(
+        SimilarRestaurant.objects.filter(restaurant=restaurant).order_by('source', 'rank').values_list(
+            'similar_id', 'similar__is_active', 'similar__name', 'similar__category__name',
+            'similar__rating_count', 'similar__avg_rating',
+            'similar__updated_at', 'similar__reviews_updated_at', 'similar__category__updated_at',
+        )
+    )
+
+
+def detail_validators(restaurant):
+    """店舗詳細ページの (ETag, Last-Modified)"""
+    timestamps = [restaurant.updated_at, restaurant.category.updated_at]
+    if restaurant.reviews_updated_at:
+        timestamps.append(restaurant.reviews_updated_at)
+    similar_updated_at = get_updated_at(restaurant.pk)
+    if similar_updated_at:
+        timestamps.append(similar_updated_at)
+    similar_state = _similar_state(restaurant)
+    timestamps.extend(timestamp for row in similar_state for timestamp in row[-3:] if timestamp)
+    # フッターの運営会社情報（表示時と同じく、無ければ作成する）
+    timestamps.append(CompanyInfo.get_instance().updated_at)
+    source = ':'.join([str(DETAIL_PAGE_VERSION), str(restaurant.pk), str(restaurant.rating_sum),
+                       str(restaurant.rating_count), repr(similar_state)]
+                      + [timestamp.isoformat() for timestamp in timestamps])
+    return f'"{md5(source.encode()).hexdigest()}"', max(timestamps)
+
+
+def detail_cache_key(restaurant, etag):
+    """店舗詳細ページの HTML のキャッシュキー"""
+    return 'restaurants:detail:{}:{}'.format(restaurant.pk, etag.strip('"'))
@@ -0,0 +1,153 @@
+"""
+カーソル（キーセット）方式のページネーション
+
+OFFSET を使わず「前ページ最後の行の並び順の値より後」を条件に取得するため、
+ページが深くなっても1ページ分の行数しか読まない。
+カーソルは並び順の値を署名付きで埋め込んだ不透明な文字列として扱う。
+"""
+import datetime
+from functools import reduce
+from operator import or_
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Q
+
+CURSOR_SALT = 'restaurants.pagination.cursor'
+
+
+class KeysetPage:
+    """カーソル方式の1ページ分の結果"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'d': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'t': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return datetime.date.fromisoformat(value['d'])
+        if 't' in value:
+            return datetime.time.fromisoformat(value['t'])
+    return value
+
+
+def _resolve(obj, field):
+    """'restaurant__created_at' のような関連先の値も取得する"""
+    for attr in field.split('__'):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def encode_cursor(obj, ordering, direction):
+    """obj の並び順の値からカーソル文字列を作成する"""
+    values = [_encode_value(_resolve(obj, field.lstrip('-'))) for field in ordering]
+    return signing.dumps({'v': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor):
+    """カーソル文字列を (並び順の値, 方向) に戻す。不正な場合は None"""
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+        return [_decode_value(value) for value in data['v']], data['d']
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def _keyset_filter(ordering, values, reverse=False):
+    """(f1, f2, ...) > (v1, v2, ...) に相当する条件を並び順の向きに合わせて組み立てる"""
+    conditions = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != reverse
+        condition = Q(**{f'{name}__lt' if descending else f'{name}__gt': values[index]})
+        for previous_field, previous_value in zip(ordering[:index], values[:index]):
+            condition &= Q(**{previous_field.lstrip('-'): previous_value})
+        conditions.append(condition)
+    return reduce(or_, conditions)
+
+
+def paginate_by_cursor(queryset, ordering, per_page, cursor=None):
+    """
+    カーソル方式でページを取得する
+
+    Args:
+        queryset: 絞り込み済みのクエリセット
+        ordering: 並び順（最後は id など一意な列にすること。NULL を含む列は不可）
+        per_page: 1ページの件数
+        cursor: 前のページで発行されたカーソル（省略時は先頭ページ）
+    """
+    ordering = list(ordering)
+    decoded = decode_cursor(cursor) if cursor else None
+    if decoded is None or len(decoded[0]) != len(ordering):
+        decoded = None
+
+    if decoded and decoded[1] == 'prev':
+        # 逆順に取得してから並べ直す
+        values = decoded[0]
+        reversed_ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        rows = list(
+            queryset.filter(_keyset_filter(ordering, values, reverse=True))
+            .order_by(*reversed_ordering)[:per_page + 1]
+        )
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        if decoded:
+            queryset = queryset.filter(_keyset_filter(ordering, decoded[0]))
+        rows = list(queryset.order_by(*ordering)[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = decoded is not None
+
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], ordering, 'next') if rows and has_next else None,
+        previous_cursor=encode_cursor(rows[0], ordering, 'prev') if rows and has_previous else None,
+    )
+
+
+def cached_count(queryset, key, timeout):
+    """
+    件数をキャッシュして返す
+
+    深いページを見るたびに COUNT(*) を実行しないよう、同じ検索条件の件数は
+    timeout 秒間使い回す（概算値として扱う）。timeout が 0 の場合は毎回数える。
+    """
+    if not timeout:
+        return queryset.count()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
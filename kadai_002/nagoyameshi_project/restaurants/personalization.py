@@ -0,0 +1,134 @@
+"""
+プレミアム会員向けのトップページのおすすめ店舗
+
+ユーザーのお気に入り・予約（キャンセルを除く）から「よく選ぶカテゴリ」と「予算の範囲」を求め、
+事前に作成したカテゴリ別・予算帯別の人気順ランキング（上位 RANKING_SIZE 件）の順位から
+点数を付けて上位の店舗を選ぶ。お気に入り済みの店舗は除き、足りない分はランダムに補う。
+
+ランキングはカタログの版番号付きで全ユーザー共通にキャッシュし、選んだ店舗はユーザーごとに
+短い時間キャッシュするため、トップページは通常キャッシュを読むだけで表示できる。
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from categories.models import Category
+from .budget_index import budget_overlap_filter
+from .cache import catalogue_cache_key
+from .facets import BUDGET_BUCKETS
+from .models import Favorite, Restaurant
+from .sampling import sample_active_restaurants
+
+# ランキングに持つ件数
+RANKING_SIZE = 50
+# 好みのカテゴリ・予算帯のランキングの点数の重み
+CATEGORY_WEIGHT = 2.0
+BUDGET_WEIGHT = 1.0
+# 好みの集計での活動の種類ごとの重み
+FAVORITE_WEIGHT = 1.0
+RESERVATION_WEIGHT = 2.0
+
+
+def build_rankings():
+    """カテゴリ別・予算帯別の人気順ランキング（店舗IDの一覧）"""
+    active = Restaurant.objects.filter(is_active=True).order_by('-popularity_score', '-id')
+    return {
+        'categories': {
+            category_id: list(active.filter(category_id=category_id).values_list('id', flat=True)[:RANKING_SIZE])
+            for category_id in Category.objects.values_list('id', flat=True)
+        },
+        'budgets': [
+            list(active.filter(budget_overlap_filter(low, high)).values_list('id', flat=True)[:RANKING_SIZE])
+            for _, low, high in BUDGET_BUCKETS
+        ],
+    }
+
+
+def get_rankings():
+    """ランキング（店舗・人気スコアの更新でカタログの版番号が変わると作り直す）"""
+    return cache.get_or_set(catalogue_cache_key('rankings'), build_rankings, settings.SEARCH_CACHE_TIMEOUT)
+
+
+def user_preferences(user):
+    """
+    ユーザーの好み
+
+    Returns:
+        (カテゴリごとの重み, 予算の範囲 (下限, 上限) または None, お気に入り済みの店舗IDの集合)
+    """
+    from reservations.models import Reservation
+
+    sources = [
+        (FAVORITE_WEIGHT, Favorite.objects.filter(user=user)),
+        (RESERVATION_WEIGHT, Reservation.objects.filter(user=user).exclude(status='cancelled')),
+    ]
+    categories = Counter()
+    budget_weight = budget_min = budget_max = 0
+    for weight, queryset in sources:
+        rows = (
+            queryset.order_by()
+            .values('restaurant__category_id')
+            .annotate(
+                count=Count('id'),
+                budget_min_sum=Sum('restaurant__budget_min'),
+                budget_max_sum=Sum('restaurant__budget_max'),
+            )
+        )
+        for row in rows:
+            categories[row['restaurant__category_id']] += weight * row['count']
+            budget_weight += weight * row['count']
+            budget_min += weight * row['budget_min_sum']
+            budget_max += weight * row['budget_max_sum']
+
+    budget = (budget_min / budget_weight, budget_max / budget_weight) if budget_weight else None
+    favorite_ids = set(Favorite.objects.filter(user=user).values_list('restaurant_id', flat=True))
+    return categories, budget, favorite_ids
+
+
+def score_candidates(categories, budget, rankings, exclude=()):
+    """ランキングの順位から店舗ごとの点数を求める（{店舗ID: 点数}）"""
+    scores = defaultdict(float)
+    total = sum(categories.values())
+    for category_id, weight in categories.items():
+        for rank, restaurant_id in enumerate(rankings['categories'].get(category_id, ())):
+            scores[restaurant_id] += CATEGORY_WEIGHT * weight / total * (1 - rank / RANKING_SIZE)
+
+    if budget:
+        # 好みの予算の範囲と重なる予算帯のランキングを等分に使う
+        buckets = [
+            index for index, (_, low, high) in enumerate(BUDGET_BUCKETS)
+            if (low is None or budget[1] >= low) and (high is None or budget[0] <= high)
+        ]
+        for index in buckets:
+            for rank, restaurant_id in enumerate(rankings['budgets'][index]):
+                scores[restaurant_id] += BUDGET_WEIGHT / len(buckets) * (1 - rank / RANKING_SIZE)
+
+    for restaurant_id in exclude:
+        scores.pop(restaurant_id, None)
+    return scores
+
+
+def personalized_restaurants(user, count=5):
+    """ユーザー向けのおすすめ店舗（ユーザーごとに短時間キャッシュ）"""
+    def build():
+        categories, budget, favorite_ids = user_preferences(user)
+        scores = score_candidates(categories, budget, get_rankings(), exclude=favorite_ids)
+        ids = sorted(scores, key=lambda restaurant_id: (-scores[restaurant_id], restaurant_id))[:count]
+        by_id = Restaurant.objects.filter(id__in=ids, is_active=True).select_related('category').in_bulk()
+        restaurants = [by_id[restaurant_id] for restaurant_id in ids if restaurant_id in by_id]
+        # 好みが分からない・候補が足りない場合はランダムに補う
+        if len(restaurants) < count:
+            chosen = {restaurant.id for restaurant in restaurants}
+            restaurants += [
+                restaurant for restaurant in sample_active_restaurants(count + len(chosen))
+                if restaurant.id not in chosen
+            ][:count - len(restaurants)]
+        return restaurants
+
+    if not settings.PERSONALIZED_TOP_CACHE_TIMEOUT:
+        return build()
+    return cache.get_or_set(
+        catalogue_cache_key(f'personalized:{user.pk}'), build, settings.PERSONALIZED_TOP_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,102 @@
+"""
+店舗の人気スコア（Restaurant.popularity_score）の計算
+
+レビュー・お気に入り・予約の件数を、古いものほど半減期に従って小さくなる重みで合算する。
+検索のたびに3種類の集計を結合するのは重いため、定期実行のコマンド
+（compute_popularity）でまとめて計算し、索引付きの列に書き込んでおく。
+
+店舗IDの範囲ごとに、活動の種類ごと「店舗×日付」で GROUP BY した件数を1回ずつ取得し、
+日数ごとの減衰係数の表を掛けて合算する（行ごとのクエリは発行しない）。
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import bump_catalogue_version
+from .models import Favorite, Restaurant
+
+# 活動の種類ごとの重み
+REVIEW_WEIGHT = 3.0
+FAVORITE_WEIGHT = 2.0
+RESERVATION_WEIGHT = 4.0
+
+
+def _activity_sources():
+    """(重み, 対象期間で絞り込む前のクエリセット) の一覧"""
+    from reservations.models import Reservation
+    from reviews.models import Review
+
+    return [
+        (REVIEW_WEIGHT, Review.objects.filter(is_public=True)),
+        (FAVORITE_WEIGHT, Favorite.objects.all()),
+        (RESERVATION_WEIGHT, Reservation.objects.exclude(status='cancelled')),
+    ]
+
+
+def decay_table(half_life_days, window_days):
+    """経過日数ごとの減衰係数（0日目が1、半減期で0.5）"""
+    return [0.5 ** (days / half_life_days) for days in range(window_days + 1)]
+
+
+def compute_popularity_scores(restaurant_ids, now=None, half_life_days=None, window_days=None):
+    """店舗IDごとの人気スコアを返す（活動のない店舗は含まない）"""
+    now = now or timezone.now()
+    half_life_days = half_life_days or settings.POPULARITY_HALF_LIFE_DAYS
+    window_days = window_days or settings.POPULARITY_WINDOW_DAYS
+    decay = decay_table(half_life_days, window_days)
+    today = timezone.localdate(now)
+    since = now - timedelta(days=window_days)
+
+    scores = {}
+    for weight, activities in _activity_sources():
+        rows = (
+            activities.filter(restaurant_id__in=restaurant_ids, created_at__gte=since)
+            .annotate(day=TruncDate('created_at'))
+            .order_by()
+            .values('restaurant_id', 'day')
+            .annotate(count=Count('id'))
+        )
+        for row in rows:
+            days = min(max((today - row['day']).days, 0), window_days)
+            scores[row['restaurant_id']] = (
+                scores.get(row['restaurant_id'], 0) + weight * row['count'] * decay[days]
+            )
+    return scores
+
+
+def rebuild_popularity_scores(batch_size=1000, now=None, half_life_days=None, window_days=None):
+    """
+    全店舗の人気スコアを再計算する
+
+    店舗IDを batch_size 件ずつに区切って集計し、bulk_update で書き込む。
+    戻り値は処理した店舗数。
+    """
+    processed = 0
+    last_id = 0
+    while True:
+        restaurants = list(
+            Restaurant.objects.filter(pk__gt=last_id).order_by('pk').only('popularity_score')[:batch_size]
+        )
+        if not restaurants:
+            break
+        last_id = restaurants[-1].pk
+        scores = compute_popularity_scores(
+            [restaurant.pk for restaurant in restaurants], now, half_life_days, window_days,
+        )
+        changed = []
+        for restaurant in restaurants:
+            score = round(scores.get(restaurant.pk, 0.0), 6)
+            if restaurant.popularity_score != score:
+                restaurant.popularity_score = score
+                changed.append(restaurant)
+        if changed:
+            with transaction.atomic():
+                Restaurant.objects.bulk_update(changed, ['popularity_score'])
+        processed += len(restaurants)
+    # 人気順の検索結果が変わるためキャッシュを無効にする
+    bump_catalogue_version()
+    return processed
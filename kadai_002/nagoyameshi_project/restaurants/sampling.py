@@ -0,0 +1,65 @@
+"""
+トップページ用の店舗ランダム抽出
+
+ORDER BY RAND() は毎回公開中の全店舗を並べ替えるため、公開中の店舗IDの一覧
+（IDプール）をプロセス内に保持し、そこから random.sample で一様に抽出する。
+抽出した店舗は主キーの IN 検索だけで取得できる。
+
+IDプールは一定時間ごと、または店舗の保存・削除時（キャッシュ上の世代番号を更新）に
+作り直すため、複数プロセスで動かしていても古い一覧を使い続けることはない。
+"""
+import random
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Restaurant
+
+POOL_VERSION_KEY = 'restaurants:active_id_pool:version'
+
+# (世代番号, 有効期限, IDの配列)
+_pool = None
+
+
+def get_pool_version():
+    """IDプールの世代番号を返す"""
+    version = cache.get(POOL_VERSION_KEY)
+    if version is None:
+        version = 1
+        cache.add(POOL_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_active_id_pool():
+    """全プロセスのIDプールを無効にする（店舗の保存・削除時に呼ぶ）"""
+    try:
+        cache.incr(POOL_VERSION_KEY)
+    except ValueError:
+        cache.set(POOL_VERSION_KEY, 2, None)
+
+
+def get_active_id_pool():
+    """公開中の店舗IDの配列を返す"""
+    global _pool
+    version = get_pool_version()
+    if _pool is None or _pool[0] != version or _pool[1] < time.monotonic():
+        ids = Restaurant.objects.filter(is_active=True).order_by().values_list('id', flat=True)
+        # 100万件でも8MB程度に収まるよう配列で保持する
+        _pool = (version, time.monotonic() + settings.RESTAURANT_ID_POOL_TIMEOUT, array('q', ids.iterator()))
+    return _pool[2]
+
+
+def sample_active_restaurants(count=5):
+    """公開中の店舗から count 件をランダムに取得する"""
+    for _ in range(2):
+        pool = get_active_id_pool()
+        ids = random.sample(pool, min(count, len(pool)))
+        restaurants = Restaurant.objects.filter(id__in=ids, is_active=True).select_related('category')
+        by_id = {restaurant.id: restaurant for restaurant in restaurants}
+        if len(by_id) == len(ids):
+            break
+        # 一括更新などでプールが古くなっていた場合は作り直して再抽出する
+        invalidate_active_id_pool()
+    return [by_id[restaurant_id] for restaurant_id in ids if restaurant_id in by_id]
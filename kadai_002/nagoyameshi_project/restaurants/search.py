@@ -0,0 +1,176 @@
+"""
+店舗のキーワード検索バックエンド
+
+本番環境（MySQL）では ngram パーサーの FULLTEXT インデックス、
+開発環境（SQLite）では FTS5 の仮想テーブルを転置インデックスとして使用する。
+どちらも使えない場合は従来の部分一致検索にフォールバックする。
+
+検索対象は保存時に正規化した列（search_name / search_kana / search_description /
+search_address）で、キーワードも同じ方法で正規化するため、全角・半角や
+ひらがな・カタカナの違い（「ラーメン」「らーめん」「ﾗｰﾒﾝ」）を問わず一致する。
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .text import bigrams, search_text
+
+FTS_TABLE = 'restaurants_restaurant_fts'
+FULLTEXT_INDEX = 'restaurant_fulltext_ngram'
+
+# バイグラム検索ができない最短のキーワード長
+MIN_NGRAM_LENGTH = 2
+
+
+class SimpleSearchBackend:
+    """部分一致（LIKE）による検索。転置インデックスが使えない環境用"""
+
+    def search(self, queryset, keyword):
+        """キーワードで絞り込み、関連度を search_rank として付与する"""
+        words = search_text(keyword).split()
+        if not words:
+            queryset = queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+            # 記号だけなど検索できる語が無いキーワードは全件ではなく0件にする
+            return queryset.none() if keyword and keyword.strip() else queryset
+        for word in words:
+            queryset = queryset.filter(
+                Q(search_name__contains=word) |
+                Q(search_kana__contains=word) |
+                Q(search_description__contains=word) |
+                Q(search_address__contains=word)
+            )
+        return queryset.annotate(search_rank=Case(
+            When(Q(search_name__contains=words[0]) | Q(search_kana__contains=words[0]), then=Value(3.0)),
+            When(search_address__contains=words[0], then=Value(2.0)),
+            default=Value(1.0),
+            output_field=FloatField(),
+        ))
+
+    def update(self, restaurant):
+        """店舗の保存時に呼ばれる"""
+
+    def remove(self, restaurant_id):
+        """店舗の削除時に呼ばれる"""
+
+    def rebuild(self):
+        """全店舗の索引を作り直す（索引をデータベースが自動で更新する場合は不要）"""
+
+
+class SQLiteFTS5Backend(SimpleSearchBackend):
+    """SQLite FTS5 にバイグラムを格納する転置インデックス検索"""
+
+    # bm25() の列ごとの重み（店舗名、ふりがな、説明、住所）
+    weights = (10.0, 8.0, 1.0, 3.0)
+
+    def search(self, queryset, keyword):
+        match = self.build_match(keyword)
+        if not match:
+            return super().search(queryset, keyword)
+
+        bm25 = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(
+            id__in=RawSQL(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [match],
+            )
+        ).annotate(search_rank=RawSQL(
+            # bm25() は小さいほど関連度が高いため符号を反転する
+            f'SELECT -bm25({FTS_TABLE}, {bm25}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {queryset.model._meta.db_table}.id',
+            [match],
+            output_field=FloatField(),
+        ))
+
+    def build_match(self, keyword):
+        """キーワードを FTS5 の MATCH 式に変換する"""
+        phrases = []
+        for word in search_text(keyword).split():
+            if len(word) < MIN_NGRAM_LENGTH:
+                # 1文字の場合はその文字で始まるトークンを前方一致で検索
+                phrases.append(f'"{word}"*')
+            else:
+                # 連続したバイグラムのフレーズ検索で部分一致と同じ結果になる
+                phrases.append('"' + ' '.join(bigrams(word, for_query=True)) + '"')
+        return ' AND '.join(phrases)
+
+    def update(self, restaurant):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [restaurant.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, kana, description, address) VALUES (%s, %s, %s, %s, %s)',
+                self.index_row(restaurant),
+            )
+
+    def index_row(self, restaurant):
+        """FTS5 に格納する行（検索用の列をバイグラムに分割したもの）"""
+        return [restaurant.pk] + [
+            ' '.join(bigrams(getattr(restaurant, column)))
+            for column in ('search_name', 'search_kana', 'search_description', 'search_address')
+        ]
+
+    def remove(self, restaurant_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [restaurant_id])
+
+    def rebuild(self, batch_size=1000):
+        from .models import Restaurant
+
+        restaurants = Restaurant.objects.only(
+            'search_name', 'search_kana', 'search_description', 'search_address'
+        ).order_by('pk')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            rows = []
+            for restaurant in restaurants.iterator(chunk_size=batch_size):
+                rows.append(self.index_row(restaurant))
+                if len(rows) >= batch_size:
+                    self._insert_rows(cursor, rows)
+                    rows = []
+            if rows:
+                self._insert_rows(cursor, rows)
+
+    def _insert_rows(self, cursor, rows):
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, kana, description, address) VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+
+class MySQLFulltextBackend(SimpleSearchBackend):
+    """MySQL の ngram パーサー付き FULLTEXT インデックスによる検索"""
+
+    def search(self, queryset, keyword):
+        words = search_text(keyword).split()
+        if not words or any(len(word) < MIN_NGRAM_LENGTH for word in words):
+            # ngram_token_size（2）より短い語は FULLTEXT で検索できない
+            return super().search(queryset, keyword)
+
+        against = ' '.join(f'+"{word}"' for word in words)
+        return queryset.annotate(search_rank=RawSQL(
+            'MATCH (search_name, search_kana, search_description, search_address) AGAINST (%s IN BOOLEAN MODE)',
+            [against],
+            output_field=FloatField(),
+        )).filter(search_rank__gt=0)
+
+    # FULLTEXT インデックスは MySQL が自動で更新するため update/remove は不要
+
+
+_backend = None
+
+
+def get_search_backend():
+    """設定とデータベースの種類に応じた検索バックエンドを返す"""
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'RESTAURANT_SEARCH_BACKEND', None)
+        if backend_path:
+            _backend = import_string(backend_path)()
+        elif connection.vendor == 'mysql':
+            _backend = MySQLFulltextBackend()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = SQLiteFTS5Backend()
+        else:
+            _backend = SimpleSearchBackend()
+    return _backend
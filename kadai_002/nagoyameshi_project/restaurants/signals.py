@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from categories.models import Category
+from .autocomplete import record_change
+from .cache import bump_catalogue_version
+from .content_similarity import content_refresh_suspended, schedule_refresh
+from .models import Restaurant
+from .opening_hours import sync_opening_periods
+from .sampling import invalidate_active_id_pool
+from .search import get_search_backend
+
+
+def _invalidate_caches():
+    """
+    IDプールと検索結果のキャッシュを無効にする
+
+    確定前に無効にすると、他のリクエストが確定前のデータを新しい版番号でキャッシュし直すため、
+    トランザクションの確定後に行う。
+    """
+    transaction.on_commit(invalidate_active_id_pool)
+    transaction.on_commit(bump_catalogue_version)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_search_index(sender, instance, **kwargs):
+    """店舗の保存時に検索インデックスを更新"""
+    get_search_backend().update(instance)
+    _invalidate_caches()
+    record_change('restaurant', instance.pk)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_opening_periods(sender, instance, update_fields=None, **kwargs):
+    """営業時間・定休日の保存時に営業時間帯を作り直す"""
+    if update_fields is None or {'opening_hours', 'closed_days'} & set(update_fields):
+        sync_opening_periods(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+def update_content_similarity(sender, instance, created, update_fields=None, **kwargs):
+    """店舗名・説明・カテゴリ・公開状態が変わったら、確定後に内容による似ている店舗を更新する"""
+    if content_refresh_suspended():
+        return
+    if update_fields is not None and not {'name', 'description', 'category', 'is_active'} & set(update_fields):
+        return
+    if not created and instance.content_state == getattr(instance, '_loaded_content_state', None):
+        return
+    schedule_refresh(instance.pk)
+    instance._loaded_content_state = instance.content_state
+
+
+@receiver(post_delete, sender=Restaurant)
+def remove_search_index(sender, instance, **kwargs):
+    """店舗の削除時に検索インデックスから削除"""
+    get_search_backend().remove(instance.pk)
+    _invalidate_caches()
+    record_change('restaurant', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalogue_cache(sender, instance, **kwargs):
+    """カテゴリの変更時に検索結果のキャッシュと入力補完を更新する"""
+    transaction.on_commit(bump_catalogue_version)
+    record_change('category', instance.pk)
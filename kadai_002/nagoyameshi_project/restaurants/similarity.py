@@ -0,0 +1,225 @@
+"""
+「この店舗を気に入った人はこんな店舗も」（似ている店舗）の計算
+
+お気に入りと高評価の公開レビューを「ユーザー×店舗」の0/1の疎行列とみなし、
+店舗どうしのコサイン類似度（共通のユーザー数 / √(店舗Aのユーザー数 × 店舗Bのユーザー数)）
+の上位 K 件を SimilarRestaurant に保存する。店舗詳細ページでは (店舗, 算出方法, 順位) の索引で
+引くだけで済む（内容による近傍は content_similarity を参照）。
+
+疎行列はユーザー行・店舗列の CSR 形式（行の開始位置と列番号の配列）を array で持ち、
+店舗ごとに「その店舗のユーザー → そのユーザーの店舗」をたどって共起数を数える。
+お気に入りとレビューは表ごとに主キー順に一定件数ずつ読み込み、ユーザーごとへの並べ替えは
+計数ソートで行う。メモリは操作件数に比例する配列と、ユーザーID・店舗IDから行・列の番号への辞書、
+1店舗分の共起数の辞書だけで済む（100万件でも配列は数十MB程度）。
+"""
+import heapq
+import math
+from array import array
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Favorite, SimilarRestaurant
+
+# 保存する近傍の件数
+TOP_K = 10
+# 高評価とみなすレビューの評価
+MIN_RATING = 4
+# 近傍とみなす共通のユーザー数の下限（1人だけの偶然の共起を除く）
+MIN_COMMON_USERS = 2
+# これより多くの店舗に反応しているユーザーは共起の計算から除く（計算量が件数の2乗で増えるため）
+MAX_ITEMS_PER_USER = 500
+# 詳細ページに表示する件数
+DISPLAY_COUNT = 4
+
+UPDATED_AT_KEY = 'restaurants:similar:updated_at'
+
+
+def _interaction_batches(min_rating, chunk_size):
+    """
+    (ユーザーID, 店舗ID) の一覧を chunk_size 件ずつ返す（お気に入りと高評価レビューの重複を含む）
+
+    MySQL（PyMySQL）では .iterator() でも結果全体をクライアントに読み込むため、
+    表ごとに主キーのキーセットで区切って取得する。
+    """
+    from reviews.models import Review
+
+    querysets = [
+        Favorite.objects.filter(restaurant__is_active=True),
+        Review.objects.filter(is_public=True, rating__gte=min_rating, restaurant__is_active=True),
+    ]
+    for queryset in querysets:
+        last_id = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'user_id', 'restaurant_id')[:chunk_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield [(user_id, restaurant_id) for _, user_id, restaurant_id in rows]
+
+
+def build_matrix(min_rating=MIN_RATING, max_items_per_user=MAX_ITEMS_PER_USER, chunk_size=10000):
+    """
+    ユーザー×店舗の疎行列を作る
+
+    Returns:
+        (店舗IDの配列, ユーザー行の開始位置, 列番号, 店舗列の開始位置, 行番号)
+        列番号は店舗IDの配列の添字、行番号はユーザー行の添字
+    """
+    columns = {}
+    restaurant_ids = array('q')
+    users = {}
+    pair_rows = array('l')
+    pair_columns = array('l')
+    for batch in _interaction_batches(min_rating, chunk_size):
+        for user_id, restaurant_id in batch:
+            column = columns.get(restaurant_id)
+            if column is None:
+                column = columns[restaurant_id] = len(restaurant_ids)
+                restaurant_ids.append(restaurant_id)
+            row = users.get(user_id)
+            if row is None:
+                row = users[user_id] = len(users)
+            pair_rows.append(row)
+            pair_columns.append(column)
+    user_count = len(users)
+    del users
+
+    # ユーザーごとの店舗を計数ソートで並べ、重複（お気に入りと高評価レビューの両方）を除く
+    grouped_indptr = array('q', [0]) * (user_count + 1)
+    for row in pair_rows:
+        grouped_indptr[row + 1] += 1
+    for row in range(user_count):
+        grouped_indptr[row + 1] += grouped_indptr[row]
+    positions = array('q', grouped_indptr[:-1])
+    grouped = array('l', [0]) * len(pair_rows)
+    for row, column in zip(pair_rows, pair_columns):
+        grouped[positions[row]] = column
+        positions[row] += 1
+    del pair_rows, pair_columns, positions
+
+    user_indptr = array('q', [0])
+    user_items = array('l')
+    for row in range(user_count):
+        items = sorted(set(grouped[grouped_indptr[row]:grouped_indptr[row + 1]]))
+        # 反応の多すぎるユーザーの行は捨てる
+        if len(items) <= max_items_per_user:
+            user_items.extend(items)
+            user_indptr.append(len(user_items))
+    del grouped, grouped_indptr
+
+    # 転置（店舗ごとのユーザー）を計数ソートで作る
+    item_indptr = array('q', [0]) * (len(restaurant_ids) + 1)
+    for column in user_items:
+        item_indptr[column + 1] += 1
+    for column in range(len(restaurant_ids)):
+        item_indptr[column + 1] += item_indptr[column]
+    positions = array('q', item_indptr[:-1])
+    item_users = array('l', [0]) * len(user_items)
+    for row in range(len(user_indptr) - 1):
+        for index in range(user_indptr[row], user_indptr[row + 1]):
+            column = user_items[index]
+            item_users[positions[column]] = row
+            positions[column] += 1
+
+    return restaurant_ids, user_indptr, user_items, item_indptr, item_users
+
+
+def nearest_neighbors(matrix, top_k=TOP_K, min_common_users=MIN_COMMON_USERS):
+    """店舗ごとに (店舗ID, [(類似度, 似ている店舗ID), ...]) を返す"""
+    restaurant_ids, user_indptr, user_items, item_indptr, item_users = matrix
+    for column in range(len(restaurant_ids)):
+        degree = item_indptr[column + 1] - item_indptr[column]
+        if not degree:
+            continue
+        common = {}
+        for index in range(item_indptr[column], item_indptr[column + 1]):
+            row = item_users[index]
+            for other in user_items[user_indptr[row]:user_indptr[row + 1]]:
+                common[other] = common.get(other, 0) + 1
+        common.pop(column, None)
+        candidates = (
+            (count / math.sqrt(degree * (item_indptr[other + 1] - item_indptr[other])), count, -restaurant_ids[other])
+            for other, count in common.items() if count >= min_common_users
+        )
+        neighbors = heapq.nlargest(top_k, candidates)
+        if neighbors:
+            yield restaurant_ids[column], [(score, -negative_id) for score, _, negative_id in neighbors]
+
+
+def rebuild_similar_restaurants(top_k=TOP_K, min_rating=MIN_RATING, min_common_users=MIN_COMMON_USERS, batch_size=1000):
+    """
+    似ている店舗の表を作り直す
+
+    Returns:
+        (近傍のある店舗数, 保存した行数)
+    """
+    matrix = build_matrix(min_rating)
+    restaurants = 0
+    count = 0
+    rows = []
+    with transaction.atomic():
+        SimilarRestaurant.objects.filter(source=SimilarRestaurant.SOURCE_COOCCURRENCE).delete()
+        for restaurant_id, neighbors in nearest_neighbors(matrix, top_k, min_common_users):
+            restaurants += 1
+            rows.extend(
+                SimilarRestaurant(
+                    restaurant_id=restaurant_id, similar_id=similar_id, score=score, rank=rank,
+                    source=SimilarRestaurant.SOURCE_COOCCURRENCE,
+                )
+                for rank, (score, similar_id) in enumerate(neighbors, start=1)
+            )
+            if len(rows) >= batch_size:
+                SimilarRestaurant.objects.bulk_create(rows)
+                count += len(rows)
+                rows = []
+        SimilarRestaurant.objects.bulk_create(rows)
+        count += len(rows)
+        transaction.on_commit(mark_updated)
+    return restaurants, count
+
+
+def _updated_at_key(restaurant_id):
+    return f'{UPDATED_AT_KEY}:{restaurant_id}'
+
+
+def mark_updated(restaurant_ids=None):
+    """
+    似ている店舗の表の更新日時を記録する（詳細ページの ETag に含め、更新後は表示を作り直させる）
+
+    Args:
+        restaurant_ids: 表示が変わった店舗のID（省略時は全件の作り直しとして全店舗）
+    """
+    now = timezone.now()
+    if restaurant_ids is None:
+        cache.set(UPDATED_AT_KEY, now, None)
+    elif restaurant_ids:
+        cache.set_many({_updated_at_key(restaurant_id): now for restaurant_id in restaurant_ids}, None)
+
+
+def get_updated_at(restaurant_id):
+    """店舗の似ている店舗の表示が最後に変わった日時（未作成なら None）"""
+    values = cache.get_many([UPDATED_AT_KEY, _updated_at_key(restaurant_id)])
+    return max(values.values(), default=None)
+
+
+def similar_restaurants(restaurant, limit=DISPLAY_COUNT):
+    """
+    店舗詳細ページに表示する似ている店舗（公開中のみ）
+
+    共起による近傍を優先し、足りない分を内容による近傍で補う
+    （お気に入りやレビューがまだ無い店舗でも表示できるようにする）。
+    """
+    entries = (
+        SimilarRestaurant.objects
+        .filter(restaurant=restaurant, similar__is_active=True)
+        .select_related('similar__category')
+        .order_by('source', 'rank')[:limit * 2]
+    )
+    restaurants = {}
+    for entry in entries:
+        restaurants.setdefault(entry.similar_id, entry.similar)
+    return list(restaurants.values())[:limit]
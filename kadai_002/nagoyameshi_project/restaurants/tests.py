@@ -1,3 +1,261 @@
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from admin_panel.models import CompanyInfo
+from categories.models import Category
+from .models import Restaurant, SimilarRestaurant
+from .opening_hours import open_at_q, parse_opening_hours, parse_weekdays
+from .pagination import paginate_by_cursor
+from .search import FTS_TABLE, SimpleSearchBackend, SQLiteFTS5Backend
+
+
+def create_restaurant(category, name, **fields):
+    fields.setdefault('address', '愛知県名古屋市中区栄')
+    return Restaurant.objects.create(name=name, category=category, **fields)
+
+
+class CursorPaginationTests(TestCase):
+    """カーソル（キーセット）方式のページネーション"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='和食')
+        # 並び順の値が同じ店舗を多く含める（id で一意に並ぶこと）
+        for index in range(23):
+            create_restaurant(category, f'店舗{index:02d}', budget_min=index % 3 * 1000)
+        cls.ordering = ['budget_min', 'id']
+        cls.expected = list(Restaurant.objects.order_by(*cls.ordering).values_list('id', flat=True))
+
+    def setUp(self):
+        # 版番号の更新はトランザクションの確定後のため、他のテストの検索結果のキャッシュを消しておく
+        cache.clear()
+
+    def walk_forward(self, per_page):
+        pages = []
+        cursor = None
+        while True:
+            page = paginate_by_cursor(Restaurant.objects.all(), self.ordering, per_page, cursor)
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def test_forward_pages_cover_every_row_once(self):
+        """次のページをたどると全件を重複・欠落なく並び順どおりに返す"""
+        pages = self.walk_forward(5)
+        self.assertEqual([restaurant.id for page in pages for restaurant in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertFalse(pages[0].has_previous())
+
+    def test_previous_pages_mirror_forward_pages(self):
+        """前のページをたどると次のページと同じ区切りで戻る"""
+        forward = self.walk_forward(5)
+        page = forward[-1]
+        backward = [page]
+        while page.has_previous():
+            page = paginate_by_cursor(Restaurant.objects.all(), self.ordering, 5, page.previous_cursor)
+            backward.append(page)
+        self.assertEqual(
+            [[restaurant.id for restaurant in page] for page in backward[::-1]],
+            [[restaurant.id for restaurant in page] for page in forward],
+        )
+
+    def test_invalid_cursor_returns_first_page(self):
+        """改ざん・形式違いのカーソルは先頭ページとして扱う"""
+        first = paginate_by_cursor(Restaurant.objects.all(), self.ordering, 5)
+        for cursor in ('invalid', first.next_cursor[:-2] + 'xx'):
+            page = paginate_by_cursor(Restaurant.objects.all(), self.ordering, 5, cursor)
+            self.assertEqual([restaurant.id for restaurant in page], self.expected[:5])
+        # 並び順の列数が違うカーソル
+        page = paginate_by_cursor(Restaurant.objects.all(), ['id'], 5, first.next_cursor)
+        self.assertEqual([restaurant.id for restaurant in page], sorted(self.expected)[:5])
+
+    def test_search_view_pages(self):
+        """検索ページのカーソルをたどると検索結果を重複なく返す"""
+        url = reverse('restaurants:search')
+        seen = []
+        params = {'sort': 'budget_min'}
+        while True:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page_obj']
+            seen.extend(restaurant.id for restaurant in page)
+            if not page.has_next():
+                break
+            params['cursor'] = page.next_cursor
+        self.assertEqual(seen, self.expected)
+
+
+class SearchBackendTests(TestCase):
+    """キーワード検索（転置インデックスと部分一致で同じ結果になること）"""
+
+    keywords = [
+        'ラーメン', 'らーめん', 'ﾗｰﾒﾝ', 'RAMEN', 'ramen', '味噌', '味', 'み', 'カツ 栄', '名古屋 手羽先',
+        '中区', 'ひつまぶし', 'うなぎ', 'Cafe', '喫茶', '存在しない店', '!!!', '＠＠',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='和食')
+        rows = [
+            ('ラーメン太郎', 'らーめんたろう', '濃厚な豚骨ラーメンの店', '名古屋市中区栄'),
+            ('Ramen Bar NAGOYA', '', '深夜まで営業するラーメンバー', '名古屋市中村区名駅'),
+            ('味噌カツ 矢場', 'みそかつやば', '名物の味噌カツと手羽先', '名古屋市中区大須'),
+            ('ひつまぶし うな藤', 'ひつまぶしうなふじ', 'うなぎのひつまぶし', '名古屋市東区'),
+            ('喫茶 コメダ', 'きっさこめだ', 'モーニングが人気のCafe', '名古屋市千種区'),
+            ('手羽先の店', 'てばさきのみせ', '名古屋名物の手羽先', '名古屋市中区栄'),
+        ]
+        for name, name_kana, description, address in rows:
+            create_restaurant(category, name, name_kana=name_kana, description=description, address=address)
+
+    def search_ids(self, backend, keyword):
+        return set(backend.search(Restaurant.objects.all(), keyword).values_list('id', flat=True))
+
+    def test_normalized_keywords_match(self):
+        """全角・半角、大文字・小文字、ひらがな・カタカナの違いを問わず一致する"""
+        backend = SimpleSearchBackend()
+        expected = self.search_ids(backend, 'ラーメン')
+        self.assertEqual(len(expected), 2)
+        for keyword in ('らーめん', 'ﾗｰﾒﾝ'):
+            self.assertEqual(self.search_ids(backend, keyword), expected)
+        self.assertEqual(self.search_ids(backend, 'RAMEN'), self.search_ids(backend, 'ramen'))
+
+    def test_keyword_without_terms_matches_nothing(self):
+        """記号だけのキーワードは0件、空のキーワードは絞り込まない"""
+        backend = SimpleSearchBackend()
+        self.assertEqual(self.search_ids(backend, '!!!'), set())
+        self.assertEqual(len(self.search_ids(backend, '')), Restaurant.objects.count())
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite のみ')
+    def test_fts5_matches_substring_search(self):
+        """FTS5 の転置インデックスによる検索は部分一致検索と同じ店舗を返す"""
+        if FTS_TABLE not in connection.introspection.table_names():
+            self.skipTest('FTS5 が使えません')
+        fts5, simple = SQLiteFTS5Backend(), SimpleSearchBackend()
+        for keyword in self.keywords:
+            with self.subTest(keyword=keyword):
+                self.assertEqual(self.search_ids(fts5, keyword), self.search_ids(simple, keyword))
+
+    def test_search_view_keyword(self):
+        """検索ページのキーワード検索"""
+        cache.clear()
+        response = self.client.get(reverse('restaurants:search'), {'keyword': 'てばさき'})
+        self.assertEqual([restaurant.name for restaurant in response.context['page_obj']], ['手羽先の店'])
+        response = self.client.get(reverse('restaurants:search'), {'keyword': '!!!'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+
+class OpeningHoursTests(TestCase):
+    """営業時間の解析と「指定した日時に営業中」の絞り込み"""
+
+    def test_parse_simple_hours_with_closed_day(self):
+        """曜日の指定がない時間帯は定休日以外の全曜日に適用する"""
+        periods = parse_opening_hours('11:00-14:00、17:00-22:00', '月曜日')
+        self.assertEqual(periods, [(day, start, end) for day in range(1, 7) for start, end in ((660, 840), (1020, 1320))])
+
+    def test_parse_overnight_and_notations(self):
+        """日付をまたぐ時間帯は翌日に分け、全角・漢字の時刻も読む"""
+        # 定休日（日曜）の深夜の時間帯は月曜にも入らない
+        self.assertEqual(
+            parse_opening_hours('１７：００〜翌２：００', '日'),
+            sorted([(day, 1020, 1440) for day in range(6)] + [(day + 1, 0, 120) for day in range(6)]),
+        )
+        self.assertEqual(parse_opening_hours('18:00-26:00')[:2], [(0, 0, 120), (0, 1080, 1440)])
+        self.assertEqual(parse_opening_hours('11時半〜14時'), [(day, 690, 840) for day in range(7)])
+        self.assertEqual(parse_opening_hours('24時間営業'), [(day, 0, 1440) for day in range(7)])
+
+    def test_parse_weekday_segments(self):
+        """曜日ごとに書き分けた営業時間はその曜日にだけ適用する"""
+        periods = parse_opening_hours('月〜金 11:00-15:00 / 土日 10:00-20:00')
+        self.assertEqual(periods, [(day, 660, 900) for day in range(5)] + [(5, 600, 1200), (6, 600, 1200)])
+
+    def test_parse_weekdays(self):
+        """隔週・祝日の指定は定休日の曜日に含めない"""
+        self.assertEqual(parse_weekdays('水曜日、第3日曜'), {2})
+        self.assertEqual(parse_weekdays('金〜月'), {4, 5, 6, 0})
+        self.assertEqual(parse_weekdays('祝日・年末年始'), set())
+        self.assertEqual(parse_opening_hours('営業時間は要確認'), [])
+
+    def test_open_at_filter(self):
+        """保存時に作り直した営業時間帯で営業中の店舗を絞り込む"""
+        category = Category.objects.create(name='和食')
+        lunch = create_restaurant(category, 'ランチの店', opening_hours='11:00-14:00', closed_days='水')
+        bar = create_restaurant(category, '深夜の店', opening_hours='18:00-翌3:00')
+        create_restaurant(category, '営業時間不明の店', opening_hours='不定')
+
+        def open_at(weekday, minute=None):
+            return set(Restaurant.objects.filter(open_at_q(weekday, minute)).values_list('name', flat=True))
+
+        self.assertEqual(open_at(0, 12 * 60), {lunch.name})
+        self.assertEqual(open_at(2, 12 * 60), set())
+        self.assertEqual(open_at(2, 2 * 60), {bar.name})
+        self.assertEqual(open_at(0, 14 * 60), set())
+        self.assertEqual(open_at(2), {bar.name})
+
+        lunch.closed_days = ''
+        lunch.save()
+        self.assertEqual(open_at(2, 12 * 60), {lunch.name})
+
+
+class DetailConditionalGetTests(TestCase):
+    """未ログインユーザー向けの店舗詳細ページの ETag と 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='和食')
+        cls.restaurant = create_restaurant(cls.category, '味噌カツの店')
+        cls.similar = create_restaurant(cls.category, '手羽先の店')
+        SimilarRestaurant.objects.create(
+            restaurant=cls.restaurant, similar=cls.similar, score=0.5, rank=1,
+            source=SimilarRestaurant.SOURCE_COOCCURRENCE,
+        )
+        cls.url = reverse('restaurants:detail', args=[cls.restaurant.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def assertRevalidates(self, etag):
+        """保存していた ETag では 304 にならず、新しい内容を返す"""
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response
+
+    def test_not_modified(self):
+        """内容が変わらなければ 304"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.similar.name)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_restaurant_change(self):
+        """店舗の編集で ETag が変わる"""
+        etag = self.client.get(self.url)['ETag']
+        self.restaurant.description = '名物の味噌カツ'
+        self.restaurant.save()
+        self.assertContains(self.assertRevalidates(etag), '名物の味噌カツ')
+
+    def test_similar_restaurant_rename_and_deactivate(self):
+        """似ている店舗の名前・公開状態の変更で ETag が変わる"""
+        etag = self.client.get(self.url)['ETag']
+        self.similar.name = '手羽先の名店'
+        self.similar.save()
+        response = self.assertRevalidates(etag)
+        self.assertContains(response, '手羽先の名店')
+
+        Restaurant.objects.filter(pk=self.similar.pk).update(is_active=False)
+        response = self.assertRevalidates(response['ETag'])
+        self.assertNotContains(response, '手羽先の名店')
 
-# Create your tests here.
+    def test_company_info_change(self):
+        """フッターの運営会社情報の変更で ETag が変わる"""
+        etag = self.client.get(self.url)['ETag']
+        company = CompanyInfo.get_instance()
+        company.phone = '052-000-0000'
+        company.save()
+        self.assertContains(self.assertRevalidates(etag), '052-000-0000')
@@ -0,0 +1,45 @@
+"""検索用のテキスト処理"""
+import unicodedata
+
+
+def normalize_text(text):
+    """全角・半角、大文字・小文字の違いを吸収した文字列を返す"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    # 文字・数字以外は区切りとして扱う
+    chars = [ch if unicodedata.category(ch)[0] in 'LN' else ' ' for ch in text]
+    return ' '.join(''.join(chars).split())
+
+
+def bigrams(text, for_query=False):
+    """
+    正規化済みの文字列をバイグラム（2文字ずつ）に分割する
+
+    インデックス用には各単語の末尾1文字も追加し、1文字だけのキーワードでも
+    前方一致で検索できるようにする。検索語の場合は末尾の1文字を付けない。
+    """
+    tokens = []
+    for word in text.split():
+        if len(word) == 1:
+            tokens.append(word)
+            continue
+        tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        if not for_query:
+            tokens.append(word[-1])
+    return tokens
+
+
+def fold_kana(text):
+    """カタカナをひらがなに揃える（「ラーメン」と「らーめん」を同じに扱う）"""
+    return ''.join(chr(ord(ch) - 0x60) if 'ァ' <= ch <= 'ヶ' else ch for ch in text)
+
+
+def search_text(text):
+    """検索用に正規化した文字列（全角・半角、大文字・小文字、ひらがな・カタカナの違いを吸収）"""
+    return fold_kana(normalize_text(text))
+
+
+def prefix_key(text):
+    """前方一致の比較用の文字列（検索用に正規化して空白を除く）"""
+    return search_text(text).replace(' ', '')
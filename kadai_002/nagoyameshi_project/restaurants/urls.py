@@ -12,6 +12,7 @@ urlpatterns = [
     
     # 店舗検索
     path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     
     # プレミアム会員限定機能
     path('create/', views.create_restaurant, name='create'),
@@ -0,0 +1,52 @@
+"""
+ログインユーザーごとの表示状態（お気に入り済み・レビュー済み）
+
+一覧ページでは表示する店舗IDをまとめて渡し、お気に入りとレビューをそれぞれ1回のクエリで取得する
+（店舗ごとに exists() を呼ばない）。テンプレートでは
+{% if restaurant.id in viewer.favorite_ids %} のように使う。
+"""
+from django.db.models import Exists, OuterRef, Subquery
+
+from .models import Favorite
+
+
+class ViewerState:
+    """表示中の店舗に対するユーザーの状態"""
+
+    def __init__(self, favorite_ids=(), reviewed_ids=()):
+        self.favorite_ids = set(favorite_ids)
+        self.reviewed_ids = set(reviewed_ids)
+
+
+def _is_premium(user):
+    return user.is_authenticated and getattr(user, 'is_premium', False)
+
+
+def load_viewer_state(user, restaurant_ids):
+    """店舗IDの一覧に対するお気に入り済み・レビュー済みの店舗IDを取得する"""
+    from reviews.models import Review
+
+    restaurant_ids = list(restaurant_ids)
+    if not restaurant_ids or not _is_premium(user):
+        return ViewerState()
+    return ViewerState(
+        Favorite.objects.filter(user=user, restaurant_id__in=restaurant_ids).values_list('restaurant_id', flat=True),
+        Review.objects.filter(user=user, restaurant_id__in=restaurant_ids).values_list('restaurant_id', flat=True),
+    )
+
+
+def with_viewer_state(queryset, user):
+    """
+    店舗のクエリセットにユーザーの状態を付与する（詳細ページ用）
+
+    user_favorite（お気に入り済みか）と user_review_id（自分のレビューのID）を
+    サブクエリで付与し、店舗と同じ1回のクエリで取得する。
+    """
+    from reviews.models import Review
+
+    if not _is_premium(user):
+        return queryset
+    return queryset.annotate(
+        user_favorite=Exists(Favorite.objects.filter(user=user, restaurant=OuterRef('pk'))),
+        user_review_id=Subquery(Review.objects.filter(user=user, restaurant=OuterRef('pk')).values('id')[:1]),
+    )
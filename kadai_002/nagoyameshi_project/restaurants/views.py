@@ -1,132 +1,359 @@
+import math
+from calendar import timegm
+from urllib.parse import urlencode
+
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.http import HttpResponse, JsonResponse
+from django.conf import settings
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.core.cache import cache
 from django.db import IntegrityError
+from django.utils import timezone
 from accounts.decorators import premium_required
+from .autocomplete import suggest
+from .cache import catalogue_cache_key, record_search_cache_hit
+from .budget_index import budget_overlap_filter
+from .facets import compute_facets
 from .forms import RestaurantCreateForm
+from .geo import MAX_RADIUS_KM, stations, within_bbox, within_radius
 from .models import Restaurant, Favorite
-from reviews.models import Review
+from .opening_hours import WEEKDAY_NAMES, format_time, open_at_q, parse_time
+from .page_cache import detail_cache_key, detail_validators
+from .pagination import cached_count, paginate_by_cursor
+from .personalization import personalized_restaurants
+from .sampling import sample_active_restaurants
+from .search import get_search_backend
+from .similarity import similar_restaurants
+from .viewer import load_viewer_state, with_viewer_state
+from reviews.feed import review_feed_page
+
+# 検索結果の並び順
+SEARCH_ORDERINGS = {
+    'created_at': ['-created_at', '-id'],
+    'name': ['name', 'id'],
+    'budget_min': ['budget_min', 'id'],
+    'budget_max': ['-budget_max', '-id'],
+    'rating': ['-rating_score', '-rating_count', '-id'],
+    'popular': ['-popularity_score', '-id'],
+}
+
+# 現在地・駅からの検索半径の選択肢（km）
+SEARCH_RADIUS_CHOICES = [0.5, 1, 2, 3, 5]
 
 
 def index(request):
     """店舗一覧ページ（トップページ）"""
-    # 承認済みの店舗をランダムに5件取得
-    restaurants = Restaurant.objects.filter(is_active=True).select_related('category').order_by('?')[:5]
+    personalized = request.user.is_authenticated and getattr(request.user, 'is_premium', False)
+    if personalized:
+        # プレミアム会員には好みのカテゴリ・予算に合わせたおすすめを表示（ユーザーごとにキャッシュ）
+        restaurants = personalized_restaurants(request.user, 5)
+    else:
+        # 承認済みの店舗をランダムに5件取得（全件の並べ替えを避けるためIDプールから抽出）
+        restaurants = sample_active_restaurants(5)
     
     context = {
         'page_title': '店舗一覧',
         'restaurants': restaurants,
+        'personalized': personalized,
+        'viewer': load_viewer_state(request.user, [restaurant.id for restaurant in restaurants]),
     }
     return render(request, 'restaurants/index.html', context)
 
 
 def detail(request, restaurant_id):
     """店舗詳細ページ"""
-    # 承認済みの店舗のみ表示
+    # 承認済みの店舗のみ表示（お気に入り・自分のレビューの有無も同じクエリで取得）
     restaurant = get_object_or_404(
-        Restaurant.objects.select_related('category').filter(is_active=True), 
+        with_viewer_state(Restaurant.objects.select_related('category').filter(is_active=True), request.user),
         id=restaurant_id
     )
     
+    # 未ログインユーザーは内容が同じため、条件付き GET と HTML のキャッシュを使う
+    # （表示待ちのメッセージがある場合は除く）
+    if not request.user.is_authenticated and not len(messages.get_messages(request)):
+        return _anonymous_detail(request, restaurant)
+    
     # プレミアムユーザーのみレビューを表示
     reviews = None
-    user_review = None
-    if request.user.is_authenticated and getattr(request.user, 'is_premium', False):
-        # 公開されているレビューを取得
-        reviews = Review.objects.filter(
-            restaurant=restaurant,
-            is_public=True
-        ).select_related('user').order_by('-created_at')
-        
-        # ログインユーザーのレビューがあるかチェック
-        user_review = Review.objects.filter(
-            restaurant=restaurant,
-            user=request.user
-        ).first()
-    
-    # お気に入り状態をチェック（プレミアムユーザーのみ）
-    user_favorite = False
     if request.user.is_authenticated and getattr(request.user, 'is_premium', False):
-        user_favorite = Favorite.objects.filter(user=request.user, restaurant=restaurant).exists()
+        # 公開されているレビューの最初のページを取得（続きは review_feed から読み込む）
+        reviews = review_feed_page(restaurant)
     
     context = {
         'restaurant': restaurant,
         'reviews': reviews,
-        'user_review': user_review,
-        'user_favorite': user_favorite,
+        # お気に入り状態・自分のレビュー（プレミアムユーザーのみ）
+        'user_review_id': getattr(restaurant, 'user_review_id', None),
+        'user_favorite': getattr(restaurant, 'user_favorite', False),
+        'review_sort': 'newest',
+        # この店舗を気に入った人が気に入っている店舗（事前計算の表から索引で取得）
+        'similar_restaurants': similar_restaurants(restaurant),
     }
     return render(request, 'restaurants/detail.html', context)
 
 
-def search(request):
-    """店舗検索ページ（ログイン不要）"""
-    from categories.models import Category
-    from django.db.models import Q
+def _anonymous_detail(request, restaurant):
+    """未ログインユーザー向けの店舗詳細ページ"""
+    etag, last_modified = detail_validators(restaurant)
+    response = get_conditional_response(request, etag=etag, last_modified=timegm(last_modified.utctimetuple()))
+    if response is None:
+        cache_key = detail_cache_key(restaurant, etag)
+        html = cache.get(cache_key) if settings.DETAIL_PAGE_CACHE_TIMEOUT else None
+        if html is None:
+            context = {
+                'restaurant': restaurant, 'reviews': None, 'user_review_id': None, 'user_favorite': False,
+                'similar_restaurants': similar_restaurants(restaurant),
+            }
+            html = render(request, 'restaurants/detail.html', context).content
+            if settings.DETAIL_PAGE_CACHE_TIMEOUT:
+                cache.set(cache_key, html, settings.DETAIL_PAGE_CACHE_TIMEOUT)
+        response = HttpResponse(html)
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+    # 毎回再検証させる（ログイン後に同じ URL で古い内容を表示しないよう private にする）
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _parse_number(value, number_type=int):
+    """数値のパラメータを変換する（不正な値・nan・inf は None）"""
+    try:
+        number = number_type(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _parse_bbox(value):
+    """「南,西,北,東」形式の矩形を変換する（不正な値は None）"""
+    parts = [_parse_number(part, float) for part in (value or '').split(',')]
+    if len(parts) != 4 or None in parts:
+        return None
+    south, west, north, east = parts
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        return None
+    # キャッシュキーが細かく分かれすぎないよう約10mの精度に丸める
+    return ','.join(f'{part:.4f}' for part in parts)
+
+
+def _search_filters(params):
+    """検索パラメータを正規化する（検索結果のキャッシュキーにも使用）"""
+    keyword = ' '.join(params.get('keyword', '').split())
+    sort_by = params.get('sort', 'created_at')
+    if sort_by not in SEARCH_ORDERINGS and sort_by not in ('relevance', 'distance'):
+        sort_by = 'created_at'
     
-    # 検索パラメータを取得
-    keyword = request.GET.get('keyword', '').strip()
-    category_id = request.GET.get('category', '')
-    budget_min = request.GET.get('budget_min', '')
-    budget_max = request.GET.get('budget_max', '')
-    sort_by = request.GET.get('sort', 'created_at')
+    # 位置検索の中心（駅名が指定されていれば駅の位置、なければ現在地の緯度経度）
+    near = params.get('near', '')
+    latitude = _parse_number(params.get('lat'), float)
+    longitude = _parse_number(params.get('lng'), float)
+    if near in stations():
+        latitude, longitude = None, None
+    else:
+        near = ''
+        if latitude is None or longitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            latitude, longitude = None, None
+    radius = _parse_number(params.get('radius'), float) or 1
     
+    # 営業中の絞り込み（「今」は現在の曜日・時刻に置き換えてキャッシュキーに含める）
+    open_day = params.get('open_day', '')
+    open_time = parse_time(params.get('open_time'))
+    if open_day == 'now':
+        now = timezone.localtime()
+        open_day, open_time = now.weekday(), now.hour * 60 + now.minute
+    else:
+        open_day = _parse_number(open_day)
+        if open_day is None or not 0 <= open_day <= 6:
+            # 時刻だけ指定された場合は今日の曜日とする
+            open_day = timezone.localdate().weekday() if open_time is not None else None
+    
+    return {
+        'keyword': keyword,
+        'category': _parse_number(params.get('category')),
+        'budget_min': _parse_number(params.get('budget_min')),
+        'budget_max': _parse_number(params.get('budget_max')),
+        'rating_min': _parse_number(params.get('rating_min'), float),
+        'near': near,
+        'lat': round(latitude, 4) if latitude is not None else None,
+        'lng': round(longitude, 4) if longitude is not None else None,
+        'radius': min(max(radius, 0.1), MAX_RADIUS_KM) if near or latitude is not None else None,
+        'bbox': _parse_bbox(params.get('bbox')),
+        'open_day': open_day,
+        'open_time': format_time(open_time) if open_time is not None else None,
+        'sort': sort_by,
+    }
+
+
+def _search_origin(filters):
+    """位置検索の中心 (緯度, 経度)。指定がなければ None"""
+    if filters['near']:
+        return stations()[filters['near']]
+    if filters['lat'] is not None:
+        return filters['lat'], filters['lng']
+    return None
+
+
+def _search_queryset(filters):
+    """検索条件に一致する店舗のクエリセット"""
     # 基本のクエリセット（承認済みの店舗のみ）
     restaurants = Restaurant.objects.filter(is_active=True).select_related('category')
     
     # キーワード検索（店舗名、説明、住所）
-    if keyword:
-        restaurants = restaurants.filter(
-            Q(name__icontains=keyword) |
-            Q(description__icontains=keyword) |
-            Q(address__icontains=keyword)
-        )
+    if filters['keyword']:
+        restaurants = get_search_backend().search(restaurants, filters['keyword'])
     
     # カテゴリ検索
-    if category_id:
-        restaurants = restaurants.filter(category_id=category_id)
+    if filters['category'] is not None:
+        restaurants = restaurants.filter(category_id=filters['category'])
     
-    # 予算検索
-    try:
-        if budget_min:
-            restaurants = restaurants.filter(budget_max__gte=int(budget_min))
-        if budget_max:
-            restaurants = restaurants.filter(budget_min__lte=int(budget_max))
-    except ValueError:
-        pass
-    
-    # 並び替え
-    if sort_by == 'name':
-        restaurants = restaurants.order_by('name')
-    elif sort_by == 'budget_min':
-        restaurants = restaurants.order_by('budget_min')
-    elif sort_by == 'budget_max':
-        restaurants = restaurants.order_by('-budget_max')
-    else:  # created_at
-        restaurants = restaurants.order_by('-created_at')
-    
-    # ページネーション
-    paginator = Paginator(restaurants, 9)  # 1ページ9件
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # 予算検索（予算の範囲が重なる店舗。予算幅の階級の複合索引を使う）
+    restaurants = restaurants.filter(budget_overlap_filter(filters['budget_min'], filters['budget_max']))
+    
+    # 評価検索（集計済みの平均評価を使用）
+    if filters['rating_min'] is not None:
+        restaurants = restaurants.filter(avg_rating__gte=filters['rating_min'])
+    
+    # 位置検索（グリッドセルの索引で候補を絞ってから距離で判定）
+    if filters['bbox']:
+        restaurants = within_bbox(restaurants, *map(float, filters['bbox'].split(',')))
+    origin = _search_origin(filters)
+    if origin:
+        restaurants = within_radius(restaurants, *origin, filters['radius'])
+    
+    # 営業中の絞り込み（解析済みの営業時間帯を曜日・時刻の範囲で検索）
+    if filters['open_day'] is not None:
+        restaurants = restaurants.filter(open_at_q(filters['open_day'], parse_time(filters['open_time'])))
+    
+    return restaurants
+
+
+def _search_results(filters, cursor):
+    """検索結果の1ページ分と件数"""
+    restaurants = _search_queryset(filters)
+    
+    # 並び替え（カーソル方式のページネーションのため最後は一意な id で並べる）
+    if filters['sort'] == 'relevance' and filters['keyword']:
+        ordering = ['-search_rank', '-created_at', '-id']
+    elif filters['sort'] == 'distance' and _search_origin(filters):
+        ordering = ['distance_km', 'id']
+    else:
+        ordering = SEARCH_ORDERINGS.get(filters['sort'], SEARCH_ORDERINGS['created_at'])
+    
+    # 絞り込み件数はカテゴリ・予算の条件を外した結果から1回の集計で求める
+    def facets():
+        return compute_facets(
+            _search_queryset(dict(filters, category=None, budget_min=None, budget_max=None)),
+            filters['category'], filters['budget_min'], filters['budget_max'],
+        )
+    
+    return {
+        # ページネーション（カーソル方式、1ページ9件）
+        'page_obj': paginate_by_cursor(restaurants, ordering, 9, cursor),
+        # 件数は検索条件ごとにキャッシュし、深いページで毎回数えないようにする
+        'result_count': cached_count(
+            restaurants,
+            catalogue_cache_key('search_count', filters),
+            settings.SEARCH_COUNT_CACHE_TIMEOUT,
+        ),
+        'facets': cache.get_or_set(
+            catalogue_cache_key('search_facets', filters), facets, settings.SEARCH_CACHE_TIMEOUT
+        ) if settings.SEARCH_CACHE_TIMEOUT else facets(),
+    }
+
+
+def search(request):
+    """店舗検索ページ（ログイン不要）"""
+    from categories.models import Category
+    
+    filters = _search_filters(request.GET)
+    cursor = request.GET.get('cursor', '')
+    
+    # 未ログインのユーザーには同じ検索条件の結果をキャッシュから返す
+    # （店舗・カテゴリの変更時にカタログの版番号が変わり自動的に無効になる）
+    results = None
+    cache_key = None
+    if not request.user.is_authenticated and settings.SEARCH_CACHE_TIMEOUT:
+        cache_key = catalogue_cache_key('search', dict(filters, cursor=cursor))
+        results = cache.get(cache_key)
+        record_search_cache_hit(results is not None)
+    if results is None:
+        results = _search_results(filters, cursor)
+        if cache_key:
+            cache.set(cache_key, results, settings.SEARCH_CACHE_TIMEOUT)
     
     # カテゴリ一覧を取得
-    categories = Category.objects.all().order_by('name')
+    categories = cache.get_or_set(
+        catalogue_cache_key('categories'),
+        lambda: list(Category.objects.all().order_by('name')),
+        settings.SEARCH_CACHE_TIMEOUT,
+    )
+    
+    # 検索条件（ページ送りのリンク用）
+    query_string = urlencode({key: value for key, value in filters.items() if value not in ('', None)})
+    
+    # 絞り込み件数
+    facets = results['facets']
+    category_facets = [
+        {'category': category, 'count': facets['categories'].get(category.id, 0)}
+        for category in categories
+    ]
+    budget_facets = [
+        dict(bucket, query_string=urlencode({
+            key: value
+            for key, value in dict(filters, budget_min=bucket['budget_min'], budget_max=bucket['budget_max']).items()
+            if value not in ('', None)
+        }))
+        for bucket in facets['budgets']
+    ]
     
     context = {
         'page_title': '店舗検索',
         'categories': categories,
-        'page_obj': page_obj,
-        'keyword': keyword,
-        'selected_category': category_id,
-        'budget_min': budget_min,
-        'budget_max': budget_max,
-        'sort_by': sort_by,
-        'result_count': restaurants.count(),
+        'category_facets': category_facets,
+        'budget_facets': budget_facets,
+        'page_obj': results['page_obj'],
+        'result_count': results['result_count'],
+        # お気に入り済み・レビュー済みの表示（ページ内の店舗について1回ずつ取得）
+        'viewer': load_viewer_state(request.user, [restaurant.id for restaurant in results['page_obj']]),
+        'query_string': query_string,
+        'keyword': filters['keyword'],
+        'selected_category': request.GET.get('category', ''),
+        'budget_min': request.GET.get('budget_min', ''),
+        'budget_max': request.GET.get('budget_max', ''),
+        'rating_min': request.GET.get('rating_min', ''),
+        'stations': stations(),
+        'near': filters['near'],
+        'lat': filters['lat'],
+        'lng': filters['lng'],
+        'radius': filters['radius'] or 1,
+        'radius_choices': SEARCH_RADIUS_CHOICES,
+        'has_origin': _search_origin(filters) is not None,
+        'weekday_choices': list(enumerate(WEEKDAY_NAMES)),
+        'open_day': filters['open_day'],
+        'open_time': filters['open_time'] or '',
+        'sort_by': filters['sort'],
     }
     return render(request, 'restaurants/search.html', context)
 
 
+def autocomplete(request):
+    """検索ボックスの入力補完（JSON）"""
+    limit = min(_parse_number(request.GET.get('limit')) or 10, 20)
+    suggestions = suggest(request.GET.get('q', ''), limit)
+    search_url = reverse('restaurants:search')
+    for suggestion in suggestions:
+        if suggestion['type'] == 'restaurant' and suggestion['id']:
+            suggestion['url'] = reverse('restaurants:detail', kwargs={'restaurant_id': suggestion['id']})
+        elif suggestion['type'] == 'category':
+            suggestion['url'] = f"{search_url}?{urlencode({'category': suggestion['id']})}"
+        else:
+            suggestion['url'] = f"{search_url}?{urlencode({'keyword': suggestion['label']})}"
+    return JsonResponse({'suggestions': suggestions})
+
+
 @premium_required()
 def create_restaurant(request):
     """店舗登録ページ（プレミアム会員限定）"""
@@ -232,12 +459,10 @@ def remove_favorite(request, restaurant_id):
 @premium_required()
 def favorite_list(request):
     """お気に入り一覧"""
-    favorites = Favorite.objects.filter(user=request.user).select_related('restaurant', 'restaurant__category').order_by('-created_at')
+    favorites = Favorite.objects.filter(user=request.user).select_related('restaurant', 'restaurant__category')
     
-    # ページネーション
-    paginator = Paginator(favorites, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # ページネーション（カーソル方式）
+    page_obj = paginate_by_cursor(favorites, ['-created_at', '-id'], 12, request.GET.get('cursor'))
     
     context = {
         'page_obj': page_obj,
@@ -0,0 +1,132 @@
+"""
+店舗ごとの評価集計（Restaurant.rating_sum / rating_count / avg_rating、星の数ごとの件数、評価スコア）の更新
+
+評価スコアは件数の少ない店舗を事前分布に寄せたベイズ平均
+（(事前の重み × 事前の平均 + 評価合計) / (事前の重み + 件数)）で、
+★5が1件だけの店舗が多数のレビューで平均4.6の店舗より上位にならないようにする。
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from restaurants.cache import bump_catalogue_version
+from restaurants.models import Restaurant
+from .models import Review
+
+# 集計値から平均評価を求める式
+AVG_RATING_EXPRESSION = Case(
+    When(rating_count=0, then=Value(0.0)),
+    default=Cast(F('rating_sum'), FloatField()) / F('rating_count'),
+    output_field=FloatField(),
+)
+
+HISTOGRAM_FIELDS = {stars: f'rating_{stars}_count' for stars in range(1, 6)}
+
+# 一括操作中はレビューごとの集計の更新を止め、最後にまとめて再集計する
+_suspended = ContextVar('rating_updates_suspended', default=False)
+
+
+@contextmanager
+def suspend_rating_updates():
+    """この中で保存・削除したレビューはシグナルで評価集計を更新しない（呼び出し側で再集計すること）"""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def rating_updates_suspended():
+    return _suspended.get()
+
+
+def rating_score(rating_sum, rating_count):
+    """評価スコア（ベイズ平均）。レビューが無い場合は0"""
+    if not rating_count:
+        return 0
+    prior_weight = settings.RATING_PRIOR_WEIGHT
+    return (prior_weight * settings.RATING_PRIOR_MEAN + rating_sum) / (prior_weight + rating_count)
+
+
+def rating_score_expression():
+    """集計値から評価スコアを求める式"""
+    prior_weight = settings.RATING_PRIOR_WEIGHT
+    return Case(
+        When(rating_count=0, then=Value(0.0)),
+        default=(Value(prior_weight * settings.RATING_PRIOR_MEAN) + Cast(F('rating_sum'), FloatField()))
+        / (Value(prior_weight) + Cast(F('rating_count'), FloatField())),
+        output_field=FloatField(),
+    )
+
+
+def apply_rating_delta(restaurant_id, rating, count_delta):
+    """
+    店舗の評価集計に評価 rating のレビュー count_delta 件分を加算する（削除は負の値）
+
+    F式による UPDATE で加算するため、同時に複数のレビューが投稿されても
+    集計値が失われない。
+    """
+    if not count_delta:
+        return
+    histogram_field = HISTOGRAM_FIELDS[rating]
+    with transaction.atomic():
+        restaurants = Restaurant.objects.filter(pk=restaurant_id)
+        restaurants.update(
+            rating_sum=F('rating_sum') + rating * count_delta,
+            rating_count=F('rating_count') + count_delta,
+            **{histogram_field: F(histogram_field) + count_delta},
+        )
+        restaurants.update(avg_rating=AVG_RATING_EXPRESSION, rating_score=rating_score_expression())
+    # 検索結果に表示する評価が変わるため、確定後にキャッシュを無効にする
+    transaction.on_commit(bump_catalogue_version)
+
+
+def mark_reviews_changed(*restaurant_ids):
+    """店舗のレビュー更新日時を現在時刻にする（詳細ページのキャッシュが無効になる）"""
+    Restaurant.objects.filter(pk__in=set(restaurant_ids)).update(reviews_updated_at=timezone.now())
+
+
+def rebuild_rating_aggregates(restaurant_ids=None, batch_size=500):
+    """
+    公開レビューから評価集計を再計算する
+
+    restaurant_ids を省略した場合は全店舗が対象。
+    集計は「店舗×評価」で GROUP BY した1回のクエリで行い、bulk_update でまとめて書き込む。
+    戻り値は更新した店舗数。
+    """
+    fields = ['rating_sum', 'rating_count', 'avg_rating', 'rating_score', *HISTOGRAM_FIELDS.values()]
+    reviews = Review.objects.filter(is_public=True)
+    restaurants = Restaurant.objects.only(*fields)
+    if restaurant_ids is not None:
+        reviews = reviews.filter(restaurant_id__in=restaurant_ids)
+        restaurants = restaurants.filter(pk__in=restaurant_ids)
+
+    histograms = {}
+    for row in reviews.order_by().values('restaurant_id', 'rating').annotate(count=Count('id')):
+        histograms.setdefault(row['restaurant_id'], {})[row['rating']] = row['count']
+
+    processed = 0
+    updated = []
+    with transaction.atomic():
+        for restaurant in restaurants.iterator(chunk_size=batch_size):
+            processed += 1
+            histogram = histograms.get(restaurant.pk, {})
+            for stars, field in HISTOGRAM_FIELDS.items():
+                setattr(restaurant, field, histogram.get(stars, 0))
+            restaurant.rating_sum = sum(stars * count for stars, count in histogram.items())
+            restaurant.rating_count = sum(histogram.values())
+            restaurant.avg_rating = restaurant.rating_sum / restaurant.rating_count if restaurant.rating_count else 0
+            restaurant.rating_score = rating_score(restaurant.rating_sum, restaurant.rating_count)
+            updated.append(restaurant)
+            if len(updated) >= batch_size:
+                Restaurant.objects.bulk_update(updated, fields)
+                updated = []
+        if updated:
+            Restaurant.objects.bulk_update(updated, fields)
+    transaction.on_commit(bump_catalogue_version)
+    return processed
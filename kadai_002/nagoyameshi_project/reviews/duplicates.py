@@ -0,0 +1,152 @@
+"""
+重複の疑いのあるレビューの検出
+
+レビューの保存時に本文の MinHash 署名と LSH バケット（reviews.minhash）を保存し、
+同じバケットを持つ先に投稿されたレビューだけを候補にして署名を比較する。
+推定 Jaccard 係数が DUPLICATE_THRESHOLD 以上のものがあれば、最も似ているものを
+duplicate_of に記録する（管理画面のレビュー一覧で「重複の疑い」と表示する）。
+
+保存時の処理は候補の検索1回と更新数回で済むため、投稿のリクエスト内で実行する。
+既存のレビューは rebuild_review_minhash コマンドでまとめて作り直す。
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .minhash import DUPLICATE_THRESHOLD, band_keys, best_match, signature, similarity
+from .models import Review, ReviewBucket
+
+# 保存時に比較する候補の上限（定型文などでバケットが偏った場合に比較が増えすぎないようにする）
+MAX_CANDIDATES = 200
+
+
+def _bucket_rows(review_id, keys):
+    return [ReviewBucket(review_id=review_id, band=band, bucket=bucket) for band, bucket in keys]
+
+
+def _bucket_q(keys):
+    condition = Q()
+    for band, bucket in keys:
+        condition |= Q(band=band, bucket=bucket)
+    return condition
+
+
+def index_review(review, created=False):
+    """
+    レビューの署名とバケットを保存し、重複の疑いを判定する（本文の保存時に呼ぶ）
+
+    比較するのは先に投稿された（ID の小さい）レビューだけ。本文が変わって似なくなった
+    後のレビューの「重複元」の記録は外す。
+    """
+    review_signature = signature(review.comment)
+    keys = band_keys(review_signature) if review_signature else []
+    match = None
+    with transaction.atomic():
+        if not created:
+            ReviewBucket.objects.filter(review=review).delete()
+        if keys:
+            ReviewBucket.objects.bulk_create(_bucket_rows(review.pk, keys))
+            candidates = (
+                Review.objects
+                .filter(pk__in=ReviewBucket.objects.filter(_bucket_q(keys), review_id__lt=review.pk).values('review_id'))
+                .order_by('pk')
+                .values_list('pk', 'minhash')[:MAX_CANDIDATES]
+            )
+            match = best_match(review_signature, candidates)
+
+        review.minhash = review_signature
+        review.duplicate_of_id, review.duplicate_score = match or (None, None)
+        Review.objects.filter(pk=review.pk).update(
+            minhash=review.minhash, duplicate_of=review.duplicate_of_id, duplicate_score=review.duplicate_score,
+        )
+
+        if not created:
+            # このレビューを重複元としていたレビューのうち、似なくなったものの記録を外す
+            unmatched = [
+                review_id
+                for review_id, other in Review.objects.filter(duplicate_of=review).values_list('pk', 'minhash')
+                if not review_signature or not other or similarity(review_signature, other) < DUPLICATE_THRESHOLD
+            ]
+            if unmatched:
+                Review.objects.filter(pk__in=unmatched).update(duplicate_of=None, duplicate_score=None)
+    return match
+
+
+def _collisions():
+    """
+    同じ帯・バケットに複数のレビューがあるバケットの (レビューID, それより前のレビューIDの集合)
+
+    重複の疑いのあるレビューの数に比例するだけで、全レビューの署名は読み込まない。
+    """
+    colliding = (
+        ReviewBucket.objects.order_by().values('band', 'bucket')
+        .annotate(reviews=Count('id')).filter(reviews__gt=1)
+    )
+    rows = (
+        ReviewBucket.objects.filter(bucket__in=colliding.values('bucket'))
+        .order_by('band', 'bucket', 'review_id').values_list('band', 'bucket', 'review_id')
+    )
+    candidates = defaultdict(set)
+    group, members = None, []
+    for band, bucket, review_id in rows:
+        if (band, bucket) != group:
+            group, members = (band, bucket), []
+        # 同じ帯・バケットの先に投稿されたレビューが候補
+        candidates[review_id].update(members)
+        members.append(review_id)
+    return {review_id: earlier for review_id, earlier in candidates.items() if earlier}
+
+
+def rebuild_review_minhash(batch_size=1000):
+    """
+    全レビューの署名・バケット・重複の疑いを作り直す
+
+    署名とバケットは batch_size 件ずつ書き込み、重複の候補はバケットの表を集計して求める
+    （全レビューの署名をメモリに載せない）。
+
+    Returns:
+        (署名を作成したレビュー数, 重複の疑いのあるレビュー数)
+    """
+    count = 0
+    with transaction.atomic():
+        ReviewBucket.objects.all().delete()
+        Review.objects.exclude(minhash=None, duplicate_of=None).update(minhash=None, duplicate_of=None, duplicate_score=None)
+
+        # 1回目: ID のキーセットで区切って署名とバケットを書き込む
+        last_id = 0
+        while True:
+            rows = list(Review.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', 'comment')[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            reviews = []
+            buckets = []
+            for review_id, comment in rows:
+                review_signature = signature(comment)
+                if review_signature:
+                    reviews.append(Review(pk=review_id, minhash=review_signature))
+                    buckets.extend(_bucket_rows(review_id, band_keys(review_signature)))
+            Review.objects.bulk_update(reviews, ['minhash'])
+            ReviewBucket.objects.bulk_create(buckets, batch_size=batch_size)
+            count += len(reviews)
+
+        # 2回目: 同じバケットに入った先のレビューとだけ署名を比べる
+        candidates = _collisions()
+        review_ids = sorted(candidates)
+        duplicates = 0
+        for start in range(0, len(review_ids), batch_size):
+            batch = review_ids[start:start + batch_size]
+            related = set(batch).union(*(candidates[review_id] for review_id in batch))
+            signatures = dict(Review.objects.filter(pk__in=related).values_list('pk', 'minhash'))
+            reviews = []
+            for review_id in batch:
+                match = best_match(
+                    signatures[review_id],
+                    ((candidate, signatures[candidate]) for candidate in sorted(candidates[review_id])),
+                )
+                if match:
+                    reviews.append(Review(pk=review_id, duplicate_of_id=match[0], duplicate_score=match[1]))
+            Review.objects.bulk_update(reviews, ['duplicate_of', 'duplicate_score'])
+            duplicates += len(reviews)
+    return count, duplicates
@@ -0,0 +1,20 @@
+"""店舗詳細ページのレビュー一覧（カーソル方式で少しずつ読み込む）"""
+from restaurants.pagination import paginate_by_cursor
+from .models import Review
+
+# 1回に読み込むレビューの件数
+REVIEW_FEED_PAGE_SIZE = 10
+
+# レビューの並び順（(restaurant, is_public, ...) の複合索引に沿う）
+REVIEW_FEED_ORDERINGS = {
+    'newest': ['-created_at', '-id'],
+    'highest': ['-rating', '-created_at', '-id'],
+    'lowest': ['rating', '-created_at', '-id'],
+}
+
+
+def review_feed_page(restaurant, sort='newest', cursor=None):
+    """店舗の公開レビューの1ページ分"""
+    ordering = REVIEW_FEED_ORDERINGS.get(sort, REVIEW_FEED_ORDERINGS['newest'])
+    reviews = Review.objects.filter(restaurant=restaurant, is_public=True).select_related('user')
+    return paginate_by_cursor(reviews, ordering, REVIEW_FEED_PAGE_SIZE, cursor)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reviews.aggregates import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = '公開レビューから店舗ごとの評価集計（評価合計・件数・平均・星の数ごとの件数・評価スコア）を再計算します'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant', type=int, action='append', dest='restaurant_ids',
+            help='対象の店舗ID（複数指定可。省略時は全店舗）',
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help='一括更新の件数')
+
+    def handle(self, *args, **options):
+        count = rebuild_rating_aggregates(options['restaurant_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{count}件の店舗の評価集計を更新しました。'))
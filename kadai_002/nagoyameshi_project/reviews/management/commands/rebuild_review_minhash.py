@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from reviews.duplicates import rebuild_review_minhash
+
+
+class Command(BaseCommand):
+    help = 'レビュー本文の MinHash 署名と LSH バケットを作り直し、重複の疑いのあるレビューを判定し直します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='一括更新の件数')
+
+    def handle(self, *args, **options):
+        count, duplicates = rebuild_review_minhash(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{count}件のレビューの署名を作成しました（重複の疑い: {duplicates}件）。'
+        ))
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 04:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from reviews.minhash import band_keys, find_duplicates, signature
+
+def populate_review_minhash(apps, schema_editor):
+    """既存レビューの MinHash 署名・LSH バケット・重複の疑いを作成する"""
+    Review = apps.get_model('reviews', 'Review')
+    ReviewBucket = apps.get_model('reviews', 'ReviewBucket')
+    items = []
+    for review_id, comment in Review.objects.order_by('pk').values_list('pk', 'comment').iterator():
+        review_signature = signature(comment)
+        if review_signature:
+            items.append((review_id, review_signature))
+    duplicates = find_duplicates(items)
+
+    reviews = []
+    buckets = []
+    for review_id, review_signature in items:
+        duplicate_of, score = duplicates.get(review_id, (None, None))
+        reviews.append(Review(pk=review_id, minhash=review_signature, duplicate_of_id=duplicate_of, duplicate_score=score))
+        buckets.extend(
+            ReviewBucket(review_id=review_id, band=band, bucket=bucket) for band, bucket in band_keys(review_signature)
+        )
+    Review.objects.bulk_update(reviews, ['minhash', 'duplicate_of', 'duplicate_score'], batch_size=1000)
+    ReviewBucket.objects.bulk_create(buckets, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_review_user_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='duplicate_of',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='reviews.review', verbose_name='重複元のレビュー'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='duplicate_score',
+            field=models.FloatField(editable=False, null=True, verbose_name='重複の類似度'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='minhash',
+            field=models.BinaryField(null=True, verbose_name='MinHash 署名'),
+        ),
+        migrations.CreateModel(
+            name='ReviewBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='帯')),
+                ('bucket', models.BigIntegerField(verbose_name='バケット')),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='minhash_buckets', to='reviews.review', verbose_name='レビュー')),
+            ],
+            options={
+                'verbose_name': 'レビューのLSHバケット',
+                'verbose_name_plural': 'レビューのLSHバケット',
+                'indexes': [models.Index(fields=['band', 'bucket', 'review'], name='review_bucket_lookup_idx')],
+            },
+        ),
+        migrations.RunPython(populate_review_minhash, migrations.RunPython.noop),
+    ]
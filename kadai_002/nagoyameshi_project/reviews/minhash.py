@@ -0,0 +1,111 @@
+"""
+レビュー本文の MinHash 署名と LSH（局所性鋭敏型ハッシュ）のバケット
+
+本文を正規化して文字3-gram の集合にし、NUM_PERMUTATIONS 個のハッシュ関数それぞれの最小値を
+署名とする。2つの署名で値が一致する割合は、元の集合の Jaccard 係数の推定値になる。
+署名を BANDS 個の帯に分けた各帯のハッシュをバケットとし、1つでも同じバケットに入った
+レビューだけを比較の候補にする（全件との比較をしない）。
+帯の行数 4・帯の数 16 では、Jaccard 係数 0.8 の組は約99.9%、0.3 の組は約12%の確率で候補になる。
+
+このモジュールはデータベースに依存しない（マイグレーションからも使う）。
+"""
+import random
+import zlib
+from array import array
+from collections import defaultdict
+from hashlib import blake2b
+
+from restaurants.text import search_text
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+# これより短い本文は「美味しかったです」のような定型文の一致が多いため対象にしない
+MIN_TEXT_LENGTH = 20
+# 推定 Jaccard 係数がこれ以上なら重複の疑いとする
+DUPLICATE_THRESHOLD = 0.8
+
+_PRIME = (1 << 61) - 1
+# 署名の値が変わらないよう乱数の種を固定する
+_random = random.Random(20240601)
+_PERMUTATIONS = [
+    (_random.randrange(1, _PRIME), _random.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text):
+    """正規化した本文（空白を除く）の文字 SHINGLE_SIZE-gram のハッシュ値の集合"""
+    text = search_text(text).replace(' ', '')
+    if len(text) < MIN_TEXT_LENGTH:
+        return set()
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def signature(text):
+    """本文の MinHash 署名（bytes）。短すぎる本文は None"""
+    values = shingles(text)
+    if not values:
+        return None
+    return array('Q', (min((a * x + b) % _PRIME for x in values) for a, b in _PERMUTATIONS)).tobytes()
+
+
+def _values(signature_bytes):
+    values = array('Q')
+    values.frombytes(bytes(signature_bytes))
+    return values
+
+
+def band_keys(signature_bytes):
+    """署名の帯ごとのバケット (帯番号, バケット) の一覧"""
+    values = _values(signature_bytes)
+    keys = []
+    for band in range(BANDS):
+        rows = values[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        digest = blake2b(rows, digest_size=8).digest()
+        keys.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return keys
+
+
+def similarity(signature_a, signature_b):
+    """2つの署名から推定した Jaccard 係数"""
+    values_a, values_b = _values(signature_a), _values(signature_b)
+    return sum(a == b for a, b in zip(values_a, values_b)) / NUM_PERMUTATIONS
+
+
+def best_match(target, candidates, threshold=DUPLICATE_THRESHOLD):
+    """
+    候補 [(ID, 署名), ...] のうち最も似ているものを (ID, 推定 Jaccard 係数) で返す
+
+    しきい値未満なら None。同じ係数なら ID の小さい（先に投稿された）ものを選ぶ。
+    """
+    best = None
+    for candidate_id, candidate in candidates:
+        score = similarity(target, candidate)
+        if score >= threshold and (best is None or (score, -candidate_id) > (best[1], -best[0])):
+            best = (candidate_id, score)
+    return best
+
+
+def find_duplicates(items, threshold=DUPLICATE_THRESHOLD):
+    """
+    まとめて重複を探す（一括の作成用）
+
+    Args:
+        items: ID の昇順の (ID, 署名) の一覧
+    Returns:
+        {ID: (重複元の ID, 推定 Jaccard 係数)}。重複元は自分より ID の小さいものに限る
+    """
+    buckets = defaultdict(list)
+    signatures = {}
+    duplicates = {}
+    for item_id, item_signature in items:
+        candidates = set()
+        for key in band_keys(item_signature):
+            candidates.update(buckets[key])
+            buckets[key].append(item_id)
+        match = best_match(item_signature, ((candidate, signatures[candidate]) for candidate in candidates), threshold)
+        if match:
+            duplicates[item_id] = match
+        signatures[item_id] = item_signature
+    return duplicates
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from restaurants.models import Restaurant
@@ -29,6 +29,18 @@ class Review(models.Model):
     # 公開状態
     is_public = models.BooleanField('公開', default=True)
     
+    # 重複の疑い（本文の MinHash 署名で判定。reviews.duplicates を参照）
+    minhash = models.BinaryField('MinHash 署名', null=True, editable=False)
+    duplicate_of = models.ForeignKey(
+        'self',
+        verbose_name='重複元のレビュー',
+        on_delete=models.SET_NULL,
+        null=True,
+        editable=False,
+        related_name='+'
+    )
+    duplicate_score = models.FloatField('重複の類似度', null=True, editable=False)
+    
     # 作成・更新日時
     created_at = models.DateTimeField('作成日時', auto_now_add=True)
     updated_at = models.DateTimeField('更新日時', auto_now=True)
@@ -39,11 +51,64 @@ class Review(models.Model):
         ordering = ['-created_at']
         # 1ユーザー1店舗につき1レビュー
         unique_together = [['user', 'restaurant']]
+        indexes = [
+            # 店舗詳細ページのレビュー一覧（新しい順・評価順）
+            models.Index(fields=['restaurant', 'is_public', 'created_at'], name='review_feed_newest_idx'),
+            models.Index(fields=['restaurant', 'is_public', 'rating', 'created_at'], name='review_feed_rating_idx'),
+            # マイレビュー一覧（新しい順）
+            models.Index(fields=['user', 'created_at'], name='review_user_created_idx'),
+        ]
     
     def __str__(self):
         return f'{self.restaurant.name} - {self.user.username} ({self.rating}★)'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 評価集計の差分計算用に読み込み時の状態を保持
+        instance._loaded_rating_state = instance.rating_state if not instance.get_deferred_fields() else None
+        # 重複判定の要否の判断用に読み込み時の本文を保持（読み込んでいない場合は None）
+        instance._loaded_comment = instance.__dict__.get('comment')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # 店舗の評価集計の更新（post_save）と同じトランザクションで保存する
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
+    @property
+    def rating_state(self):
+        """評価集計に影響する項目（店舗ID, 評価, 公開状態）"""
+        return (self.restaurant_id, self.rating, self.is_public)
+    
     @property
     def star_display(self):
         """星表示用"""
         return '★' * self.rating + '☆' * (5 - self.rating)
+
+
+class ReviewBucket(models.Model):
+    """
+    レビューの LSH バケットモデル（MinHash 署名の帯ごとのハッシュ）
+
+    同じ帯・バケットを持つレビューだけを重複判定の候補にする。
+    """
+    review = models.ForeignKey(
+        Review,
+        verbose_name='レビュー',
+        on_delete=models.CASCADE,
+        related_name='minhash_buckets'
+    )
+    band = models.PositiveSmallIntegerField('帯')
+    bucket = models.BigIntegerField('バケット')
+
+    class Meta:
+        verbose_name = 'レビューのLSHバケット'
+        verbose_name_plural = 'レビューのLSHバケット'
+        indexes = [
+            # 同じバケットのレビューの検索用
+            models.Index(fields=['band', 'bucket', 'review'], name='review_bucket_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.review_id}: {self.band}/{self.bucket}'
@@ -0,0 +1,78 @@
+"""
+レビューの一括モデレーション（管理画面）
+
+選択したレビュー、または検索条件に一致するすべてのレビューをまとめて公開・非公開・削除する。
+1回の UPDATE / DELETE ... WHERE id IN (...) と、影響した店舗の評価集計の作り直し
+（1回の集計クエリ）を1つのトランザクションで実行する（レビューごとのシグナルによる集計の更新は行わない）。
+選択したレビューは全体を1つのトランザクションで処理し、検索条件に一致するすべてのレビューは
+ロックが長くならないよう ID 順のチャンクごとに処理する（途中で失敗しても確定済みのチャンクの集計は正しい）。
+"""
+from functools import partial
+
+from django.db import transaction
+from django.utils import timezone
+
+from .aggregates import mark_reviews_changed, rebuild_rating_aggregates, suspend_rating_updates
+from .models import Review
+
+# 操作名と表示名
+BULK_ACTIONS = {
+    'hide': '非公開に',
+    'show': '公開',
+    'delete': '削除',
+}
+# 1回の UPDATE / DELETE で扱う件数（検索条件に一致するすべてのレビューを処理する場合）
+CHUNK_SIZE = 500
+
+
+def _apply_chunk(action, rows):
+    """
+    (レビューID, 店舗ID) の一覧のレビューに操作を適用し、変更した件数を返す
+
+    操作と評価集計の作り直しは同じトランザクションで行い、詳細ページのキャッシュは確定後に無効にする。
+    """
+    reviews = Review.objects.filter(id__in=[review_id for review_id, _ in rows])
+    restaurant_ids = {restaurant_id for _, restaurant_id in rows}
+    with transaction.atomic():
+        if action == 'delete':
+            with suspend_rating_updates():
+                # 関連する行（LSH バケットなど）の件数は含めない
+                count = reviews.delete()[1].get(Review._meta.label, 0)
+        else:
+            is_public = action == 'show'
+            count = reviews.exclude(is_public=is_public).update(is_public=is_public, updated_at=timezone.now())
+        rebuild_rating_aggregates(restaurant_ids)
+        transaction.on_commit(partial(mark_reviews_changed, *restaurant_ids))
+    return count
+
+
+def apply_bulk_action(action, queryset, chunk_size=CHUNK_SIZE):
+    """
+    queryset のレビューに一括で操作を適用する
+
+    Args:
+        action: 'hide' / 'show' / 'delete'
+        queryset: 対象のレビュー（検索条件で絞り込んだもの、または選択したID）
+        chunk_size: チャンクの件数（None の場合は全体を1つのトランザクションで処理する）
+    Returns:
+        変更したレビューの件数
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f'不明な操作です: {action}')
+
+    queryset = queryset.order_by('id')
+    if chunk_size is None:
+        with transaction.atomic():
+            rows = list(queryset.values_list('id', 'restaurant_id'))
+            return _apply_chunk(action, rows) if rows else 0
+
+    count = 0
+    last_id = 0
+    while True:
+        # 操作で条件に合わなくなった行を読み飛ばさないよう ID のキーセットで次のチャンクを取る
+        rows = list(queryset.filter(id__gt=last_id).values_list('id', 'restaurant_id')[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        count += _apply_chunk(action, rows)
+    return count
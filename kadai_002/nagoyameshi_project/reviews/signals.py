@@ -0,0 +1,48 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .aggregates import apply_rating_delta, mark_reviews_changed, rating_updates_suspended, rebuild_rating_aggregates
+from .duplicates import index_review
+from .models import Review
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, **kwargs):
+    """レビューの作成・編集・公開状態の変更を店舗の評価集計に反映"""
+    if rating_updates_suspended():
+        return
+    new_state = instance.rating_state
+    old_state = None if created else getattr(instance, '_loaded_rating_state', None)
+
+    if not created and old_state is None:
+        # 変更前の状態が分からない場合は店舗単位で再集計する
+        rebuild_rating_aggregates([instance.restaurant_id])
+    elif old_state != new_state:
+        if old_state and old_state[2]:
+            apply_rating_delta(old_state[0], old_state[1], -1)
+        if new_state[2]:
+            apply_rating_delta(new_state[0], new_state[1], 1)
+    mark_reviews_changed(instance.restaurant_id, *([old_state[0]] if old_state else []))
+    instance._loaded_rating_state = new_state
+
+
+@receiver(post_save, sender=Review)
+def update_duplicate_index(sender, instance, created, update_fields=None, **kwargs):
+    """レビューの本文が変わったら MinHash 署名を作り直して重複の疑いを判定する"""
+    if update_fields is not None and 'comment' not in update_fields:
+        return
+    if not created and instance.comment == getattr(instance, '_loaded_comment', None):
+        return
+    index_review(instance, created=created)
+    instance._loaded_comment = instance.comment
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """レビューの削除を店舗の評価集計に反映"""
+    if rating_updates_suspended():
+        return
+    restaurant_id, rating, is_public = getattr(instance, '_loaded_rating_state', None) or instance.rating_state
+    if is_public:
+        apply_rating_delta(restaurant_id, rating, -1)
+    mark_reviews_changed(restaurant_id)
@@ -1,3 +1,139 @@
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from categories.models import Category
+from restaurants.models import Restaurant
+from .aggregates import HISTOGRAM_FIELDS, rebuild_rating_aggregates
+from .models import Review, ReviewBucket
+from .moderation import apply_bulk_action
+
+User = get_user_model()
+
+AGGREGATE_FIELDS = ['rating_sum', 'rating_count', 'avg_rating', 'rating_score', *HISTOGRAM_FIELDS.values()]
+
+
+class RatingAggregateTestCase(TestCase):
+    """評価集計のテストの共通部分（店舗3件・ユーザー6人）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='和食')
+        cls.restaurants = [
+            Restaurant.objects.create(name=f'店舗{index}', category=category, address='名古屋市') for index in range(3)
+        ]
+        cls.users = [User.objects.create_user(username=f'user{index}', email=f'user{index}@example.com')
+                     for index in range(6)]
+
+    def aggregates(self):
+        return {
+            row['id']: row
+            for row in Restaurant.objects.filter(pk__in=[r.pk for r in self.restaurants]).values('id', *AGGREGATE_FIELDS)
+        }
+
+    def assertAggregatesMatchRebuild(self):
+        """差分で更新した評価集計が公開レビューからの再集計と一致する"""
+        incremental = self.aggregates()
+        rebuild_rating_aggregates([restaurant.pk for restaurant in self.restaurants])
+        rebuilt = self.aggregates()
+        for restaurant_id, row in rebuilt.items():
+            for field in AGGREGATE_FIELDS:
+                self.assertAlmostEqual(incremental[restaurant_id][field], row[field], msg=f'{restaurant_id} {field}')
+        return rebuilt
+
+
+class RatingDeltaTests(RatingAggregateTestCase):
+    """レビューの保存・削除ごとの評価集計の差分更新"""
+
+    def test_create_edit_hide_move_delete(self):
+        """作成・評価の変更・非公開・店舗の変更・削除のあとも再集計と一致する"""
+        first, second = self.restaurants[:2]
+        reviews = [
+            Review.objects.create(user=user, restaurant=first, rating=rating)
+            for user, rating in zip(self.users, [5, 4, 4, 2, 1])
+        ]
+        self.assertAggregatesMatchRebuild()
+
+        reviews[0].rating = 3
+        reviews[0].save()
+        reviews[1].is_public = False
+        reviews[1].save()
+        reviews[2].restaurant = second
+        reviews[2].save()
+        reviews[3].delete()
+        # 評価を読み込まずに保存した場合も集計がずれない
+        partial = Review.objects.only('id', 'restaurant').get(pk=reviews[4].pk)
+        partial.rating = 5
+        partial.save()
+        rebuilt = self.assertAggregatesMatchRebuild()
+
+        self.assertEqual(rebuilt[first.pk]['rating_count'], 2)
+        self.assertEqual(rebuilt[first.pk]['rating_sum'], 8)
+        self.assertEqual(rebuilt[first.pk]['rating_5_count'], 1)
+        self.assertEqual(rebuilt[second.pk]['rating_4_count'], 1)
+
+    def test_hidden_review_does_not_count(self):
+        """非公開のレビューは公開したときに集計に加える"""
+        review = Review.objects.create(user=self.users[0], restaurant=self.restaurants[0], rating=5, is_public=False)
+        self.assertEqual(self.aggregates()[self.restaurants[0].pk]['rating_count'], 0)
+        review.is_public = True
+        review.save()
+        self.assertEqual(self.assertAggregatesMatchRebuild()[self.restaurants[0].pk]['rating_count'], 1)
+
+
+class BulkModerationTests(RatingAggregateTestCase):
+    """管理画面のレビューの一括操作"""
+
+    def setUp(self):
+        comment = '味噌カツが美味しくて店員さんの接客もとても丁寧でした。また来たいです。'
+        for index, user in enumerate(self.users):
+            for restaurant in self.restaurants:
+                Review.objects.create(
+                    user=user, restaurant=restaurant, rating=index % 5 + 1, comment=f'{comment}{index}',
+                )
+
+    def test_selected_reviews(self):
+        """選択したレビューの一括操作（1つのトランザクション）で評価集計が再集計と一致する"""
+        selected = Review.objects.filter(user__in=self.users[:3])
+        ids = list(selected.values_list('id', flat=True))
+
+        def reviews_updated_at():
+            return dict(Restaurant.objects.filter(pk__in=[r.pk for r in self.restaurants])
+                        .values_list('id', 'reviews_updated_at'))
+
+        before = reviews_updated_at()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(apply_bulk_action('hide', Review.objects.filter(id__in=ids), chunk_size=None), len(ids))
+        # 詳細ページのキャッシュの無効化は確定後に行う
+        self.assertEqual(reviews_updated_at(), before)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(all(reviews_updated_at()[pk] > before[pk] for pk in before))
+        self.assertEqual(self.assertAggregatesMatchRebuild()[self.restaurants[0].pk]['rating_count'], 3)
+
+        # 変更の無いレビューは数えない
+        self.assertEqual(apply_bulk_action('hide', Review.objects.filter(id__in=ids), chunk_size=None), 0)
+        self.assertEqual(apply_bulk_action('show', Review.objects.filter(id__in=ids), chunk_size=None), len(ids))
+        self.assertAggregatesMatchRebuild()
+
+    def test_delete_counts_reviews_only(self):
+        """削除の件数は関連する LSH バケットを含めずレビューの件数だけ"""
+        ids = list(Review.objects.filter(restaurant=self.restaurants[0]).values_list('id', flat=True))
+        self.assertTrue(ReviewBucket.objects.filter(review_id__in=ids).exists())
+        self.assertEqual(apply_bulk_action('delete', Review.objects.filter(id__in=ids), chunk_size=None), len(ids))
+        self.assertFalse(Review.objects.filter(id__in=ids).exists())
+        self.assertEqual(self.assertAggregatesMatchRebuild()[self.restaurants[0].pk]['rating_count'], 0)
+
+    def test_all_matching_in_chunks(self):
+        """検索条件に一致するすべてのレビューをチャンクに分けて処理しても結果は同じ"""
+        matching = Review.objects.filter(rating__gte=3)
+        count = matching.count()
+        self.assertEqual(apply_bulk_action('hide', matching, chunk_size=4), count)
+        self.assertFalse(Review.objects.filter(rating__gte=3, is_public=True).exists())
+        self.assertAggregatesMatchRebuild()
+        self.assertEqual(apply_bulk_action('delete', Review.objects.filter(is_public=False), chunk_size=4), count)
+        self.assertAggregatesMatchRebuild()
+
+    def test_unknown_action(self):
+        """不明な操作は ValueError"""
+        with self.assertRaises(ValueError):
+            apply_bulk_action('publish', Review.objects.all())
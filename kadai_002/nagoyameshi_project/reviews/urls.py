@@ -13,4 +13,5 @@ urlpatterns = [
     
     # レビュー一覧
     path('my-reviews/', views.my_reviews, name='my_reviews'),
+    path('restaurant/<int:restaurant_id>/feed/', views.review_feed, name='review_feed'),
 ]
\ No newline at end of file
@@ -1,9 +1,13 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db import IntegrityError
 from accounts.decorators import premium_required
 from restaurants.models import Restaurant
+from restaurants.pagination import paginate_by_cursor
+from .feed import review_feed_page
 from .models import Review
 from .forms import ReviewCreateForm
 
@@ -92,9 +96,47 @@ def delete_review(request, review_id):
 @premium_required()
 def my_reviews(request):
     """マイレビュー一覧"""
-    reviews = Review.objects.filter(user=request.user).select_related('restaurant', 'restaurant__category').order_by('-created_at')
+    reviews = Review.objects.filter(user=request.user)
+    
+    # 表示する列だけを取得し、(user, created_at) の索引を使ったカーソル方式でページ分割
+    page_obj = paginate_by_cursor(
+        reviews.select_related('restaurant__category').only(
+            'id', 'rating', 'comment', 'created_at', 'updated_at',
+            'restaurant__id', 'restaurant__name', 'restaurant__image',
+            'restaurant__budget_min', 'restaurant__budget_max', 'restaurant__category__name',
+        ),
+        ['-created_at', '-id'],
+        10,
+        request.GET.get('cursor'),
+    )
     
     context = {
-        'reviews': reviews
+        'reviews': page_obj,
+        'page_obj': page_obj,
+        'review_count': reviews.count(),
     }
-    return render(request, 'reviews/my_reviews.html', context)
\ No newline at end of file
+    return render(request, 'reviews/my_reviews.html', context)
+
+
+def review_feed(request, restaurant_id):
+    """店舗のレビュー一覧の続き（JSON。プレミアムユーザー限定）"""
+    if not (request.user.is_authenticated and getattr(request.user, 'is_premium', False)):
+        return JsonResponse({'error': 'レビューの閲覧はプレミアム会員限定です。'}, status=403)
+    
+    restaurant = get_object_or_404(Restaurant, id=restaurant_id, is_active=True)
+    page = review_feed_page(restaurant, request.GET.get('sort', 'newest'), request.GET.get('cursor'))
+    
+    return JsonResponse({
+        'html': render_to_string('reviews/_review_items.html', {'reviews': page}, request=request),
+        'next_cursor': page.next_cursor,
+        'reviews': [
+            {
+                'id': review.id,
+                'username': review.user.username,
+                'rating': review.rating,
+                'comment': review.comment,
+                'created_at': review.created_at.isoformat(),
+            }
+            for review in page
+        ],
+    })